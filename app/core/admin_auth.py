@@ -0,0 +1,23 @@
+# app/core/admin_auth.py
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from .config import ADMIN_API_TOKEN
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Dependency endpoint admin: header X-Admin-Token harus sama dengan token di config."""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Endpoint admin nonaktif (admin.api_token belum dikonfigurasi).",
+        )
+    if not x_admin_token or not secrets.compare_digest(
+        x_admin_token.encode(), ADMIN_API_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token admin tidak valid.",
+        )
@@ -0,0 +1,172 @@
+# app/core/bench_database.py
+"""
+Benchmark throughput campuran baca/tulis SQLite: engine lama (rollback journal, PRAGMA
+bawaan, satu pool untuk semua) dibandingkan profil SQLite di DatabaseSettings (WAL,
+PRAGMA, satu koneksi writer + pool read-only).
+
+Setiap skenario memakai file DB sementara yang diisi --rows laporan, lalu menjalankan
+--writers thread yang meng-INSERT laporan (satu COMMIT per laporan, seperti endpoint)
+dan --readers thread yang membaca halaman daftar + laporan dalam bbox, selama
+--seconds detik. Error "database is locked" dihitung, bukan dihentikan.
+
+Contoh:
+    python -m app.core.bench_database --seconds 10 --writers 2 --readers 8
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from .config import DATABASE_SETTINGS
+from .database import Base, create_session_factory, create_sqlite_engines
+from ..models.report_model import DamageSeverityEnum, Report
+
+# Area sintetis sekitar Jakarta
+_LAT_RANGE = (-6.40, -6.05)
+_LNG_RANGE = (106.65, 107.00)
+
+
+def _random_report(rng: random.Random) -> Report:
+    return Report(
+        lat=rng.uniform(*_LAT_RANGE),
+        lng=rng.uniform(*_LNG_RANGE),
+        damage_type="pothole",
+        severity=rng.choice(list(DamageSeverityEnum)),
+        description="benchmark",
+    )
+
+
+def _seed(session_factory, rows: int):
+    rng = random.Random(0)
+    db = session_factory()
+    try:
+        for start in range(0, rows, 5000):
+            db.add_all(_random_report(rng) for _ in range(min(5000, rows - start)))
+            db.commit()
+    finally:
+        db.close()
+
+
+def _writer_loop(session_factory, stop: threading.Event, stats: dict, seed: int):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        db = session_factory()
+        start = time.perf_counter()
+        try:
+            db.add(_random_report(rng))
+            db.commit()
+            stats["latencies"].append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            db.rollback()
+            stats["errors"] += 1
+        finally:
+            db.close()
+
+
+def _reader_loop(session_factory, stop: threading.Event, stats: dict, seed: int):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        db = session_factory()
+        start = time.perf_counter()
+        try:
+            db.query(Report).order_by(Report.id.desc()).limit(10).all()
+            lat, lng = rng.uniform(*_LAT_RANGE), rng.uniform(*_LNG_RANGE)
+            db.query(Report).filter(
+                Report.lat.between(lat - 0.01, lat + 0.01),
+                Report.lng.between(lng - 0.01, lng + 0.01),
+            ).limit(200).all()
+            db.commit()
+            stats["latencies"].append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            db.rollback()
+            stats["errors"] += 1
+        finally:
+            db.close()
+
+
+def run_scenario(name: str, make_engines, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = f"sqlite:///{Path(tmp_dir) / 'bench.db'}"
+        engine, read_engine = make_engines(url)
+        Base.metadata.create_all(engine)
+        session_factory = create_session_factory(engine, read_engine)
+        _seed(session_factory, args.rows)
+
+        stop = threading.Event()
+        writes = [{"latencies": [], "errors": 0} for _ in range(args.writers)]
+        reads = [{"latencies": [], "errors": 0} for _ in range(args.readers)]
+        threads = [
+            threading.Thread(target=_writer_loop, args=(session_factory, stop, s, i))
+            for i, s in enumerate(writes)
+        ] + [
+            threading.Thread(target=_reader_loop, args=(session_factory, stop, s, 100 + i))
+            for i, s in enumerate(reads)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        engine.dispose()
+        if read_engine is not None:
+            read_engine.dispose()
+
+    def summarize(stats):
+        latencies = sorted(l for s in stats for l in s["latencies"])
+        return {
+            "ops_s": len(latencies) / args.seconds,
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+            "mean_ms": statistics.mean(latencies) if latencies else 0.0,
+            "errors": sum(s["errors"] for s in stats),
+        }
+
+    return {"name": name, "write": summarize(writes), "read": summarize(reads)}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark baca/tulis campuran SQLite")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=50000, help="Laporan awal di DB")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sqlite_settings = DATABASE_SETTINGS.sqlite
+    scenarios = [
+        (
+            "lama",
+            lambda url: (create_engine(url, connect_args={"check_same_thread": False}), None),
+        ),
+        ("profil", lambda url: create_sqlite_engines(url, sqlite_settings)),
+    ]
+    print(
+        f"Benchmark SQLite: {args.writers} writer, {args.readers} reader, "
+        f"{args.rows} laporan awal, {args.seconds:.0f} s per skenario"
+    )
+    print(f"Profil: {sqlite_settings.model_dump()}")
+    print(
+        f"{'skenario':<10}{'tulis/s':>10}{'p95 ms':>10}{'err':>6}"
+        f"{'baca/s':>10}{'p95 ms':>10}{'err':>6}"
+    )
+    for name, make_engines in scenarios:
+        r = run_scenario(name, make_engines, args)
+        w, rd = r["write"], r["read"]
+        print(
+            f"{name:<10}{w['ops_s']:>10.1f}{w['p95_ms']:>10.2f}{w['errors']:>6}"
+            f"{rd['ops_s']:>10.1f}{rd['p95_ms']:>10.2f}{rd['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
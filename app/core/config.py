@@ -1,6 +1,7 @@
 # app/core/config.py
 import os
 from pathlib import Path
+from typing import Dict, Literal, Optional
 
 import yaml
 from pydantic import BaseModel, ValidationError
@@ -12,12 +13,40 @@ CONFIG_FILE_PATH = PROJECT_ROOT / "config.yaml"
 
 
 # --- Pydantic Models for Configuration Structure ---
+class SqliteSettings(BaseModel):
+    # PRAGMA yang dipasang di setiap koneksi SQLite baru (diabaikan untuk DB lain)
+    journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    mmap_size: int = 268435456  # Byte file DB yang dibaca lewat mmap (0 = nonaktif)
+    cache_size: int = -65536  # Page cache per koneksi; negatif = KiB (-65536 = 64 MB)
+    busy_timeout_ms: int = 5000  # Waktu menunggu lock (proses lain) sebelum "database is locked"
+    # Satu koneksi writer (penulisan antar-thread antre di pool) + pool koneksi read-only
+    split_connections: bool = True
+    read_pool_size: int = 8
+
+
 class DatabaseSettings(BaseModel):
     url: str
+    # Thread khusus akses DB dari endpoint async (event loop tidak pernah menunggu DB)
+    executor_workers: int = 4
+    sqlite: SqliteSettings = SqliteSettings()
 
 
 class UploadSettings(BaseModel):
     directory: str
+    # Upload foto di-stream ke disk per chunk; ditolak (413) begitu melewati batas.
+    # Body request create/update laporan sudah dibatasi lebih dulu oleh
+    # RequestBodyLimitMiddleware (app/utils/upload_limit.py) sebelum form di-parse.
+    max_upload_bytes: int = 10 * 1024 * 1024
+    upload_chunk_bytes: int = 256 * 1024
+    # Ruang untuk field form + boundary multipart di atas max_upload_bytes; body request
+    # create/update laporan yang lebih besar ditolak (413) sebelum form di-parse
+    max_form_overhead_bytes: int = 64 * 1024
+    # --- Varian foto laporan (thumbnail), dibuat di background / saat pertama diminta ---
+    thumbnail_sizes: Dict[str, int] = {"sm": 160, "md": 640}  # Nama varian -> sisi terpanjang (px)
+    thumbnail_format: Literal["webp", "jpg"] = "webp"
+    thumbnail_quality: int = 80  # Kualitas encode (0-100)
+    thumbnail_workers: int = 2  # Thread pembuat thumbnail
 
 
 class DetectorSettings(BaseModel):
@@ -26,12 +55,72 @@ class DetectorSettings(BaseModel):
     webcam: int
     threshold: float
     device: str
+    # --- Filter deteksi (vektor, lihat app/external/inference/detections.py) ---
+    class_thresholds: Dict[str, float] = {}  # Threshold per nama kelas (menimpa threshold)
+    min_box_area: float = 0.0  # Luas box minimal (piksel gambar asli)
+    max_detections: Optional[int] = None  # Top-k deteksi per frame
+    # Backend forward: eager (bawaan), torchscript (trace+freeze+fusi, di-cache di disk),
+    # channels_last (eager NHWC untuk oneDNN) atau int8 (checkpoint hasil kuantisasi)
+    backend: Literal["eager", "torchscript", "channels_last", "int8"] = "eager"
+    quantized_model: Optional[str] = None  # Path checkpoint INT8 untuk backend "int8"
+    # Preprocessing tanpa alokasi per frame (hanya untuk input tetap tanpa keep_ratio)
+    fast_preprocess: bool = True
+    # Decode JPEG klien (WS, /detect-image) pada skala IMREAD_REDUCED_* terkecil yang
+    # masih >= ukuran input model; resolusi penuh hanya di-decode untuk frame deteksi
+    reduced_decode: bool = True
+    # Overlay box pada frame hasil: always | on_detection | never (lihat inference/render.py)
+    render_policy: Literal["always", "on_detection", "never"] = "on_detection"
+    # --- Worker inferensi (di luar event loop) ---
+    inference_workers: int = 1  # Jumlah thread worker untuk inferensi
+    inference_queue_size: int = 4  # Maks. frame yang boleh menunggu di antrean
+    torch_threads: int = 1  # torch.set_num_threads per worker
+    opencv_threads: int = 1  # cv2.setNumThreads per worker
+    # --- Micro-batching lintas koneksi ---
+    batch_max_size: int = 8  # Maks. frame per forward pass
+    batch_max_wait_ms: float = 5.0  # Maks. waktu menunggu frame lain sebelum batch dijalankan
+    batch_max_pending: int = 32  # Maks. frame yang menunggu di scheduler
+    # --- Gate perubahan frame untuk LocalDetection ---
+    gate_method: Literal["off", "diff", "hash"] = "diff"
+    gate_diff_threshold: float = 4.0  # Rata-rata selisih grayscale (0-255) minimal
+    gate_hash_threshold: int = 5  # Jarak Hamming dHash (dari 64 bit) minimal
+    gate_max_skip: int = 30  # Maks. frame berturut-turut yang boleh dilewati
+    # --- Supresi deteksi duplikat (spasial-temporal) sebelum laporan disimpan ---
+    suppress_radius_m: float = 25.0  # Deteksi kelas sama dalam radius ini digabung (0 = nonaktif)
+    suppress_window_s: float = 10.0  # Klaster ditutup setelah N detik tanpa deteksi baru
+    suppress_max_age_s: float = 60.0  # Klaster selalu ditutup setelah berumur N detik
+    suppress_max_clusters: int = 1000  # Maks. klaster terbuka di memori
+
+
+class ReportWriterSettings(BaseModel):
+    # Laporan hasil deteksi otomatis ditulis write-behind oleh satu thread background
+    queue_size: int = 1000  # Maks. laporan menunggu di memori; lebihnya ke spill file
+    batch_size: int = 50  # Maks. laporan per transaksi (satu COMMIT)
+    flush_interval_s: float = 2.0  # Maks. waktu laporan menunggu sebelum di-flush
+    spill_file: str = "report_spill.jsonl"  # Relatif ke root proyek
+
+
+class LocationSettings(BaseModel):
+    # Fix GPS disimpan di ring buffer memori; file location_store.json hanya snapshot
+    buffer_size: int = 64  # Jumlah fix terakhir yang disimpan (1 fix/detik dari frontend)
+    persist_interval_s: float = 5.0  # Interval menulis fix terakhir ke disk
+    max_fix_age_s: float = 30.0  # Fix lebih tua dari ini (relatif ke frame) dianggap tidak ada
+    max_extrapolation_s: float = 1.0  # Maks. detik posisi diperkirakan melewati fix terakhir
+    max_clock_skew_s: float = 10.0  # Timestamp klien yang melenceng lebih dari ini diganti waktu server
+
+
+class AdminSettings(BaseModel):
+    # Token untuk endpoint admin (reload/aktivasi model), dikirim di header X-Admin-Token.
+    # Env DAMAGE_ADMIN_TOKEN menimpa nilai ini; jika keduanya kosong endpoint admin ditolak.
+    api_token: Optional[str] = None
 
 
 class AppSettings(BaseModel):
     database: DatabaseSettings
     uploads: UploadSettings
     detector: DetectorSettings
+    report_writer: ReportWriterSettings = ReportWriterSettings()
+    location: LocationSettings = LocationSettings()
+    admin: AdminSettings = AdminSettings()
 
 
 # --- Load Configuration Function ---
@@ -72,9 +161,16 @@ def load_configuration(config_path: Path = CONFIG_FILE_PATH) -> AppSettings:
 try:
     settings = load_configuration()
     DATABASE_URL: str = settings.database.url
+    DATABASE_SETTINGS = settings.database
     # UPLOAD_FILES_DIRECTORY sekarang adalah objek Path absolut
     UPLOAD_FILES_DIRECTORY: Path = PROJECT_ROOT / settings.uploads.directory
+    UPLOAD_SETTINGS = settings.uploads
     DETECTOR_SETTINGS = settings.detector
+    REPORT_WRITER_SETTINGS = settings.report_writer
+    LOCATION_SETTINGS = settings.location
+    ADMIN_API_TOKEN: Optional[str] = (
+        os.environ.get("DAMAGE_ADMIN_TOKEN") or settings.admin.api_token
+    )
 except (FileNotFoundError, ValueError, RuntimeError) as e:
     print(
         f"KRITIKAL: Gagal memuat konfigurasi aplikasi. Aplikasi akan berhenti. Error: {e}"
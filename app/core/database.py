@@ -1,21 +1,114 @@
 # app/core/database.py
-from typing import Generator
+from typing import Generator, Optional, Tuple
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session as SessionType
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 
 from .config import DATABASE_URL  # Impor dari config.py di direktori yang sama
+from .config import DATABASE_SETTINGS, SqliteSettings
 
-# Jika menggunakan SQLite, tambahkan connect_args
+
+def _install_sqlite_pragmas(engine: Engine, sqlite_settings: SqliteSettings, read_only: bool):
+    """Memasang PRAGMA profil SQLite setiap kali pool membuka koneksi baru."""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(sqlite_settings.busy_timeout_ms)}")
+        if not read_only:
+            # journal_mode tersimpan di file DB; cukup diatur dari koneksi writer
+            cursor.execute(f"PRAGMA journal_mode = {sqlite_settings.journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {sqlite_settings.synchronous}")
+        cursor.execute(f"PRAGMA cache_size = {int(sqlite_settings.cache_size)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(sqlite_settings.mmap_size)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+def create_sqlite_engines(
+    url: str, sqlite_settings: SqliteSettings
+) -> Tuple[Engine, Optional[Engine]]:
+    """
+    Membuat engine SQLite sesuai profil: (writer, reader). Jika split_connections aktif,
+    writer hanya punya satu koneksi (thread lain menunggu di pool, bukan berebut lock
+    file) dan reader adalah pool koneksi read-only. Jika tidak, reader = None dan
+    satu engine dipakai untuk semuanya.
+    """
+    connect_args = {"check_same_thread": False}
+    if not sqlite_settings.split_connections:
+        engine = create_engine(url, connect_args=connect_args)
+        _install_sqlite_pragmas(engine, sqlite_settings, read_only=False)
+        return engine, None
+
+    writer = create_engine(
+        url, connect_args=connect_args, poolclass=QueuePool, pool_size=1, max_overflow=0
+    )
+    _install_sqlite_pragmas(writer, sqlite_settings, read_only=False)
+    reader = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=QueuePool,
+        pool_size=max(1, sqlite_settings.read_pool_size),
+        max_overflow=0,
+    )
+    _install_sqlite_pragmas(reader, sqlite_settings, read_only=True)
+    return writer, reader
+
+
+class RoutingSession(SessionType):
+    """
+    Session yang memilih koneksi per statement: flush ORM dan INSERT/UPDATE/DELETE ke
+    engine writer, SELECT ke pool reader. Setelah transaksi pernah menulis, semua
+    statement berikutnya di transaksi itu tetap ke writer agar perubahan yang belum
+    di-commit ikut terbaca (read-your-writes).
+    """
+
+    def __init__(self, *args, writer_engine: Engine, reader_engine: Engine, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer_engine = writer_engine
+        self.reader_engine = reader_engine
+        self._writing = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._writing or self._flushing or isinstance(clause, UpdateBase):
+            self._writing = True
+            return self.writer_engine
+        return self.reader_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing_session(session, transaction):
+    if transaction.parent is None:
+        session._writing = False
+
+
+def create_session_factory(engine: Engine, read_engine: Optional[Engine] = None) -> sessionmaker:
+    if read_engine is None:
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        writer_engine=engine,
+        reader_engine=read_engine,
+    )
+
+
+# Jika menggunakan SQLite, pasang profil koneksi (WAL, PRAGMA, writer tunggal + reader)
 if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine, read_engine = create_sqlite_engines(DATABASE_URL, DATABASE_SETTINGS.sqlite)
 else:
     engine = create_engine(
         DATABASE_URL, pool_pre_ping=True
     )  # pool_pre_ping baik untuk DB eksternal
+    read_engine = None
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = create_session_factory(engine, read_engine)
 
 Base = declarative_base()  # Base untuk model SQLAlchemy kita
 
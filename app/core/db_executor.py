@@ -0,0 +1,36 @@
+# app/core/db_executor.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import DATABASE_SETTINGS
+
+
+class DatabaseExecutor(object):
+    """
+    Thread pool khusus untuk akses database (Session SQLAlchemy sinkron). Endpoint async
+    menjalankan pemanggilan service/repository di sini sehingga query, commit dan
+    refresh tidak pernah berjalan di thread event loop (stream WS deteksi tetap lancar).
+
+    Pool terpisah dari threadpool bawaan FastAPI dan dari worker inferensi, jadi query
+    lambat hanya mengantre di belakang query lain. Satu Session tetap dipakai oleh satu
+    request secara berurutan (tidak pernah bersamaan dari dua thread).
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="db"
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# Satu executor DB untuk seluruh proses; dihentikan oleh event shutdown
+db_executor = DatabaseExecutor(DATABASE_SETTINGS.executor_workers)
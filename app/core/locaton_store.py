@@ -1,11 +1,16 @@
 import json
+import os
 from pathlib import Path
+from typing import Optional
 
 LOCATION_FILE = Path("location_store.json")
 
 
-def update_location(lat: float, lon: float):
-    LOCATION_FILE.write_text(json.dumps({"lat": lat, "lon": lon}))
+def update_location(lat: float, lon: float, timestamp: Optional[float] = None):
+    # Tulis ke file sementara lalu rename: pembaca tidak pernah melihat file setengah jadi
+    tmp_file = LOCATION_FILE.with_name(LOCATION_FILE.name + ".tmp")
+    tmp_file.write_text(json.dumps({"lat": lat, "lon": lon, "timestamp": timestamp}))
+    os.replace(tmp_file, LOCATION_FILE)
 
 
 def get_last_location():
@@ -0,0 +1,10 @@
+# app/core/model_registry.py
+from ..external.inference.registry import create_model_registry
+from .config import DETECTOR_SETTINGS, PROJECT_ROOT
+
+# Satu registry per proses; model dimuat lazily (atau lewat warmup saat startup)
+model_registry = create_model_registry(DETECTOR_SETTINGS, PROJECT_ROOT)
+
+print(
+    f"OK: Model registry dikonfigurasi (default='{model_registry.default_name}', model={model_registry.names()})"
+)
@@ -0,0 +1,184 @@
+# app/external/inference/backends.py
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict
+
+import torch
+
+SUPPORTED_BACKENDS = ("eager", "torchscript", "channels_last", "int8")
+
+# Nama file metadata yang disematkan di checkpoint INT8 (lihat quantize.py)
+QUANT_METADATA_FILE = "quantization.json"
+
+
+class EagerBackend(object):
+    """Graph eager bawaan nanodet (tanpa optimasi tambahan)."""
+
+    name = "eager"
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        return self.model(img)
+
+
+class ChannelsLastBackend(EagerBackend):
+    """
+    Graph eager dengan layout channels-last (NHWC). Di CPU, konvolusi oneDNN
+    bekerja langsung dengan layout ini sehingga konversi layout per layer hilang.
+    """
+
+    name = "channels_last"
+
+    def __init__(self, model, device):
+        torch.backends.mkldnn.enabled = True
+        super().__init__(model.to(memory_format=torch.channels_last), device)
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        return self.model(img.contiguous(memory_format=torch.channels_last))
+
+
+class TorchScriptBackend(object):
+    """
+    Model di-trace sekali pada ukuran input tetap, lalu di-freeze dan dioptimasi
+    (fusi conv+BN+aktivasi, prepack bobot oneDNN). Hasil disimpan di disk di samping
+    checkpoint agar startup berikutnya tidak perlu trace ulang.
+
+    Catatan: ShuffleNetV2 membaca ukuran tensor lewat `x.data.size()`, sehingga
+    bentuk input ikut "terpanggang" ke graph. Karena itu satu modul di-trace per
+    ukuran batch (dibuat saat pertama kali dipakai).
+    """
+
+    name = "torchscript"
+
+    def __init__(self, model, device, model_path: str, input_size):
+        self.model = model
+        self.device = device
+        self.model_path = Path(model_path)
+        self.input_w, self.input_h = input_size
+        self._modules: Dict[int, torch.jit.ScriptModule] = {}
+        self._lock = threading.Lock()
+        self._get_module(1)  # Siapkan batch 1 saat startup
+
+    def cache_path(self, batch_size: int) -> Path:
+        device_tag = str(self.device).replace(":", "")
+        return self.model_path.with_name(
+            f"{self.model_path.stem}.{self.name}.{self.input_w}x{self.input_h}"
+            f".b{batch_size}.{device_tag}.pt"
+        )
+
+    def _get_module(self, batch_size: int) -> torch.jit.ScriptModule:
+        module = self._modules.get(batch_size)
+        if module is not None:
+            return module
+        with self._lock:
+            module = self._modules.get(batch_size)
+            if module is None:
+                module = self._load_or_trace(batch_size)
+                self._modules[batch_size] = module
+        return module
+
+    def _load_or_trace(self, batch_size: int) -> torch.jit.ScriptModule:
+        cache_file = self.cache_path(batch_size)
+        # Cache dianggap basi jika checkpoint lebih baru
+        if (
+            cache_file.is_file()
+            and cache_file.stat().st_mtime >= self.model_path.stat().st_mtime
+        ):
+            try:
+                module = torch.jit.load(str(cache_file), map_location=self.device)
+                print(f"Backend TorchScript: Memuat modul dari cache '{cache_file}'")
+                return self._warmup(module, batch_size)
+            except Exception as e:
+                print(f"Backend TorchScript: Cache '{cache_file}' tidak valid ({e}), trace ulang.")
+
+        example = torch.zeros(
+            (batch_size, 3, self.input_h, self.input_w), device=self.device
+        )
+        with torch.no_grad():
+            traced = torch.jit.trace(self.model, example)
+            module = torch.jit.freeze(traced.eval())
+            module = torch.jit.optimize_for_inference(module)
+        try:
+            torch.jit.save(module, str(cache_file))
+            print(f"Backend TorchScript: Modul di-trace dan disimpan ke '{cache_file}'")
+        except Exception as e:
+            print(f"Backend TorchScript: Gagal menyimpan cache '{cache_file}': {e}")
+        return self._warmup(module, batch_size)
+
+    def _warmup(self, module, batch_size: int):
+        # Profiling executor JIT butuh beberapa run sebelum graph optimal dipakai
+        example = torch.zeros(
+            (batch_size, 3, self.input_h, self.input_w), device=self.device
+        )
+        with torch.no_grad():
+            for _ in range(2):
+                module(example)
+        return module
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        return self._get_module(img.shape[0])(img)
+
+
+class QuantizedBackend(object):
+    """
+    Model INT8 hasil post-training quantization (lihat `python -m app.external.inference.quantize`).
+    Checkpoint berupa modul TorchScript yang di-trace pada batch 1, sehingga batch
+    yang lebih besar dijalankan per gambar lalu hasilnya digabung.
+    """
+
+    name = "int8"
+
+    def __init__(self, quantized_model_path: str):
+        if not quantized_model_path:
+            raise ValueError(
+                "Backend 'int8' membutuhkan 'quantized_model' (path checkpoint INT8) di config."
+            )
+        extra_files = {QUANT_METADATA_FILE: ""}
+        self.module = torch.jit.load(
+            str(quantized_model_path), map_location="cpu", _extra_files=extra_files
+        )
+        self.metadata = (
+            json.loads(extra_files[QUANT_METADATA_FILE])
+            if extra_files[QUANT_METADATA_FILE]
+            else {}
+        )
+        # Engine kuantisasi saat inferensi harus sama dengan saat kalibrasi
+        qengine = self.metadata.get("qengine")
+        if qengine and qengine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = qengine
+        self.module.eval()
+        print(
+            f"Backend INT8: Memuat checkpoint '{quantized_model_path}' (engine={torch.backends.quantized.engine})"
+        )
+
+    def __call__(self, img: torch.Tensor) -> torch.Tensor:
+        img = img.cpu()  # Kernel INT8 hanya tersedia di CPU
+        if img.shape[0] == 1:
+            return self.module(img)
+        return torch.cat([self.module(img[i : i + 1]) for i in range(img.shape[0])])
+
+
+def build_backend(
+    backend: str,
+    model,
+    device,
+    model_path: str,
+    input_size,
+    quantized_model_path: str = None,
+) -> Callable[[torch.Tensor], torch.Tensor]:
+    """Membuat fungsi forward (img -> preds) sesuai nama backend dari config."""
+    if backend == "eager":
+        return EagerBackend(model, device)
+    if backend == "channels_last":
+        return ChannelsLastBackend(model, device)
+    if backend == "torchscript":
+        return TorchScriptBackend(model, device, model_path, input_size)
+    if backend == "int8":
+        return QuantizedBackend(quantized_model_path)
+    raise ValueError(
+        f"Backend inferensi '{backend}' tidak dikenal. Pilihan: {SUPPORTED_BACKENDS}"
+    )
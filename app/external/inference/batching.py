@@ -0,0 +1,157 @@
+# app/external/inference/batching.py
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Set, Tuple
+
+from .executor import InferenceExecutor, InferenceQueueFull
+
+
+class BatchScheduler:
+    """
+    Micro-batching lintas koneksi untuk Predictor.
+
+    Frame dari semua klien dikumpulkan paling lama `max_wait_ms` (atau sampai
+    `max_batch_size`), lalu dijalankan dalam satu forward pass di worker inferensi.
+    Frame diambil secara round-robin per klien sehingga satu klien yang mengirim
+    banyak frame tidak membuat klien lain kelaparan.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        executor: InferenceExecutor,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        max_pending: int = 32,
+    ):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_pending = max(self.max_batch_size, max_pending)
+
+        # Antrean per klien + urutan round-robin kunci klien yang punya frame
+        self._queues: Dict[Hashable, Deque[Tuple[Any, asyncio.Future]]] = {}
+        self._round_robin: Deque[Hashable] = deque()
+        self._pending = 0
+        self._has_work: asyncio.Event = None
+        self._slots: asyncio.Semaphore = None
+        self._task: asyncio.Task = None
+        # asyncio hanya menyimpan weak reference ke task: batch yang sedang berjalan
+        # dipegang di sini (beserta frame-nya) agar tidak di-GC sebelum future terisi
+        self._tasks: Set[asyncio.Task] = set()
+        self._running: Dict[asyncio.Task, List[Tuple[Any, asyncio.Future]]] = {}
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            # Primitive asyncio dibuat di dalam loop yang sedang berjalan
+            self._has_work = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.executor.num_workers)
+            self._task = asyncio.get_running_loop().create_task(self._dispatch_loop())
+
+    async def submit(self, client_key: Hashable, item: Any) -> Any:
+        """
+        Mengantrekan satu item (gambar) untuk klien `client_key` dan menunggu hasilnya.
+        Melempar InferenceQueueFull jika jumlah frame yang menunggu sudah mencapai batas.
+        """
+        self._ensure_started()
+        if self._pending >= self.max_pending:
+            raise InferenceQueueFull(
+                f"Antrean batch penuh ({self._pending}/{self.max_pending})."
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(client_key)
+        if queue is None:
+            queue = self._queues[client_key] = deque()
+            self._round_robin.append(client_key)
+        queue.append((item, future))
+        self._pending += 1
+        self._has_work.set()
+        return await future
+
+    def _take_round_robin(self) -> List[Tuple[Any, asyncio.Future]]:
+        batch = []
+        while self._round_robin and len(batch) < self.max_batch_size:
+            client_key = self._round_robin.popleft()
+            queue = self._queues[client_key]
+            item, future = queue.popleft()
+            self._pending -= 1
+            if not future.cancelled():  # Klien sudah terputus
+                batch.append((item, future))
+            if queue:
+                self._round_robin.append(client_key)
+            else:
+                del self._queues[client_key]
+        return batch
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_work.wait()
+            # Tunggu worker bebas dulu; selama menunggu, frame terus terkumpul
+            await self._slots.acquire()
+
+            deadline = loop.time() + self.max_wait
+            while self._pending < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._has_work.clear()
+                try:
+                    await asyncio.wait_for(self._has_work.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take_round_robin()
+            if self._pending == 0:
+                self._has_work.clear()
+            else:
+                self._has_work.set()
+
+            if not batch:
+                self._slots.release()
+                continue
+            task = loop.create_task(self._run(batch))
+            self._tasks.add(task)
+            self._running[task] = batch
+            task.add_done_callback(self._forget_task)
+
+    def _forget_task(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._running.pop(task, None)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            items = [item for item, _ in batch]
+            results = await self.executor.run(self.run_batch, items, bounded=False)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        """Menghentikan dispatcher dan batch yang berjalan; semua frame yang belum selesai
+        (menunggu maupun sedang diinferensi) menerima RuntimeError."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        error = RuntimeError("Batch scheduler dihentikan.")
+        for task in list(self._tasks):
+            task.cancel()
+            for _, future in self._running.get(task, ()):
+                if not future.done():
+                    future.set_exception(error)
+        for queue in self._queues.values():
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(error)
+        self._queues.clear()
+        self._round_robin.clear()
+        self._pending = 0
@@ -0,0 +1,205 @@
+# app/external/inference/detections.py
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from nanodet.data.transform.warp import warp_boxes
+
+# Kolom array deteksi (N x 6, float32)
+CLASS, X0, Y0, X1, Y1, SCORE = range(6)
+
+
+class Detections(object):
+    """
+    Hasil deteksi satu gambar dalam satu array NumPy N x 6 float32:
+    (class, x0, y0, x1, y1, score) dalam koordinat gambar asli.
+    Semua operasi filter bersifat vektor (tanpa loop Python per box).
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Optional[np.ndarray] = None):
+        if data is None:
+            data = np.empty((0, 6), dtype=np.float32)
+        self.data = np.ascontiguousarray(data, dtype=np.float32).reshape(-1, 6)
+
+    @classmethod
+    def from_label_dict(cls, dets: Dict[int, list]) -> "Detections":
+        """Konversi dari format lama nanodet {label: [[x0, y0, x1, y1, score], ...]}."""
+        rows = [
+            np.column_stack(
+                [np.full(len(bboxes), label, dtype=np.float32), np.asarray(bboxes, np.float32)]
+            )
+            for label, bboxes in dets.items()
+            if len(bboxes)
+        ]
+        return cls(np.concatenate(rows) if rows else None)
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self.data[:, CLASS].astype(np.int64)
+
+    @property
+    def boxes(self) -> np.ndarray:
+        return self.data[:, X0 : Y1 + 1]
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self.data[:, SCORE]
+
+    @property
+    def areas(self) -> np.ndarray:
+        return (self.data[:, X1] - self.data[:, X0]) * (self.data[:, Y1] - self.data[:, Y0])
+
+    def filter(
+        self,
+        score_thres: float = 0.0,
+        class_thres: Optional[np.ndarray] = None,
+        min_area: float = 0.0,
+        max_area: Optional[float] = None,
+        top_k: Optional[int] = None,
+    ) -> "Detections":
+        """
+        Menyaring deteksi lalu mengurutkan berdasarkan skor (tertinggi dulu).
+        `class_thres` adalah array threshold per indeks kelas (menimpa `score_thres`).
+        """
+        data = self.data
+        if class_thres is not None:
+            keep = data[:, SCORE] > class_thres[data[:, CLASS].astype(np.int64)]
+        else:
+            keep = data[:, SCORE] > score_thres
+        if min_area or max_area is not None:
+            areas = self.areas
+            if min_area:
+                keep &= areas >= min_area
+            if max_area is not None:
+                keep &= areas <= max_area
+        data = data[keep]
+
+        if top_k is not None and len(data) > top_k:
+            data = data[np.argpartition(-data[:, SCORE], top_k - 1)[:top_k]]
+        return Detections(data[np.argsort(-data[:, SCORE], kind="stable")])
+
+    def best(self) -> Optional[np.ndarray]:
+        """Baris dengan skor tertinggi, atau None jika kosong."""
+        if not len(self):
+            return None
+        return self.data[int(np.argmax(self.data[:, SCORE]))]
+
+    def best_class_name(self, class_names: Sequence[str]) -> Optional[str]:
+        best = self.best()
+        return None if best is None else class_names[int(best[CLASS])]
+
+    def scale(self, sx: float, sy: float) -> "Detections":
+        data = self.data.copy()
+        data[:, [X0, X1]] *= sx
+        data[:, [Y0, Y1]] *= sy
+        return Detections(data)
+
+    def to_label_dict(self, num_classes: int) -> Dict[int, list]:
+        """Konversi ke format lama nanodet (untuk fungsi visualisasi bawaan)."""
+        labels = self.labels
+        return {
+            i: self.data[labels == i, X0:].tolist() for i in range(num_classes)
+        }
+
+    def to_list(self, class_names: Sequence[str]) -> List[dict]:
+        return [
+            {
+                "label": int(row[CLASS]),
+                "class": class_names[int(row[CLASS])],
+                "score": round(float(row[SCORE]), 4),
+                "box": [round(float(v), 1) for v in row[X0 : Y1 + 1]],
+            }
+            for row in self.data
+        ]
+
+
+def _as_numpy(value):
+    if isinstance(value, torch.Tensor):
+        return value.cpu().numpy()
+    return value
+
+
+def detections_from_head(head, preds: torch.Tensor, meta: dict) -> Dict[int, Detections]:
+    """
+    Membangun Detections langsung dari output head (pengganti head.post_process yang
+    membuat dict list Python per kelas). Box di-warp balik ke koordinat gambar asli.
+    """
+    cls_scores, bbox_preds = preds.split(
+        [head.num_classes, 4 * (head.reg_max + 1)], dim=-1
+    )
+    result_list = head.get_bboxes(cls_scores, bbox_preds, meta)
+
+    img_info = meta["img_info"]
+    results = {}
+    for (det_bboxes, det_labels), width, height, img_id, warp_matrix in zip(
+        result_list,
+        _as_numpy(img_info["width"]),
+        _as_numpy(img_info["height"]),
+        _as_numpy(img_info["id"]),
+        meta["warp_matrix"],
+    ):
+        det_bboxes = det_bboxes.detach().cpu().numpy()
+        data = np.empty((det_bboxes.shape[0], 6), dtype=np.float32)
+        data[:, CLASS] = det_labels.detach().cpu().numpy()
+        data[:, X0 : Y1 + 1] = warp_boxes(
+            det_bboxes[:, :4], np.linalg.inv(warp_matrix), width, height
+        )
+        data[:, SCORE] = det_bboxes[:, 4]
+        results[int(img_id)] = Detections(data)
+    return results
+
+
+class DetectionFilter(object):
+    """
+    Filter deteksi dari DetectorSettings: threshold global, threshold per kelas
+    (berdasarkan nama kelas), luas box minimal dan top-k. Array threshold per kelas
+    di-cache per daftar class_names (bisa berbeda antar model).
+    """
+
+    def __init__(
+        self,
+        score_thres: float,
+        class_thresholds: Optional[Dict[str, float]] = None,
+        min_area: float = 0.0,
+        top_k: Optional[int] = None,
+    ):
+        self.score_thres = score_thres
+        self.class_thresholds = class_thresholds or {}
+        self.min_area = min_area
+        self.top_k = top_k
+        self._class_thres_cache: Dict[tuple, np.ndarray] = {}
+
+    def _class_thres(self, class_names: Sequence[str]) -> Optional[np.ndarray]:
+        if not self.class_thresholds:
+            return None
+        key = tuple(class_names)
+        thres = self._class_thres_cache.get(key)
+        if thres is None:
+            thres = np.array(
+                [self.class_thresholds.get(name, self.score_thres) for name in class_names],
+                dtype=np.float32,
+            )
+            self._class_thres_cache[key] = thres
+        return thres
+
+    def __call__(self, dets: Detections, class_names: Sequence[str]) -> Detections:
+        return dets.filter(
+            score_thres=self.score_thres,
+            class_thres=self._class_thres(class_names),
+            min_area=self.min_area,
+            top_k=self.top_k,
+        )
+
+
+def create_detection_filter(detector_settings) -> DetectionFilter:
+    return DetectionFilter(
+        score_thres=detector_settings.threshold,
+        class_thresholds=detector_settings.class_thresholds,
+        min_area=detector_settings.min_box_area,
+        top_k=detector_settings.max_detections,
+    )
@@ -0,0 +1,90 @@
+# app/external/inference/executor.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import cv2
+import torch
+
+
+class InferenceQueueFull(Exception):
+    """Dilempar saat antrean inferensi penuh; pemanggil harus menolak frame (backpressure)."""
+
+
+class InferenceExecutor:
+    """
+    Pool thread khusus untuk pekerjaan berat per frame (decode, inferensi, visualisasi, encode).
+    Event loop hanya melakukan I/O; jumlah pekerjaan yang sedang berjalan + menunggu dibatasi
+    sehingga klien mendapat penolakan eksplisit alih-alih latensi yang terus bertambah.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = 1,
+        queue_size: int = 4,
+        torch_threads: int = 1,
+        opencv_threads: int = 1,
+    ):
+        self.num_workers = max(1, num_workers)
+        self.max_pending = self.num_workers + max(0, queue_size)
+        self.torch_threads = max(1, torch_threads)
+        self.opencv_threads = max(0, opencv_threads)
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_workers,
+            thread_name_prefix="inference",
+            initializer=self._init_worker,
+        )
+
+    def _init_worker(self):
+        # Dipanggil sekali di setiap thread worker saat thread dibuat
+        torch.set_num_threads(self.torch_threads)
+        cv2.setNumThreads(self.opencv_threads)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def is_full(self) -> bool:
+        return self._pending >= self.max_pending
+
+    async def run(
+        self, fn: Callable[..., Any], *args, bounded: bool = True, **kwargs
+    ) -> Any:
+        """
+        Menjalankan `fn` di worker inferensi. Harus dipanggil dari event loop.
+        Melempar InferenceQueueFull jika kapasitas (worker + antrean) sudah habis.
+        `bounded=False` dipakai untuk pekerjaan yang slot-nya sudah dijatah di tempat lain
+        (misalnya batch dari BatchScheduler atau tahap akhir frame yang sudah diinferensi).
+        """
+        if bounded and self.is_full():
+            raise InferenceQueueFull(
+                f"Antrean inferensi penuh ({self._pending}/{self.max_pending})."
+            )
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._pending -= 1
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        print("Inference Executor: Worker inferensi dihentikan.")
+
+
+def create_inference_executor(detector_settings) -> InferenceExecutor:
+    """Membuat executor dengan ukuran dari DetectorSettings."""
+    executor = InferenceExecutor(
+        num_workers=detector_settings.inference_workers,
+        queue_size=detector_settings.inference_queue_size,
+        torch_threads=detector_settings.torch_threads,
+        opencv_threads=detector_settings.opencv_threads,
+    )
+    print(
+        f"OK: Inference Executor dibuat (workers={executor.num_workers}, maks. pending={executor.max_pending})"
+    )
+    return executor
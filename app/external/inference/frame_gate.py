@@ -0,0 +1,87 @@
+# app/external/inference/frame_gate.py
+import cv2
+import numpy as np
+
+GATE_METHODS = ("off", "diff", "hash")
+
+
+class FrameChangeGate(object):
+    """
+    Tahap murah sebelum inferensi: membandingkan frame baru dengan frame terakhir
+    yang diinferensi. Frame yang praktis sama (kendaraan berhenti di lampu merah)
+    dilewati. Setelah `max_skip` frame berturut-turut dilewati, frame berikutnya
+    selalu diinferensi agar perubahan perlahan tetap tertangkap.
+
+    Metode:
+      - "diff": rata-rata selisih absolut grayscale pada resolusi kecil (0-255)
+      - "hash": jarak Hamming difference-hash (dHash) 64-bit
+      - "off" : semua frame diinferensi
+    """
+
+    def __init__(
+        self,
+        method: str = "diff",
+        diff_threshold: float = 4.0,
+        hash_threshold: int = 5,
+        max_skip: int = 30,
+        diff_size: int = 64,
+    ):
+        if method not in GATE_METHODS:
+            raise ValueError(f"Metode gate '{method}' tidak dikenal. Pilihan: {GATE_METHODS}")
+        self.method = method
+        self.diff_threshold = diff_threshold
+        self.hash_threshold = hash_threshold
+        self.max_skip = max(0, max_skip)
+        self.diff_size = diff_size
+        self.reset()
+
+    def reset(self):
+        self._reference = None
+        self._skipped_in_row = 0
+        self.inferred = 0
+        self.skipped = 0
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if self.method == "hash":
+            small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+            return small[:, 1:] > small[:, :-1]  # 8x8 bit
+        return cv2.resize(
+            gray, (self.diff_size, self.diff_size), interpolation=cv2.INTER_AREA
+        )
+
+    def _changed(self, signature: np.ndarray) -> bool:
+        if self.method == "hash":
+            distance = np.count_nonzero(signature != self._reference)
+            return distance >= self.hash_threshold
+        return float(cv2.absdiff(signature, self._reference).mean()) >= self.diff_threshold
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        if self.method == "off":
+            self.inferred += 1
+            return True
+
+        signature = self._signature(frame)
+        if (
+            self._reference is None
+            or self._skipped_in_row >= self.max_skip
+            or self._changed(signature)
+        ):
+            # Referensi selalu frame terakhir yang diinferensi
+            self._reference = signature
+            self._skipped_in_row = 0
+            self.inferred += 1
+            return True
+
+        self._skipped_in_row += 1
+        self.skipped += 1
+        return False
+
+
+def create_frame_gate(detector_settings) -> FrameChangeGate:
+    return FrameChangeGate(
+        method=detector_settings.gate_method,
+        diff_threshold=detector_settings.gate_diff_threshold,
+        hash_threshold=detector_settings.gate_hash_threshold,
+        max_skip=detector_settings.gate_max_skip,
+    )
@@ -1,5 +1,4 @@
 import os
-import time
 
 import cv2
 import torch
@@ -11,12 +10,26 @@ from nanodet.util import Logger, cfg, load_config, load_model_weight
 from nanodet.util.path import mkdir
 from nanodet.util.visualization import overlay_bbox_cv
 
+from .backends import build_backend
+from .detections import detections_from_head
+from .preprocess import FastPreprocessor
+from .render import BoxRenderer
+
 image_ext = [".jpg", ".jpeg", ".webp", ".bmp", ".png"]
 video_ext = ["mp4", "mov", "avi", "mkv"]
 
 
 class Predictor(object):
-    def __init__(self, cfg, model_path, logger, device="cuda:0"):
+    def __init__(
+        self,
+        cfg,
+        model_path,
+        logger,
+        device="cuda:0",
+        backend="eager",
+        quantized_model_path=None,
+        fast_preprocess=True,
+    ):
         self.cfg = cfg
         self.device = device
         model = build_model(cfg.model)
@@ -31,9 +44,23 @@ class Predictor(object):
             model = repvgg_det_model_convert(model, deploy_model)
         self.model = model.to(device).eval()
         self.pipeline = Pipeline(cfg.data.val.pipeline, cfg.data.val.keep_ratio)
+        # Jalur cepat tanpa alokasi per frame; None jika config tidak cocok (keep_ratio dsb.)
+        self.fast_preprocessor = (
+            FastPreprocessor.from_cfg(cfg, device) if fast_preprocess else None
+        )
+        self.renderer = BoxRenderer()
+        # Fungsi forward (img -> preds); post-process tetap memakai head model eager
+        self.backend = build_backend(
+            backend,
+            self.model,
+            device,
+            model_path,
+            cfg.data.val.input_size,
+            quantized_model_path=quantized_model_path,
+        )
 
-    def inference(self, img):
-        img_info = {"id": 0}
+    def _prepare_meta(self, img, img_id=0):
+        img_info = {"id": img_id}
         if isinstance(img, str):
             img_info["file_name"] = os.path.basename(img)
             img = cv2.imread(img)
@@ -46,21 +73,62 @@ class Predictor(object):
         meta = dict(img_info=img_info, raw_img=img, img=img)
         meta = self.pipeline(None, meta, self.cfg.data.val.input_size)
         meta["img"] = torch.from_numpy(meta["img"].transpose(2, 0, 1)).to(self.device)
-        meta = naive_collate([meta])
-        meta["img"] = stack_batch_img(meta["img"], divisible=32)
+        return meta
+
+    def _run_model(self, meta):
         with torch.no_grad():
-            results = self.model.inference(meta)
+            preds = self.backend(meta["img"])
+            # {img_id: Detections} langsung dari output head (tanpa dict list per kelas)
+            return detections_from_head(self.model.head, preds, meta)
+
+    def _collate_batch(self, imgs):
+        """Meta ter-collate untuk satu forward pass (jalur cepat jika tersedia)."""
+        if self.fast_preprocessor is not None:
+            imgs = [cv2.imread(img) if isinstance(img, str) else img for img in imgs]
+            return self.fast_preprocessor.build_meta(imgs)
+        meta = naive_collate(
+            [self._prepare_meta(img, img_id=i) for i, img in enumerate(imgs)]
+        )
+        meta["img"] = stack_batch_img(meta["img"], divisible=32)
+        return meta
+
+    def inference(self, img):
+        meta = self._collate_batch([img])
+        results = self._run_model(meta)
         return meta, results
 
+    def inference_batch(self, imgs):
+        """
+        Inferensi banyak gambar dalam satu forward pass.
+        Mengembalikan list (meta, res) per gambar dengan kontrak yang sama seperti
+        inference(): meta["raw_img"][0] adalah gambar asli dan res[0] adalah deteksinya.
+        """
+        batch_meta = self._collate_batch(imgs)
+        results = self._run_model(batch_meta)
+
+        img_info = batch_meta["img_info"]
+        outputs = []
+        for i in range(len(imgs)):
+            single_meta = {
+                "img_info": {
+                    "id": [0],
+                    "file_name": [img_info["file_name"][i]],
+                    "height": [img_info["height"][i]],
+                    "width": [img_info["width"][i]],
+                },
+                "raw_img": [batch_meta["raw_img"][i]],
+                "warp_matrix": [batch_meta["warp_matrix"][i]],
+                "img": batch_meta["img"][i : i + 1],
+            }
+            outputs.append((single_meta, {0: results[i]}))
+        return outputs
+
     def visualize(self, dets, meta, class_names, score_thres, wait=0):
-        time1 = time.time()
-        result_img = self.model.head.show_result(
-            meta["raw_img"][0], dets, class_names, score_thres=score_thres, show=True
+        # Headless: hanya box di atas threshold, tanpa jendela GUI (lihat render.py)
+        result_img = self.renderer.render(
+            meta["raw_img"][0], dets, class_names, score_thres
         )
-
         class_text = self.overlay_bbox_cv(dets, class_names, score_thres)
-
-        print("viz time: {:.3f}s".format(time.time() - time1))
         return result_img, class_text
 
     def get_image_list(path):
@@ -74,14 +142,5 @@ class Predictor(object):
         return image_names
 
     def overlay_bbox_cv(self, dets, class_names, score_thresh):
-        all_box = []
-        for label in dets:
-            for bbox in dets[label]:
-                score = bbox[-1]
-                if score > score_thresh:
-                    x0, y0, x1, y1 = [int(i) for i in bbox[:4]]
-                    all_box.append([label, x0, y0, x1, y1, score])
-        all_box.sort(key=lambda v: v[5])
-        for box in all_box:
-            label, x0, y0, x1, y1, score = box
-            return class_names[label]
+        # Kelas dari box dengan skor tertinggi di atas threshold (None jika tidak ada)
+        return dets.filter(score_thres=score_thresh).best_class_name(class_names)
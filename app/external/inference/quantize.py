@@ -0,0 +1,336 @@
+# app/external/inference/quantize.py
+"""
+Post-training quantization (INT8) untuk detektor NanoDet.
+
+Kalibrasi memakai frame yang sudah tersimpan di direktori upload (semua `*.jpg`,
+termasuk direktori shard media store), lalu menghasilkan checkpoint INT8 (modul TorchScript)
+beserta laporan perbandingan akurasi/latensi terhadap jalur FP32. Backbone dikuantisasi
+utuh; FPN dan head per blok konvolusi (lihat `quantize_model`).
+
+Contoh:
+    python -m app.external.inference.quantize \\
+        --output app/external/models/nanodet_plus256.int8.pt \\
+        --report quantization_report.json
+
+Setelah itu set `backend: "int8"` dan `quantized_model: <output>` di config.yaml.
+"""
+import argparse
+import copy
+import json
+import platform
+import random
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from torch import nn
+from nanodet.data.batch_process import stack_batch_img
+from nanodet.data.collate import naive_collate
+from nanodet.util import Logger, cfg, load_config
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+from .backends import QUANT_METADATA_FILE
+from .predictor import Predictor
+
+# Media store menamai file dengan sha256 isinya (frame deteksi lama: detected_frame_*.jpg),
+# jadi semua JPEG jalan di direktori upload dipakai sebagai kalibrasi
+CALIBRATION_PATTERN = "*.jpg"
+
+# forward GhostPAN/NanoDetPlusHead memakai len()/zip() atas list fitur sehingga tidak
+# bisa di-trace FX; yang dikuantisasi adalah blok konvolusi (ModuleList) di dalamnya.
+FPN_QUANT_BLOCKS = (
+    "reduce_layers",
+    "top_down_blocks",
+    "downsamples",
+    "bottom_up_blocks",
+    "extra_lvl_in_conv",
+    "extra_lvl_out_conv",
+)
+HEAD_QUANT_BLOCKS = ("cls_convs", "gfl_cls")
+
+
+def _default_qengine() -> str:
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64") or machine.startswith("arm"):
+        return "qnnpack"
+    return "fbgemm"
+
+
+def collect_frames(calib_dir: Path, limit: int, seed: int = 0):
+    frames = sorted(calib_dir.rglob(CALIBRATION_PATTERN))
+    random.Random(seed).shuffle(frames)
+    return frames[:limit]
+
+
+def _prepare_input(predictor: Predictor, path: Path):
+    img = cv2.imread(str(path))
+    if img is None:
+        return None
+    single = predictor._prepare_meta(img)
+    batch_meta = naive_collate([single])
+    batch_meta["img"] = stack_batch_img(batch_meta["img"], divisible=32).cpu()
+    return batch_meta
+
+
+class _TracedBlock(nn.Module):
+    """
+    Pembungkus satu blok untuk prepare_fx: FX hanya melihat satu input, sehingga
+    argumen default blok (mis. `norm=True` di ConvModule) tetap konstanta Python.
+    """
+
+    def __init__(self, block: nn.Module):
+        super().__init__()
+        self.block = block
+
+    def forward(self, x):
+        return self.block(x)
+
+
+def _quant_blocks(model):
+    """(ModuleList, indeks) setiap blok konvolusi FPN/head yang dikuantisasi sendiri-sendiri."""
+    for owner, names in ((model.fpn, FPN_QUANT_BLOCKS), (model.head, HEAD_QUANT_BLOCKS)):
+        for name in names:
+            blocks = getattr(owner, name, None)
+            if isinstance(blocks, nn.ModuleList):
+                for i in range(len(blocks)):
+                    yield blocks, i
+
+
+def quantize_model(float_model, calibration_inputs, qengine: str):
+    """
+    Kuantisasi FX graph mode untuk backbone (bisa di-trace utuh) dan untuk setiap blok
+    konvolusi FPN/head secara terpisah. forward FPN/head (percabangan Python atas list
+    fitur, upsample dan concat) tetap berjalan apa adanya di FP32 di antara blok INT8.
+    """
+    torch.backends.quantized.engine = qengine
+    qconfig_mapping = get_default_qconfig_mapping(qengine)
+    model = copy.deepcopy(float_model).cpu().eval()
+    blocks = list(_quant_blocks(model))
+
+    # Contoh input tiap blok direkam dari satu forward FP32 (dibutuhkan prepare_fx)
+    example = calibration_inputs[0]["img"]
+    block_examples = {}
+    hooks = [
+        module_list[i].register_forward_pre_hook(
+            lambda module, args: block_examples.setdefault(id(module), args[0])
+        )
+        for module_list, i in blocks
+    ]
+    with torch.no_grad():
+        model(example)
+    for hook in hooks:
+        hook.remove()
+
+    model.backbone = prepare_fx(model.backbone, qconfig_mapping, (example,))
+    prepared = []
+    for module_list, i in blocks:
+        block_example = block_examples.get(id(module_list[i]))
+        if block_example is None:
+            continue  # Blok tidak dipakai saat inferensi
+        module_list[i] = prepare_fx(
+            _TracedBlock(module_list[i]), qconfig_mapping, (block_example,)
+        )
+        prepared.append((module_list, i))
+
+    with torch.no_grad():
+        for batch_meta in calibration_inputs:
+            model(batch_meta["img"])
+
+    model.backbone = convert_fx(model.backbone)
+    for module_list, i in prepared:
+        module_list[i] = convert_fx(module_list[i])
+    print(
+        f"Quantize: Backbone + {len(prepared)} blok konvolusi FPN/head dikuantisasi ({qengine})."
+    )
+    return model.eval()
+
+
+def _forward_latency(forward, img, repeats: int):
+    timings = []
+    with torch.no_grad():
+        forward(img)  # warmup
+        for _ in range(repeats):
+            start = time.perf_counter()
+            preds = forward(img)
+            timings.append((time.perf_counter() - start) * 1000.0)
+    return preds, timings
+
+
+def _flatten_dets(dets: dict, score_thres: float):
+    boxes = []
+    for label, bboxes in dets.items():
+        for bbox in bboxes:
+            if bbox[-1] > score_thres:
+                boxes.append((label, np.asarray(bbox[:4], dtype=np.float32), bbox[-1]))
+    return boxes
+
+
+def _iou(a, b) -> float:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x1 - x0) * max(0.0, y1 - y0)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+def _match(reference, candidate, iou_thres: float):
+    """Mencocokkan deteksi INT8 ke deteksi FP32 (kelas sama, IoU >= iou_thres)."""
+    used = set()
+    matched_score_diffs = []
+    for label, box, score in sorted(reference, key=lambda d: -d[2]):
+        best_j, best_iou = None, iou_thres
+        for j, (c_label, c_box, _) in enumerate(candidate):
+            if j in used or c_label != label:
+                continue
+            iou = _iou(box, c_box)
+            if iou >= best_iou:
+                best_j, best_iou = j, iou
+        if best_j is not None:
+            used.add(best_j)
+            matched_score_diffs.append(abs(score - candidate[best_j][2]))
+    return len(used), matched_score_diffs
+
+
+def _summary(timings):
+    arr = np.asarray(timings)
+    return {
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+    }
+
+
+def compare(predictor: Predictor, int8_module, eval_inputs, score_thres, iou_thres, repeats):
+    fp32_timings, int8_timings = [], []
+    ref_total = cand_total = matched_total = 0
+    score_diffs = []
+    head = predictor.model.head
+    for batch_meta in eval_inputs:
+        img = batch_meta["img"]
+        fp32_preds, t_fp32 = _forward_latency(predictor.model, img, repeats)
+        int8_preds, t_int8 = _forward_latency(int8_module, img, repeats)
+        fp32_timings.extend(t_fp32)
+        int8_timings.extend(t_int8)
+
+        fp32_dets = _flatten_dets(head.post_process(fp32_preds, batch_meta)[0], score_thres)
+        int8_dets = _flatten_dets(head.post_process(int8_preds, batch_meta)[0], score_thres)
+        matched, diffs = _match(fp32_dets, int8_dets, iou_thres)
+        ref_total += len(fp32_dets)
+        cand_total += len(int8_dets)
+        matched_total += matched
+        score_diffs.extend(diffs)
+
+    precision = matched_total / cand_total if cand_total else 1.0
+    recall = matched_total / ref_total if ref_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    fp32_latency = _summary(fp32_timings)
+    int8_latency = _summary(int8_timings)
+    return {
+        "images": len(eval_inputs),
+        "score_threshold": score_thres,
+        "iou_threshold": iou_thres,
+        "fp32_detections": ref_total,
+        "int8_detections": cand_total,
+        "matched": matched_total,
+        # Akurasi INT8 relatif terhadap FP32 (FP32 dianggap referensi)
+        "agreement_precision": round(precision, 4),
+        "agreement_recall": round(recall, 4),
+        "agreement_f1": round(f1, 4),
+        "mean_abs_score_diff": round(float(np.mean(score_diffs)), 4) if score_diffs else None,
+        "fp32_latency": fp32_latency,
+        "int8_latency": int8_latency,
+        "speedup": round(fp32_latency["mean_ms"] / int8_latency["mean_ms"], 3)
+        if int8_latency["mean_ms"]
+        else None,
+    }
+
+
+def parse_args():
+    from ...core.config import DETECTOR_SETTINGS, UPLOAD_FILES_DIRECTORY
+
+    parser = argparse.ArgumentParser(description="Kuantisasi INT8 detektor NanoDet")
+    parser.add_argument("--config", default=DETECTOR_SETTINGS.config)
+    parser.add_argument("--model", default=DETECTOR_SETTINGS.model)
+    parser.add_argument("--calib-dir", default=str(UPLOAD_FILES_DIRECTORY))
+    parser.add_argument("--num-calib", type=int, default=100)
+    parser.add_argument("--num-eval", type=int, default=50)
+    parser.add_argument(
+        "--output",
+        default=str(Path(DETECTOR_SETTINGS.model).with_suffix(".int8.pt")),
+    )
+    parser.add_argument("--report", default="quantization_report.json")
+    parser.add_argument("--qengine", default=_default_qengine(), choices=["fbgemm", "qnnpack", "x86"])
+    parser.add_argument("--score-threshold", type=float, default=DETECTOR_SETTINGS.threshold)
+    parser.add_argument("--iou-threshold", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=5)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    torch.set_num_threads(1)  # Latensi per inti, sama seperti worker inferensi
+
+    load_config(cfg, args.config)
+    logger = Logger(0, use_tensorboard=False)
+    predictor = Predictor(cfg, args.model, logger, device="cpu")
+
+    frames = collect_frames(Path(args.calib_dir), args.num_calib + args.num_eval)
+    if len(frames) < 2:
+        raise SystemExit(
+            f"Butuh minimal 2 frame '{CALIBRATION_PATTERN}' di '{args.calib_dir}', ditemukan {len(frames)}."
+        )
+    inputs = [m for m in (_prepare_input(predictor, f) for f in frames) if m is not None]
+    # Frame kalibrasi dan evaluasi dipisah agar laporan tidak bias
+    num_calib = min(args.num_calib, max(1, len(inputs) // 2))
+    calibration_inputs, eval_inputs = inputs[:num_calib], inputs[num_calib:]
+    print(f"Quantize: {len(calibration_inputs)} frame kalibrasi, {len(eval_inputs)} frame evaluasi.")
+
+    int8_model = quantize_model(predictor.model, calibration_inputs, args.qengine)
+    with torch.no_grad():
+        int8_module = torch.jit.freeze(
+            torch.jit.trace(int8_model, calibration_inputs[0]["img"]).eval()
+        )
+
+    report = compare(
+        predictor,
+        int8_module,
+        eval_inputs,
+        args.score_threshold,
+        args.iou_threshold,
+        args.repeats,
+    )
+    metadata = {
+        "qengine": args.qengine,
+        "source_model": str(args.model),
+        "config": str(args.config),
+        "calibration_frames": len(calibration_inputs),
+        "input_size": list(cfg.data.val.input_size),
+    }
+    torch.jit.save(
+        int8_module, args.output, _extra_files={QUANT_METADATA_FILE: json.dumps(metadata)}
+    )
+    report["checkpoint"] = {
+        "path": args.output,
+        "fp32_size_bytes": Path(args.model).stat().st_size,
+        "int8_size_bytes": Path(args.output).stat().st_size,
+        **metadata,
+    }
+    Path(args.report).write_text(json.dumps(report, indent=2))
+
+    print(f"Quantize: Checkpoint INT8 disimpan ke '{args.output}'")
+    print(f"Quantize: Laporan disimpan ke '{args.report}'")
+    print(
+        f"  Latensi FP32 {report['fp32_latency']['mean_ms']} ms | INT8 {report['int8_latency']['mean_ms']} ms"
+        f" | speedup {report['speedup']}x"
+    )
+    print(
+        f"  Kesesuaian deteksi INT8 vs FP32: precision={report['agreement_precision']}"
+        f" recall={report['agreement_recall']} f1={report['agreement_f1']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# app/external/inference/registry.py
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+from nanodet.util import Logger, load_config
+from nanodet.util import cfg as _default_cfg
+
+from .predictor import Predictor
+
+# Salinan config default nanodet yang belum disentuh; setiap model mendapat clone sendiri
+# agar config model1/model2 tidak saling menimpa di objek `cfg` global.
+_BASE_CFG = _default_cfg.clone()
+
+EXTERNAL_DIR = Path(__file__).resolve().parent.parent  # app/external
+MODELS_CONFIG_PATH = EXTERNAL_DIR / "configs" / "configs.yml"
+
+
+class ModelSpec(object):
+    def __init__(self, name: str, config_path: Path, model_path: Path):
+        self.name = name
+        self.config_path = Path(config_path)
+        self.model_path = Path(model_path)
+
+    def same_files(self, other: "ModelSpec") -> bool:
+        return (
+            self.config_path.resolve() == other.config_path.resolve()
+            and self.model_path.resolve() == other.model_path.resolve()
+        )
+
+
+class ModelHandle(object):
+    """Handle bersama (read-only) untuk satu model yang sudah dimuat."""
+
+    def __init__(self, spec: ModelSpec, model_cfg, predictor: Predictor, version: int):
+        self.name = spec.name
+        self.spec = spec
+        self.cfg = model_cfg
+        self.predictor = predictor
+        self.version = version
+        self.loaded_at = time.time()
+
+    @property
+    def class_names(self) -> List[str]:
+        return self.cfg.class_names
+
+
+class ModelRegistry(object):
+    """
+    Registry model bersama untuk satu proses: setiap model dimuat sekali (saat pertama
+    dipakai atau lewat warmup di background) lalu handle-nya dibagikan ke semua pemakai
+    (WebSocket, /detect-image, LocalDetection). Model bisa di-hot-swap: model baru
+    dibangun di luar lock lalu referensinya diganti secara atomik; frame yang sedang
+    diproses tetap memakai handle lama sampai selesai.
+    """
+
+    def __init__(
+        self,
+        specs: Dict[str, ModelSpec],
+        default_name: str,
+        device: str = "cpu",
+        backend: str = "eager",
+        quantized_model_path: Optional[str] = None,
+        fast_preprocess: bool = True,
+    ):
+        self.specs = dict(specs)
+        self.default_name = default_name
+        self.device = device
+        self.backend = backend
+        self.quantized_model_path = quantized_model_path
+        self.fast_preprocess = fast_preprocess
+        self.logger = Logger(0, use_tensorboard=False)
+
+        self._handles: Dict[str, ModelHandle] = {}
+        self._versions: Dict[str, int] = {}
+        self._load_locks: Dict[str, threading.Lock] = {
+            name: threading.Lock() for name in self.specs
+        }
+        self._lock = threading.Lock()  # Melindungi _handles/_versions/default_name
+
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    def is_loaded(self, name: Optional[str] = None) -> bool:
+        return (name or self.default_name) in self._handles
+
+    def _build(self, spec: ModelSpec) -> ModelHandle:
+        model_cfg = _BASE_CFG.clone()
+        load_config(model_cfg, str(spec.config_path))
+        # Checkpoint INT8 hanya milik model default; model lain tetap FP32 eager
+        backend = self.backend
+        quantized_model_path = None
+        if backend == "int8":
+            if spec.name == self.default_name:
+                quantized_model_path = self.quantized_model_path
+            else:
+                backend = "eager"
+
+        start = time.time()
+        predictor = Predictor(
+            model_cfg,
+            str(spec.model_path),
+            self.logger,
+            self.device,
+            backend=backend,
+            quantized_model_path=quantized_model_path,
+            fast_preprocess=self.fast_preprocess,
+        )
+        version = self._versions.get(spec.name, 0) + 1
+        print(
+            f"Model Registry: Model '{spec.name}' v{version} dimuat dalam {time.time() - start:.2f}s ({spec.model_path})"
+        )
+        return ModelHandle(spec, model_cfg, predictor, version)
+
+    def get(self, name: Optional[str] = None) -> ModelHandle:
+        """Mengambil handle model (default jika `name` kosong), memuatnya jika belum ada."""
+        name = name or self.default_name
+        handle = self._handles.get(name)
+        if handle is not None:
+            return handle
+        if name not in self.specs:
+            raise KeyError(f"Model '{name}' tidak terdaftar. Pilihan: {self.names()}")
+
+        with self._load_locks[name]:  # Hanya satu thread yang memuat model yang sama
+            handle = self._handles.get(name)
+            if handle is None:
+                handle = self._build(self.specs[name])
+                with self._lock:
+                    self._handles[name] = handle
+                    self._versions[name] = handle.version
+        return handle
+
+    def warmup(self, names: Optional[List[str]] = None) -> threading.Thread:
+        """Memuat model di thread background agar request pertama tidak menunggu."""
+        names = names or [self.default_name]
+
+        def _run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Model Registry Error: Warmup model '{name}' gagal: {e}")
+
+        thread = threading.Thread(target=_run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def swap(self, name: str) -> ModelHandle:
+        """
+        Memuat ulang model `name` dari config/checkpoint yang sudah terdaftar lalu
+        menggantinya secara atomik. Jika pemuatan gagal, model lama tetap dipakai.
+        """
+        spec = self.specs.get(name)
+        if spec is None:
+            raise KeyError(f"Model '{name}' tidak terdaftar. Pilihan: {self.names()}")
+
+        with self._load_locks[name]:
+            handle = self._build(spec)  # Model lama tetap melayani selama proses ini
+            with self._lock:
+                self._handles[name] = handle
+                self._versions[name] = handle.version
+        print(f"Model Registry: Model '{name}' di-hot-swap ke v{handle.version}.")
+        return handle
+
+    def set_default(self, name: str) -> ModelHandle:
+        handle = self.get(name)  # Pastikan sudah dimuat sebelum dijadikan default
+        with self._lock:
+            self.default_name = name
+        print(f"Model Registry: Model default sekarang '{name}'.")
+        return handle
+
+    def status(self) -> List[dict]:
+        items = []
+        for name, spec in self.specs.items():
+            handle = self._handles.get(name)
+            items.append(
+                {
+                    "name": name,
+                    "default": name == self.default_name,
+                    "loaded": handle is not None,
+                    "version": handle.version if handle else None,
+                    "loaded_at": handle.loaded_at if handle else None,
+                    "config_path": str(spec.config_path),
+                    "model_path": str(spec.model_path),
+                }
+            )
+        return items
+
+
+def _load_model_specs(config_path: Path = MODELS_CONFIG_PATH) -> Dict[str, ModelSpec]:
+    """Membaca entri model (model1, model2, ...) dari configs.yml."""
+    specs = {}
+    if not config_path.is_file():
+        return specs
+    with open(config_path, "r") as f:
+        raw = yaml.safe_load(f) or {}
+    for name, entry in raw.items():
+        if isinstance(entry, dict) and "configPath" in entry and "modelPath" in entry:
+            # Path di configs.yml relatif terhadap app/external
+            specs[name] = ModelSpec(
+                name,
+                EXTERNAL_DIR / entry["configPath"],
+                EXTERNAL_DIR / entry["modelPath"],
+            )
+    return specs
+
+
+def create_model_registry(detector_settings, project_root: Path) -> ModelRegistry:
+    specs = _load_model_specs()
+
+    def _resolve(path: str) -> Path:
+        path = Path(path)
+        return path if path.is_absolute() else project_root / path
+
+    # Model dari config.yaml (detector.model/config) menjadi default; jika filenya sama
+    # dengan salah satu entri configs.yml, entri itu yang dipakai agar tidak dimuat dua kali.
+    default_spec = ModelSpec(
+        "default",
+        _resolve(detector_settings.config),
+        _resolve(detector_settings.model),
+    )
+    default_name = next(
+        (name for name, spec in specs.items() if spec.same_files(default_spec)),
+        None,
+    )
+    if default_name is None:
+        default_name = "default"
+        specs[default_name] = default_spec
+
+    quantized_model = detector_settings.quantized_model
+    return ModelRegistry(
+        specs,
+        default_name,
+        device=detector_settings.device,
+        backend=detector_settings.backend,
+        quantized_model_path=str(_resolve(quantized_model)) if quantized_model else None,
+        fast_preprocess=detector_settings.fast_preprocess,
+    )
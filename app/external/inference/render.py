@@ -0,0 +1,94 @@
+# app/external/inference/render.py
+import threading
+from typing import Sequence
+
+import cv2
+import numpy as np
+
+from .detections import CLASS, SCORE, X0, Y1, Detections
+
+# Kapan frame hasil deteksi diberi overlay box:
+#   - "always"      : setiap frame yang diinferensi (mis. preview/live view)
+#   - "on_detection": hanya frame yang memiliki deteksi (bawaan)
+#   - "never"       : tidak pernah; frame disimpan/dikirim tanpa overlay
+RENDER_POLICIES = ("always", "on_detection", "never")
+
+# Warna BGR per indeks kelas (berulang jika kelas lebih banyak)
+_PALETTE = (
+    (0, 0, 255),
+    (0, 165, 255),
+    (0, 255, 255),
+    (0, 255, 0),
+    (255, 128, 0),
+    (255, 0, 255),
+    (128, 0, 255),
+    (255, 255, 0),
+)
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def should_render(render_policy: str, num_detections: int) -> bool:
+    if render_policy not in RENDER_POLICIES:
+        raise ValueError(
+            f"Render policy '{render_policy}' tidak dikenal. Pilihan: {RENDER_POLICIES}"
+        )
+    return render_policy == "always" or (
+        render_policy == "on_detection" and num_detections > 0
+    )
+
+
+class BoxRenderer(object):
+    """
+    Renderer headless pengganti head.show_result: hanya menggambar box (dan label)
+    di atas threshold, tanpa jendela GUI dan tanpa print. Frame disalin ke buffer
+    milik thread yang dipakai ulang selama ukuran frame tidak berubah.
+
+    Catatan: gambar yang dikembalikan adalah buffer tersebut dan hanya valid sampai
+    render berikutnya di thread yang sama (encode/simpan langsung setelah render).
+    """
+
+    def __init__(self, thickness: int = 2, font_scale: float = 0.5):
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self._local = threading.local()
+
+    def _canvas(self, frame: np.ndarray) -> np.ndarray:
+        canvas = getattr(self._local, "canvas", None)
+        if canvas is None or canvas.shape != frame.shape or canvas.dtype != frame.dtype:
+            canvas = np.empty_like(frame)
+            self._local.canvas = canvas
+        np.copyto(canvas, frame)
+        return canvas
+
+    def render(
+        self,
+        frame: np.ndarray,
+        dets: Detections,
+        class_names: Sequence[str],
+        score_thres: float = 0.0,
+    ) -> np.ndarray:
+        canvas = self._canvas(frame)
+        data = dets.data[dets.scores > score_thres] if len(dets) else dets.data
+        for row in data:
+            label = int(row[CLASS])
+            color = _PALETTE[label % len(_PALETTE)]
+            x0, y0, x1, y1 = (int(v) for v in row[X0 : Y1 + 1])
+            cv2.rectangle(canvas, (x0, y0), (x1, y1), color, self.thickness)
+
+            text = f"{class_names[label]}:{row[SCORE] * 100:.1f}%"
+            (text_w, text_h), baseline = cv2.getTextSize(text, _FONT, self.font_scale, 1)
+            text_y = max(y0, text_h + baseline)  # Label tetap di dalam frame
+            cv2.rectangle(
+                canvas, (x0, text_y - text_h - baseline), (x0 + text_w, text_y), color, -1
+            )
+            cv2.putText(
+                canvas,
+                text,
+                (x0, text_y - baseline),
+                _FONT,
+                self.font_scale,
+                (255, 255, 255),
+                1,
+                cv2.LINE_AA,
+            )
+        return canvas
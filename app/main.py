@@ -19,7 +19,19 @@ from .routers import (
     websockets_router,
 )  # Pastikan websockets_router diimpor
 from .routers import location_router
+from .routers import model_router
+from .core.model_registry import model_registry
+from .services.report_writer import report_writer
+from .core.db_executor import db_executor
+from .services.location_service import location_service
+from .services.media_store import MediaStaticFiles, media_store
+from .services.thumbnail_service import thumbnail_service
 from .routers.video_detector import LocalDetection
+from .utils.upload_limit import (
+    REPORT_UPLOAD_ROUTES,
+    RequestBodyLimitMiddleware,
+    report_upload_body_limit,
+)
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -46,6 +58,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Upload foto laporan yang terlalu besar ditolak sebelum body multipart di-parse ke /tmp
+app.add_middleware(
+    RequestBodyLimitMiddleware,
+    routes=REPORT_UPLOAD_ROUTES,
+    max_body_bytes=report_upload_body_limit(),
+)
 
 STATIC_DIR = BASE_DIR / "static"
 if not STATIC_DIR.exists():
@@ -53,9 +71,10 @@ if not STATIC_DIR.exists():
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static_custom")
 
 if UPLOAD_FILES_DIRECTORY.is_dir():
+    # Nama di URL di-resolve lewat media store (shard sha256, alias nama lama, file datar)
     app.mount(
         "/uploads",
-        StaticFiles(directory=str(UPLOAD_FILES_DIRECTORY)),
+        MediaStaticFiles(media_store, derived_resolver=thumbnail_service.resolve),
         name="uploaded_files_static",
     )
 else:
@@ -64,10 +83,37 @@ else:
 app.include_router(reports_router.router, prefix="/api")
 app.include_router(websockets_router.router, prefix="/ws")
 app.include_router(location_router.router)
+app.include_router(model_router.router, prefix="/api")
 
 detector = LocalDetection()
 
 
+@app.on_event("startup")
+def warmup_detection_model():
+    # Model dimuat di background; request pertama menunggu hanya jika warmup belum selesai
+    model_registry.warmup()
+    # Writer laporan deteksi (memutar ulang spill file dari run sebelumnya jika ada)
+    report_writer.start()
+    # Sweeper klaster deteksi: frame terbaik + laporan ditulis saat klaster ditutup
+    websockets_router.detection_suppressor.start()
+    # Lokasi GPS di memori (snapshot terakhir dimuat dari disk, lalu ditulis periodik)
+    location_service.start()
+
+
+@app.on_event("shutdown")
+def shutdown_inference_workers():
+    detector.stop()
+    location_service.shutdown()
+    thumbnail_service.shutdown()
+    websockets_router.batch_scheduler.shutdown()
+    websockets_router.inference_executor.shutdown(wait=False)
+    # Klaster deteksi yang masih terbuka di-flush ke report writer sebelum writer berhenti
+    websockets_router.detection_suppressor.shutdown()
+    # Terakhir: semua laporan yang masih di antrean di-flush (atau masuk spill file)
+    report_writer.shutdown()
+    db_executor.shutdown()
+
+
 # --- Endpoint untuk Menyajikan Halaman Utama ---
 # TAMBAHKAN name="read_root" DI SINI
 @app.get("/", tags=["Web Interface"], include_in_schema=False, name="read_root")
@@ -57,8 +57,8 @@ class Report(Base):
     )
 
     photo_url: Optional[str] = Column(
-        String(255), nullable=True
-    )  # Path atau URL ke foto
+        String(255), nullable=True, index=True
+    )  # Path atau URL ke foto (diindeks: cek referensi sebelum file media dihapus)
 
     # default=func.current_date() akan menggunakan tanggal saat ini dari server DB
     # nullable=False berarti kolom ini wajib diisi (DB akan mengisinya dengan default)
@@ -68,4 +68,48 @@ class Report(Base):
         return f"<Report(id={self.id}, type='{self.damage_type}', status='{self.status.value}')>"
 
 
-print(f"OK: Model SQLAlchemy 'Report' didefinisikan di {__file__}")
+
+class ReportCluster(Base):
+    """
+    Agregat laporan per sel grid peta per level zoom (Web Mercator). Dipelihara secara
+    inkremental oleh ReportRepository setiap kali laporan dibuat/diubah/dihapus, jadi
+    endpoint cluster tidak pernah menghitung ulang dari damage_reports.
+    """
+
+    __tablename__ = "damage_report_clusters"
+
+    zoom: int = Column(Integer, primary_key=True, autoincrement=False)
+    cell_x: int = Column(Integer, primary_key=True, autoincrement=False)
+    cell_y: int = Column(Integer, primary_key=True, autoincrement=False)
+    report_count: int = Column(Integer, nullable=False, default=0)
+    # Jumlah koordinat untuk centroid (sum / report_count)
+    sum_lat: float = Column(Float, nullable=False, default=0.0)
+    sum_lng: float = Column(Float, nullable=False, default=0.0)
+    # Rincian per tingkat keparahan
+    count_low: int = Column(Integer, nullable=False, default=0)
+    count_medium: int = Column(Integer, nullable=False, default=0)
+    count_high: int = Column(Integer, nullable=False, default=0)
+    count_critical: int = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ReportCluster(zoom={self.zoom}, cell=({self.cell_x}, {self.cell_y}), count={self.report_count})>"
+
+
+class MediaAlias(Base):
+    """
+    Nama file lama di direktori upload datar -> nama objek media (sha256 + ekstensi).
+    Diisi oleh alat migrasi media agar URL /uploads/<nama lama> tetap bisa diakses.
+    """
+
+    __tablename__ = "media_aliases"
+
+    alias: str = Column(String(255), primary_key=True)
+    object_name: str = Column(String(80), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<MediaAlias(alias='{self.alias}', object='{self.object_name}')>"
+
+
+print(
+    f"OK: Model SQLAlchemy 'Report', 'ReportCluster' dan 'MediaAlias' didefinisikan di {__file__}"
+)
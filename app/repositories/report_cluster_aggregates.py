@@ -0,0 +1,137 @@
+# app/repositories/report_cluster_aggregates.py
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.orm import Session
+
+from ..models.report_model import DamageSeverityEnum, ReportCluster
+from ..utils.geo_utils import mercator_cell, mercator_cell_range
+
+# Level zoom peta yang agregatnya dipelihara (zoom di atas ini memakai level terakhir)
+CLUSTER_MIN_ZOOM = 0
+CLUSTER_MAX_ZOOM = 16
+# Setiap tile 256px dibagi 2^bits x 2^bits sel -> satu cluster per ~64px di layar
+CLUSTER_CELL_BITS = 2
+
+_SEVERITY_COLUMNS = {
+    DamageSeverityEnum.low.value: "count_low",
+    DamageSeverityEnum.medium.value: "count_medium",
+    DamageSeverityEnum.high.value: "count_high",
+    DamageSeverityEnum.critical.value: "count_critical",
+}
+_SUM_COLUMNS = ("report_count", "sum_lat", "sum_lng") + tuple(_SEVERITY_COLUMNS.values())
+
+# (lat, lng, severity) satu laporan
+ClusterPoint = Tuple[float, float, object]
+
+
+def cluster_zoom(zoom: int) -> int:
+    return max(CLUSTER_MIN_ZOOM, min(CLUSTER_MAX_ZOOM, zoom))
+
+
+def cluster_cell(lat: float, lng: float, zoom: int) -> Tuple[int, int]:
+    return mercator_cell(lat, lng, zoom + CLUSTER_CELL_BITS)
+
+
+def _severity_value(severity) -> str:
+    return DamageSeverityEnum(getattr(severity, "value", severity)).value
+
+
+def cluster_deltas(points: Iterable[ClusterPoint], sign: int = 1) -> Dict[tuple, dict]:
+    """Perubahan agregat per (zoom, cell_x, cell_y) untuk sekumpulan laporan."""
+    deltas: Dict[tuple, dict] = defaultdict(lambda: dict.fromkeys(_SUM_COLUMNS, 0))
+    for lat, lng, severity in points:
+        severity_column = _SEVERITY_COLUMNS[_severity_value(severity)]
+        for zoom in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+            delta = deltas[(zoom,) + cluster_cell(lat, lng, zoom)]
+            delta["report_count"] += sign
+            delta["sum_lat"] += sign * lat
+            delta["sum_lng"] += sign * lng
+            delta[severity_column] += sign
+    return deltas
+
+
+class ReportClusterAggregates:
+    """
+    Memelihara tabel damage_report_clusters secara inkremental. Dipanggil oleh
+    ReportRepository di dalam transaksi yang sama dengan perubahan laporan (sebelum
+    commit); satu laporan menyentuh satu sel per level zoom.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add(self, points: Iterable[ClusterPoint]):
+        self._apply(cluster_deltas(points, +1))
+
+    def remove(self, points: Iterable[ClusterPoint]):
+        deltas = cluster_deltas(points, -1)
+        self._apply(deltas)
+        if deltas:
+            # Sel yang kosong dihapus agar tidak ikut dikembalikan/di-scan
+            self.db.execute(
+                delete(ReportCluster).where(
+                    tuple_(ReportCluster.zoom, ReportCluster.cell_x, ReportCluster.cell_y).in_(
+                        list(deltas)
+                    ),
+                    ReportCluster.report_count <= 0,
+                )
+            )
+
+    def _apply(self, deltas: Dict[tuple, dict]):
+        if not deltas:
+            return
+        rows = [
+            dict(delta, zoom=zoom, cell_x=cell_x, cell_y=cell_y)
+            for (zoom, cell_x, cell_y), delta in deltas.items()
+        ]
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            self._apply_generic(rows)
+            return
+
+        stmt = dialect_insert(ReportCluster)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["zoom", "cell_x", "cell_y"],
+            set_={
+                column: getattr(ReportCluster, column) + getattr(stmt.excluded, column)
+                for column in _SUM_COLUMNS
+            },
+        )
+        self.db.execute(stmt, rows)
+
+    def _apply_generic(self, rows: List[dict]):
+        # DB tanpa UPSERT: baca-ubah-tulis per sel lewat ORM
+        for row in rows:
+            key = (row["zoom"], row["cell_x"], row["cell_y"])
+            cluster = self.db.get(ReportCluster, key)
+            if cluster is None:
+                self.db.add(ReportCluster(**row))
+                continue
+            for column in _SUM_COLUMNS:
+                setattr(cluster, column, getattr(cluster, column) + row[column])
+        self.db.flush()
+
+    def clusters_within(
+        self, zoom: int, min_lat: float, min_lng: float, max_lat: float, max_lng: float
+    ) -> List[ReportCluster]:
+        """Sel agregat pada level zoom yang beririsan dengan bbox (range scan primary key)."""
+        zoom = cluster_zoom(zoom)
+        x0, y0, x1, y1 = mercator_cell_range(
+            min_lat, min_lng, max_lat, max_lng, zoom + CLUSTER_CELL_BITS
+        )
+        return (
+            self.db.query(ReportCluster)
+            .filter(
+                ReportCluster.zoom == zoom,
+                ReportCluster.cell_x.between(x0, x1),
+                ReportCluster.cell_y.between(y0, y1),
+                ReportCluster.report_count > 0,
+            )
+            .all()
+        )
@@ -1,30 +1,81 @@
 # app/repositories/report_repository.py
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
 from typing import List, Optional
+from datetime import date
 from fastapi import UploadFile  # Untuk tipe data file yang diunggah
 import os
-from uuid import uuid4  # Untuk menghasilkan nama file unik
-from pathlib import Path  # Untuk manipulasi path
-import shutil  # Untuk operasi file
+import threading
+import time
 
 # Impor model database (SQLAlchemy) dan skema Pydantic
 # from .. import models_db  # Ini akan menyediakan models_db.Report
-from ..models.report_model import Report, DamageSeverityEnum, ReportStatusEnum
+from ..models.report_model import (
+    Report,
+    ReportCluster,
+    DamageSeverityEnum,
+    ReportStatusEnum,
+)
 
 # Ini akan menyediakan schemas.ReportCreate, schemas.ReportUpdate
 from ..schemas.report_schema import *
 
 # Impor direktori upload dari konfigurasi
 from ..core.config import UPLOAD_FILES_DIRECTORY
+from ..core.db_executor import db_executor
+from ..services.media_store import media_store
+from ..services.thumbnail_service import thumbnail_service
+from ..utils.file_utils import save_upload_file_to_disk
+from .report_cluster_aggregates import ReportClusterAggregates
+from .report_spatial_index import ReportSpatialIndex
 
 # Ekstensi file gambar yang diizinkan (bisa juga dari config jika perlu)
 VALID_IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png"]
 
+# Total laporan di-cache lalu diperbarui per create/delete; disinkronkan ulang dengan
+# COUNT(*) setelah TTL (menangkap perubahan dari proses lain, mis. worker/alembic)
+REPORT_COUNT_CACHE_TTL_S = 60.0
+
+
+class _ReportCountCache:
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._value: Optional[int] = None
+        self._loaded_at = 0.0
+
+    def get(self, load) -> int:
+        with self._lock:
+            if self._value is None or time.monotonic() - self._loaded_at > self.ttl_s:
+                self._value = load()
+                self._loaded_at = time.monotonic()
+            return self._value
+
+    def adjust(self, delta: int):
+        with self._lock:
+            if self._value is not None:
+                self._value = max(0, self._value + delta)
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+
+report_count_cache = _ReportCountCache(REPORT_COUNT_CACHE_TTL_S)
+
+
+def _cluster_point(report: Report) -> tuple:
+    severity = getattr(report.severity, "value", report.severity)
+    return (report.lat, report.lng, severity)
+
 
 class ReportRepository:
     def __init__(self, db: Session):
         self.db = db
+        # R*Tree pendamping untuk query wilayah; disinkronkan sebelum setiap commit
+        self.spatial_index = ReportSpatialIndex(db)
+        # Agregat cluster peta per zoom; diperbarui inkremental dalam transaksi yang sama
+        self.cluster_aggregates = ReportClusterAggregates(db)
 
     async def _save_photo_to_disk(self, photo: UploadFile) -> Optional[str]:
         if not photo or not photo.filename:
@@ -39,59 +90,23 @@ class ReportRepository:
             )
             return None
 
-        unique_filename_stem = str(uuid4())
-        unique_filename = f"{unique_filename_stem}{file_extension}"
-        file_path: Path = UPLOAD_FILES_DIRECTORY / unique_filename
-
-        try:
-            # Fallback jika .chunks() tidak ada
-            print("Mencoba menyimpan foto dengan await photo.read() (fallback)")
-            content = await photo.read()  # Baca seluruh file
-            with open(file_path, "wb") as buffer:
-                buffer.write(content)  # Tulis konten
-
-            await photo.close()
-            print(f"Foto berhasil disimpan: {file_path}")
-            return f"/uploads/{unique_filename}"
-        except (
-            AttributeError
-        ) as ae:  # Khusus menangkap AttributeError jika .read() juga tidak ada (jarang)
-            print(
-                f"Error atribut UploadFile saat menyimpan foto '{unique_filename}': {ae}"
-            )
-            return None
-        except Exception as e:
-            print(f"Error saat menyimpan foto '{unique_filename}': {e}")
-            if file_path.exists():
-                try:
-                    os.remove(file_path)
-                except Exception as remove_e:
-                    print(f"Error menghapus file parsial '{file_path}': {remove_e}")
-            return None
+        # Di-stream per chunk ke media store (nama = sha256 isi, rename atomik);
+        # UploadTooLarge diteruskan ke service (HTTP 413)
+        photo_url = await save_upload_file_to_disk(photo, valid_extensions=VALID_IMAGE_EXTENSIONS)
+        if photo_url:
+            print(f"Foto berhasil disimpan: {photo_url}")
+        return photo_url
 
     def _delete_photo_from_disk(self, photo_url_value: Optional[str]):
         """
-        Internal helper method untuk menghapus file foto dari disk.
+        Internal helper method untuk menghapus file foto dari disk. Dipanggil setelah
+        commit; file tetap disimpan jika laporan lain masih memakai konten yang sama.
         """
         if not photo_url_value:
             return
 
         try:
-            filename = os.path.basename(
-                photo_url_value
-            )  # Dapatkan nama file dari URL relatif
-            if not filename or filename == photo_url_value.strip("/"):  # Keamanan dasar
-                print(
-                    f"Filename tidak valid dari photo_url untuk penghapusan: {photo_url_value}"
-                )
-                return
-
-            file_path: Path = UPLOAD_FILES_DIRECTORY / filename
-            if file_path.is_file():  # Cek apakah file ada sebelum menghapus
-                os.remove(file_path)
-                print(f"File foto dihapus dari disk: {file_path}")
-            # else: # Opsional: log jika file tidak ditemukan
-            #     print(f"File foto tidak ditemukan untuk dihapus: {file_path}")
+            media_store.release(photo_url_value, self.db)
         except Exception as e:
             print(f"Error saat menghapus file foto untuk URL '{photo_url_value}': {e}")
 
@@ -123,10 +138,21 @@ class ReportRepository:
 
         db_report_obj = Report(**report_dict_for_db, photo_url=actual_photo_url)
 
+        # Foto disimpan di event loop (I/O async); INSERT/COMMIT di thread DB
+        db_report_obj = await db_executor.run(self._insert_report, db_report_obj)
+        thumbnail_service.schedule(db_report_obj.photo_url)  # Varian foto di background
+        print(f"Repo: Laporan baru dibuat di DB dengan ID: {db_report_obj.id}")
+        return db_report_obj
+
+    def _insert_report(self, db_report_obj: Report) -> Report:
+        """INSERT satu laporan + index spasial + agregat cluster dalam satu transaksi."""
         self.db.add(db_report_obj)
+        self.db.flush()  # ID terisi untuk index spasial, dalam transaksi yang sama
+        self.spatial_index.upsert([(db_report_obj.id, db_report_obj.lat, db_report_obj.lng)])
+        self.cluster_aggregates.add([_cluster_point(db_report_obj)])
         self.db.commit()
+        report_count_cache.adjust(+1)
         self.db.refresh(db_report_obj)
-        print(f"Repo: Laporan baru dibuat di DB dengan ID: {db_report_obj.id}")
         return db_report_obj
 
     def get_report_by_id_from_db(self, report_id: int) -> Optional[Report]:
@@ -156,14 +182,113 @@ class ReportRepository:
         )
         return reports
 
+    def get_reports_within_bbox_from_db(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        limit: int = 1000,
+    ) -> List[Report]:
+        """
+        Mengambil laporan di dalam bounding box (inklusif), terbaru dulu.
+        Kandidat dicari lewat R*Tree (jika tersedia), lalu difilter presisi penuh.
+        """
+        query = self.db.query(Report)
+        if self.spatial_index.available:
+            query = query.filter(
+                Report.id.in_(
+                    self.spatial_index.ids_within(min_lat, min_lng, max_lat, max_lng)
+                )
+            )
+        reports = (
+            query.filter(
+                Report.lat.between(min_lat, max_lat),
+                Report.lng.between(min_lng, max_lng),
+            )
+            .order_by(desc(Report.id))
+            .limit(limit)
+            .all()
+        )
+        print(
+            f"Repo: {len(reports)} laporan dalam bbox ({min_lat}, {min_lng}) - ({max_lat}, {max_lng})"
+        )
+        return reports
+
+    def get_reports_for_export_page(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 1000,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        report_status: Optional[ReportStatusEnum] = None,
+    ) -> list:
+        """
+        Satu halaman ekspor massal dengan paginasi keyset: laporan dengan ID > after_id,
+        urut ID, hanya kolom yang diekspor (Row, bukan objek ORM). Setiap halaman adalah
+        query pendek lewat index primary key, jadi ekspor tidak menahan koneksi/transaksi
+        baca selama unduhan berlangsung.
+        """
+        stmt = select(
+            Report.id,
+            Report.lat,
+            Report.lng,
+            Report.damage_type.label("type"),
+            Report.severity,
+            Report.status,
+            Report.description,
+            Report.photo_url,
+            Report.date_reported,
+        ).order_by(Report.id)
+        if after_id is not None:
+            stmt = stmt.where(Report.id > after_id)
+        if date_from is not None:
+            stmt = stmt.where(Report.date_reported >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(Report.date_reported <= date_to)
+        if report_status is not None:
+            stmt = stmt.where(Report.status == report_status)
+        return self.db.execute(stmt.limit(limit)).all()
+
+    def get_reports_after_id_from_db(
+        self, after_id: Optional[int] = None, limit: int = 10
+    ) -> List[Report]:
+        """
+        Paginasi keyset (cursor): laporan dengan ID < after_id, terbaru dulu.
+        Memakai index primary key langsung, jadi biaya per halaman tetap
+        (tidak bergantung seberapa jauh halaman seperti OFFSET).
+        """
+        query = self.db.query(Report)
+        if after_id is not None:
+            query = query.filter(Report.id < after_id)
+        reports = query.order_by(desc(Report.id)).limit(limit).all()
+        print(
+            f"Repo: Mengambil {len(reports)} laporan dari DB (after_id={after_id}, limit={limit})"
+        )
+        return reports
+
+    def get_report_clusters_from_db(
+        self, zoom: int, min_lat: float, min_lng: float, max_lat: float, max_lng: float
+    ) -> List[ReportCluster]:
+        """Agregat cluster (sudah dihitung sebelumnya) pada level zoom di dalam bbox."""
+        clusters = self.cluster_aggregates.clusters_within(
+            zoom, min_lat, min_lng, max_lat, max_lng
+        )
+        print(f"Repo: {len(clusters)} cluster laporan pada zoom {zoom}")
+        return clusters
+
     def count_total_reports_in_db(self) -> int:
         """
-        Menghitung total jumlah laporan di database.
+        Total jumlah laporan. Diambil dari cache proses (diperbarui setiap create/delete
+        lewat repository ini); COUNT(*) hanya dijalankan saat cache kosong/kedaluwarsa.
         """
-        total_count = self.db.query(func.count(Report.id)).scalar() or 0
+        total_count = report_count_cache.get(self._count_reports)
         print(f"Repo: Total laporan di DB: {total_count}")
         return total_count
 
+    def _count_reports(self) -> int:
+        return self.db.query(func.count(Report.id)).scalar() or 0
+
     async def update_report_in_db(
         self,
         report_id: int,
@@ -173,11 +298,14 @@ class ReportRepository:
         """
         Memperbarui laporan yang sudah ada di database.
         """
-        db_report_obj = self.get_report_by_id_from_db(report_id)
+        db_report_obj = await db_executor.run(self.get_report_by_id_from_db, report_id)
         if not db_report_obj:
             return None  # Laporan tidak ditemukan
 
         current_photo_url = db_report_obj.photo_url  # Simpan URL foto lama
+        replaced_photo_url: Optional[str] = None  # Dihapus dari disk setelah commit
+        new_actual_photo_url: Optional[str] = None  # Varian (thumbnail) dibuat setelah commit
+        old_cluster_point = _cluster_point(db_report_obj)  # Untuk agregat cluster
 
         # Update field dari report_update_data
         update_data_dict = report_update_data.model_dump(
@@ -193,17 +321,39 @@ class ReportRepository:
         if new_photo_file:
             new_actual_photo_url = await self._save_photo_to_disk(new_photo_file)
             if new_actual_photo_url:  # Jika foto baru berhasil disimpan
-                if current_photo_url:  # Jika ada foto lama, hapus
-                    self._delete_photo_from_disk(current_photo_url)
+                if current_photo_url and current_photo_url != new_actual_photo_url:
+                    replaced_photo_url = current_photo_url  # Foto lama dihapus setelah commit
                 db_report_obj.photo_url = new_actual_photo_url  # Update dengan URL baru
             elif new_photo_file.filename:  # Jika ada usaha upload foto baru tapi gagal
                 print(
                     f"Peringatan: Foto baru '{new_photo_file.filename}' gagal disimpan saat update. Foto lama (jika ada) dipertahankan."
                 )
 
+        db_report_obj = await db_executor.run(
+            self._commit_report_update,
+            db_report_obj,
+            old_cluster_point,
+            "lat" in update_data_dict or "lng" in update_data_dict,
+        )
+        if replaced_photo_url:
+            await db_executor.run(self._delete_photo_from_disk, replaced_photo_url)
+        if new_actual_photo_url:
+            # Juga untuk laporan yang sebelumnya tanpa foto
+            thumbnail_service.schedule(new_actual_photo_url)
+        print(f"Repo: Laporan dengan ID {report_id} berhasil diupdate.")
+        return db_report_obj
+
+    def _commit_report_update(
+        self, db_report_obj: Report, old_cluster_point: tuple, moved: bool
+    ) -> Report:
+        if moved:
+            self.spatial_index.upsert([(db_report_obj.id, db_report_obj.lat, db_report_obj.lng)])
+        new_cluster_point = _cluster_point(db_report_obj)
+        if new_cluster_point != old_cluster_point:
+            self.cluster_aggregates.remove([old_cluster_point])
+            self.cluster_aggregates.add([new_cluster_point])
         self.db.commit()
         self.db.refresh(db_report_obj)
-        print(f"Repo: Laporan dengan ID {report_id} berhasil diupdate.")
         return db_report_obj
 
     def delete_report_from_db(self, report_id: int) -> Optional[Report]:
@@ -218,7 +368,10 @@ class ReportRepository:
             )  # Ambil URL foto sebelum objek dihapus dari sesi
 
             self.db.delete(db_report_obj)
+            self.spatial_index.remove([report_id])
+            self.cluster_aggregates.remove([_cluster_point(db_report_obj)])
             self.db.commit()  # Commit penghapusan dari DB dulu
+            report_count_cache.adjust(-1)
 
             if photo_url_to_delete:  # Baru hapus file fisik setelah commit DB
                 self._delete_photo_from_disk(photo_url_to_delete)
@@ -243,26 +396,31 @@ class ReportRepository:
         if "type" in report_dict_for_db and "damage_type" not in report_dict_for_db:
             report_dict_for_db["damage_type"] = report_dict_for_db.pop("type")
 
-        # original_filename, file_extension = os.path.splitext(existing_photo_url)
-        # file_extension = file_extension.lower()
-        # if file_extension not in VALID_IMAGE_EXTENSIONS:
-        #     print(
-        #         f"Peringatan: Ekstensi file tidak valid '{file_extension}' untuk file '{original_filename}'."
-        #     )
-        #     return None
-
-        # unique_filename_stem = str(uuid4())
-        # unique_filename = f"{unique_filename_stem}{file_extension}"
-        # file_path: Path = UPLOAD_FILES_DIRECTORY / unique_filename
-
         db_report_obj = Report(
             **report_dict_for_db, photo_url=existing_photo_url
         )  # Langsung gunakan URL
 
-        self.db.add(db_report_obj)
-        self.db.commit()
-        self.db.refresh(db_report_obj)
-        return db_report_obj
+        return await db_executor.run(self._insert_report, db_report_obj)
+
+    def bulk_create_reports_in_db(self, report_rows: List[dict]) -> List[int]:
+        """
+        Menyimpan banyak laporan (dict kolom Report, termasuk photo_url) dalam satu
+        transaksi: satu COMMIT dan tanpa refresh per baris. Mengembalikan ID baru.
+        """
+        db_report_objs = [Report(**row) for row in report_rows]
+        try:
+            self.db.add_all(db_report_objs)
+            self.db.flush()  # INSERT batch; ID terisi sebelum commit
+            report_ids = [obj.id for obj in db_report_objs]
+            self.spatial_index.upsert((obj.id, obj.lat, obj.lng) for obj in db_report_objs)
+            self.cluster_aggregates.add(_cluster_point(obj) for obj in db_report_objs)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        report_count_cache.adjust(len(report_ids))
+        print(f"Repo: {len(report_ids)} laporan dibuat di DB dalam satu transaksi.")
+        return report_ids
 
 
 print(f"OK: Kelas ReportRepository didefinisikan di {__file__}")
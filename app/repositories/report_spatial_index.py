@@ -0,0 +1,83 @@
+# app/repositories/report_spatial_index.py
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import column, delete, insert, select, table, text
+from sqlalchemy.orm import Session
+
+# Tabel virtual SQLite R*Tree pendamping damage_reports (dibuat oleh migrasi Alembic).
+# id = Report.id; setiap laporan adalah kotak titik (min == max).
+REPORT_RTREE_TABLE = "damage_reports_rtree"
+report_rtree = table(
+    REPORT_RTREE_TABLE,
+    column("id"),
+    column("min_lat"),
+    column("max_lat"),
+    column("min_lng"),
+    column("max_lng"),
+)
+
+# Cache ketersediaan R*Tree per URL database (tabel tidak berubah selama proses berjalan)
+_rtree_available: Dict[str, bool] = {}
+
+
+class ReportSpatialIndex:
+    """
+    Menjaga R*Tree laporan tetap sinkron dengan damage_reports. Dipanggil oleh
+    ReportRepository di dalam transaksi yang sama (sebelum commit), jadi index dan
+    tabel utama selalu konsisten. Jika DB bukan SQLite atau migrasi R*Tree belum
+    dijalankan, semua operasi menjadi no-op dan query memakai scan lat/lng biasa.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def available(self) -> bool:
+        bind = self.db.get_bind()
+        key = str(bind.url)
+        if key not in _rtree_available:
+            available = False
+            if bind.dialect.name == "sqlite":
+                available = (
+                    self.db.execute(
+                        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                        {"name": REPORT_RTREE_TABLE},
+                    ).first()
+                    is not None
+                )
+            if not available:
+                print(
+                    f"Repo: Index spasial '{REPORT_RTREE_TABLE}' tidak tersedia, query wilayah memakai scan lat/lng."
+                )
+            _rtree_available[key] = available
+        return _rtree_available[key]
+
+    def upsert(self, points: Iterable[Tuple[int, float, float]]):
+        """Menambah/memperbarui titik (id, lat, lng) di index."""
+        rows = [
+            {"id": report_id, "min_lat": lat, "max_lat": lat, "min_lng": lng, "max_lng": lng}
+            for report_id, lat, lng in points
+        ]
+        if not rows or not self.available:
+            return
+        self.remove(row["id"] for row in rows)
+        self.db.execute(insert(report_rtree), rows)
+
+    def remove(self, report_ids: Iterable[int]):
+        report_ids = list(report_ids)
+        if not report_ids or not self.available:
+            return
+        self.db.execute(delete(report_rtree).where(report_rtree.c.id.in_(report_ids)))
+
+    def ids_within(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+        """
+        Subquery ID laporan yang kotaknya beririsan dengan bbox. R*Tree menyimpan
+        float32 yang dibulatkan ke luar, jadi hasilnya superset; filter lat/lng
+        presisi penuh tetap dilakukan pemanggil.
+        """
+        return select(report_rtree.c.id).where(
+            report_rtree.c.min_lat <= max_lat,
+            report_rtree.c.max_lat >= min_lat,
+            report_rtree.c.min_lng <= max_lng,
+            report_rtree.c.max_lng >= min_lng,
+        )
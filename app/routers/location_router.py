@@ -1,8 +1,10 @@
 # app/routers/location_router.py
 
+from typing import Optional
+
 from fastapi import APIRouter
 from pydantic import BaseModel
-from ..core.locaton_store import update_location
+from ..services.location_service import location_service
 
 
 router = APIRouter(tags=["Location"], prefix="/location")
@@ -11,9 +13,14 @@ router = APIRouter(tags=["Location"], prefix="/location")
 class LocationSchema(BaseModel):
     lat: float
     lon: float
+    # Waktu fix dari browser (position.timestamp, milidetik epoch); opsional
+    timestamp: Optional[float] = None
 
 
 @router.post("/update")
 async def update_client_location(data: LocationSchema):
-    update_location(data.lat, data.lon)
+    # Hanya memori; location_service menulis snapshot ke disk secara periodik
+    location_service.update(
+        data.lat, data.lon, data.timestamp / 1000 if data.timestamp is not None else None
+    )
     return {"status": "ok", "message": "location updated"}
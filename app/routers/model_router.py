@@ -0,0 +1,62 @@
+# app/routers/model_router.py
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from ..core.admin_auth import require_admin
+from ..core.model_registry import model_registry
+
+router = APIRouter(prefix="/models", tags=["Detection Models"])
+
+
+def _ensure_registered(name: str) -> None:
+    # Hanya model dari configs.yml/config.yaml yang bisa dimuat ulang atau diaktifkan
+    if name not in model_registry.names():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Model '{name}' tidak terdaftar.",
+        )
+
+
+@router.get("/", summary="List Registered Detection Models")
+async def list_models():
+    return model_registry.status()
+
+
+@router.post(
+    "/{name}/reload",
+    summary="Hot-swap (Reload) a Detection Model",
+    dependencies=[Depends(require_admin)],
+)
+async def reload_model(name: str):
+    _ensure_registered(name)
+    try:
+        # Model baru dibangun di threadpool; model lama tetap melayani sampai swap selesai
+        handle = await run_in_threadpool(model_registry.swap, name)
+    except Exception as e:
+        print(f"API Endpoint Error saat hot-swap model '{name}': {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Gagal memuat model '{name}'.",
+        )
+    return {"status": "ok", "name": handle.name, "version": handle.version}
+
+
+@router.post(
+    "/{name}/activate",
+    summary="Make a Detection Model the Default",
+    dependencies=[Depends(require_admin)],
+)
+async def activate_model(name: str):
+    _ensure_registered(name)
+    try:
+        handle = await run_in_threadpool(model_registry.set_default, name)
+    except Exception as e:
+        print(f"API Endpoint Error saat aktivasi model '{name}': {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Gagal memuat model '{name}'.",
+        )
+    return {"status": "ok", "default": handle.name, "version": handle.version}
+
+
+print(f"OK: Router API untuk model deteksi didefinisikan di {__file__}")
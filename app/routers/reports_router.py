@@ -1,14 +1,21 @@
 # app/routers/reports_router.py
+import asyncio
+from datetime import date
+
 from fastapi import (
     APIRouter,
     Depends,
+    Header,
     HTTPException,
+    Request,
+    Response,
     status,
     UploadFile,
     File,
     Form,
     Query,
 )
+from fastapi.responses import StreamingResponse
 from typing import Optional, List  # List dari typing
 
 # Impor skema Pydantic yang relevan
@@ -19,13 +26,42 @@ from ..schemas.report_schema import *
 from ..services.report_services import ReportService
 
 # Impor Enum dari model DB jika digunakan sebagai tipe di Form atau validasi
-from ..models.report_model import DamageSeverityEnum
+from ..models.report_model import DamageSeverityEnum, ReportStatusEnum
+
+# Event perubahan laporan (SSE) dan versi data untuk ETag
+from ..services.report_events import report_event_bus, resync_message
+from ..core.db_executor import db_executor
+from ..services.report_export import (
+    EXPORT_FORMATS,
+    stream_report_export,
+    validate_export_params,
+)
 
 # Buat instance APIRouter
 # Semua endpoint yang didefinisikan dengan router ini akan memiliki prefix "/reports"
 # dan akan dikelompokkan di bawah tag "Damage Reports" di dokumentasi OpenAPI.
 router = APIRouter(prefix="/reports", tags=["Damage Reports (Step-by-Step)"])
 
+# Interval komentar keep-alive SSE (juga interval cek klien terputus)
+SSE_KEEPALIVE_S = 15.0
+
+
+def _not_modified(request: Request, response: Response, *query_parts) -> Optional[Response]:
+    """
+    ETag = versi data laporan (berubah di setiap create/update/delete) + parameter query.
+    Jika cocok dengan If-None-Match, kembalikan 304 tanpa menjalankan query DB sama sekali.
+    """
+    etag = 'W/"' + "-".join(str(part) for part in (report_event_bus.version,) + query_parts) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
 
 # --- Endpoint untuk Membuat Laporan Baru ---
 @router.post(
@@ -110,17 +146,30 @@ async def create_new_report_endpoint(
     summary="Get All Damage Reports (Paginated)",
 )
 async def get_all_reports_endpoint(
+    request: Request,
+    response: Response,
     report_service: ReportService = Depends(ReportService),
     page: int = Query(1, ge=1, description="Nomor halaman, dimulai dari 1"),
     limit: int = Query(10, ge=1, le=100, description="Jumlah item per halaman (1-100)"),
+    after_id: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Cursor: ambil laporan dengan ID lebih kecil dari ini (next_after_id halaman sebelumnya)",
+    ),
 ):
     print(
-        f"API Endpoint: Menerima request get_all_reports_endpoint (page={page}, limit={limit})"
+        f"API Endpoint: Menerima request get_all_reports_endpoint (page={page}, limit={limit}, after_id={after_id})"
     )
+    not_modified = _not_modified(request, response, "list", page, limit, after_id)
+    if not_modified is not None:
+        return not_modified
     try:
         # Service sudah mengembalikan objek ReportPaginatedResponse yang sesuai
-        paginated_response = report_service.get_all_reports_paginated(
-            page=page, limit=limit
+        paginated_response = await db_executor.run(
+            report_service.get_all_reports_paginated,
+            page=page,
+            limit=limit,
+            after_id=after_id,
         )
         return paginated_response
     except Exception as e:
@@ -133,6 +182,177 @@ async def get_all_reports_endpoint(
         )
 
 
+# --- Endpoint untuk Mendapatkan Laporan di Dalam Viewport Peta ---
+# Harus didefinisikan sebelum "/{report_id}" agar "within" tidak dianggap ID
+@router.get(
+    "/within",
+    response_model=ReportWithinResponse,
+    summary="Get Damage Reports Inside a Bounding Box",
+)
+async def get_reports_within_endpoint(
+    request: Request,
+    response: Response,
+    report_service: ReportService = Depends(ReportService),
+    min_lat: float = Query(..., ge=-90, le=90, description="Batas selatan viewport"),
+    min_lng: float = Query(..., ge=-180, le=180, description="Batas barat viewport"),
+    max_lat: float = Query(..., ge=-90, le=90, description="Batas utara viewport"),
+    max_lng: float = Query(..., ge=-180, le=180, description="Batas timur viewport"),
+    limit: int = Query(
+        1000, ge=1, le=5000, description="Maks. laporan yang dikembalikan (terbaru dulu)"
+    ),
+):
+    not_modified = _not_modified(
+        request, response, "within", min_lat, min_lng, max_lat, max_lng, limit
+    )
+    if not_modified is not None:
+        return not_modified
+    try:
+        return await db_executor.run(
+            report_service.get_reports_within_bbox,
+            min_lat, min_lng, max_lat, max_lng, limit=limit
+        )
+    except HTTPException as e:  # Tangkap 422 dari service
+        raise e
+    except Exception as e:
+        print(
+            f"API Endpoint Error Internal Tidak Terduga saat mengambil laporan dalam bbox: {e}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Terjadi error internal saat mengambil laporan dalam wilayah peta.",
+        )
+
+
+# --- Endpoint untuk Cluster Marker Peta (Agregat per Zoom) ---
+@router.get(
+    "/clusters",
+    response_model=ReportClusterListResponse,
+    summary="Get Pre-aggregated Report Clusters for a Map Viewport",
+)
+async def get_report_clusters_endpoint(
+    request: Request,
+    response: Response,
+    report_service: ReportService = Depends(ReportService),
+    zoom: int = Query(..., ge=0, le=22, description="Level zoom peta"),
+    bbox: str = Query(
+        ..., description="Viewport peta: 'min_lng,min_lat,max_lng,max_lat'"
+    ),
+):
+    not_modified = _not_modified(request, response, "clusters", zoom, bbox)
+    if not_modified is not None:
+        return not_modified
+    try:
+        return await db_executor.run(
+            report_service.get_report_clusters, zoom=zoom, bbox=bbox
+        )
+    except HTTPException as e:  # Tangkap 422 dari service
+        raise e
+    except Exception as e:
+        print(
+            f"API Endpoint Error Internal Tidak Terduga saat mengambil cluster laporan: {e}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Terjadi error internal saat mengambil cluster laporan.",
+        )
+
+
+# --- Endpoint Stream Perubahan Laporan (Server-Sent Events) ---
+@router.get(
+    "/events",
+    summary="Stream Damage Report Changes (Server-Sent Events)",
+    response_class=StreamingResponse,
+)
+async def stream_report_events_endpoint(
+    request: Request,
+    since_id: Optional[int] = Query(
+        None, ge=0, description="Lanjutkan dari ID event terakhir yang diterima"
+    ),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Event `created`/`updated`/`deleted` dikirim saat terjadi, menggantikan polling.
+    Resume lewat `?since_id=` atau header `Last-Event-ID` (dikirim otomatis oleh
+    EventSource saat reconnect). Jika event yang diminta sudah tidak tersimpan,
+    dikirim event `resync`: klien perlu memuat ulang datanya.
+    """
+    resume_id = since_id
+    if resume_id is None and last_event_id and last_event_id.isdigit():
+        resume_id = int(last_event_id)
+    subscriber, backlog = report_event_bus.subscribe(resume_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if backlog is None:
+                yield resync_message(report_event_bus.version)
+            else:
+                for message in backlog:
+                    yield message
+            while True:
+                if subscriber.overflowed:
+                    # Klien terlalu lambat: event terbuang, minta klien memuat ulang
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.overflowed = False
+                    yield resync_message(report_event_bus.version)
+                try:
+                    _, message = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=SSE_KEEPALIVE_S
+                    )
+                    yield message
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+        finally:
+            report_event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Endpoint Ekspor Massal Laporan (Streaming) ---
+@router.get(
+    "/export",
+    summary="Export Damage Reports as NDJSON, CSV or GeoJSON (Streaming)",
+    response_class=StreamingResponse,
+)
+async def export_reports_endpoint(
+    export_format: str = Query(
+        "ndjson", alias="format", description="Format ekspor: ndjson, csv, atau geojson"
+    ),
+    date_from: Optional[date] = Query(
+        None, description="Hanya laporan sejak tanggal ini (inklusif)"
+    ),
+    date_to: Optional[date] = Query(
+        None, description="Hanya laporan sampai tanggal ini (inklusif)"
+    ),
+    report_status: Optional[ReportStatusEnum] = Query(
+        None, alias="status", description="Filter status laporan"
+    ),
+):
+    """
+    Seluruh laporan yang cocok dikirim bertahap per halaman keyset (urut ID), tanpa
+    paginasi di sisi klien dan tanpa memuat semuanya ke memori.
+    """
+    validate_export_params(export_format, date_from, date_to)
+    print(
+        f"API Endpoint: Ekspor laporan (format={export_format}, date_from={date_from}, "
+        f"date_to={date_to}, status={report_status})"
+    )
+    return StreamingResponse(
+        stream_report_export(export_format, date_from, date_to, report_status),
+        media_type=EXPORT_FORMATS[export_format][1],
+        headers={
+            "Content-Disposition": f'attachment; filename="reports.{export_format}"'
+        },
+    )
+
+
 # --- Endpoint untuk Mendapatkan Laporan Berdasarkan ID ---
 @router.get(
     "/{report_id}",
@@ -147,7 +367,7 @@ async def get_report_by_id_endpoint(
         f"API Endpoint: Menerima request get_report_by_id_endpoint untuk ID: {report_id}"
     )
     try:
-        db_report_model = report_service.get_report_by_id(report_id)
+        db_report_model = await db_executor.run(report_service.get_report_by_id, report_id)
         # Service akan melempar HTTPException 404 jika tidak ditemukan
         # FastAPI akan otomatis konversi model DB ke response_model
         return db_report_model
@@ -249,7 +469,7 @@ async def delete_report_endpoint(
         f"API Endpoint: Menerima request delete_report_endpoint untuk ID: {report_id}"
     )
     try:
-        report_service.delete_report(report_id)
+        await db_executor.run(report_service.delete_report, report_id)
         # Tidak ada return body untuk status 204
     except HTTPException as e:  # Tangkap 404 dari service
         raise e
@@ -1,14 +1,15 @@
 import cv2
-import time
-import asyncio
 import threading
-from pathlib import Path
+import time
 
-from ..core.locaton_store import get_last_location
-from ..external.inference.predictor import Predictor
-from ..external.nanodet.nanodet.util import Logger, cfg
-from ..core.config import DETECTOR_SETTINGS, UPLOAD_FILES_DIRECTORY
-from .websockets_router import save_report_from_detection
+from ..core.model_registry import model_registry
+from ..external.inference.detections import SCORE, create_detection_filter
+from ..external.inference.frame_gate import create_frame_gate
+from ..external.inference.render import should_render
+from ..core.config import DETECTOR_SETTINGS
+from ..utils.image_decode import encode_jpeg
+from ..services.location_service import location_service
+from .websockets_router import detection_suppressor
 
 
 class LocalDetection:
@@ -16,18 +17,18 @@ class LocalDetection:
         self.running = False
         self.detector_thread = None
         self.detector_settings = DETECTOR_SETTINGS
-        self.model = self.detector_settings.model
-        self.config = self.detector_settings.config
         self.webcam = self.detector_settings.webcam
         self.threshold = self.detector_settings.threshold
-        self.device = self.detector_settings.device
-        self.logger = Logger(0, use_tensorboard=False)
-        self.cfg = cfg
-        self.predictor_instance = Predictor(
-            self.cfg, self.model, self.logger, self.device
-        )
-        self.ws_result_save_dir = UPLOAD_FILES_DIRECTORY
-        self.ws_result_save_dir.mkdir(parents=True, exist_ok=True)
+        # Model tidak dibangun di sini; handle diambil dari registry bersama saat deteksi berjalan
+        self.model_registry = model_registry
+        # Gate murah sebelum inferensi: frame yang tidak berubah dilewati
+        self.frame_gate = create_frame_gate(self.detector_settings)
+        self.detection_filter = create_detection_filter(self.detector_settings)
+        # always: overlay setiap frame; on_detection: hanya frame yang disimpan; never:
+        # frame disimpan tanpa overlay. Tidak ada jendela GUI (aman di server tanpa display)
+        self.render_policy = self.detector_settings.render_policy
+        # Frame berurutan dari kerusakan yang sama digabung; hanya frame terbaik yang disimpan
+        self.detection_suppressor = detection_suppressor
 
     def start(self):
         if self.detector_thread and self.detector_thread.is_alive():
@@ -50,54 +51,53 @@ class LocalDetection:
         if not cap.isOpened():
             print("❌ Kamera tidak bisa dibuka.")
             return
+        self.frame_gate.reset()
 
         try:
             while self.running:
                 ret, frame = cap.read()
                 if not ret:
                     break
+                capture_ts = time.time()
 
-                location = get_last_location()
-                meta, res = self.predictor_instance.inference(frame)
-                result_img, class_text = self.predictor_instance.visualize(
-                    res[0], meta, self.cfg.class_names, self.threshold
-                )
+                # Scene tidak berubah sejak frame terakhir yang diinferensi: hasil sebelumnya
+                # masih berlaku (dan sudah disimpan), jadi frame ini dilewati.
+                if not self.frame_gate.should_infer(frame):
+                    continue
 
-                if class_text is not None and class_text != "None":
-                    timestamp = int(time.time() * 1000)
-                    result_filename = (
-                        self.ws_result_save_dir / f"detected_frame_{timestamp}.jpg"
-                    )
+                handle = self.model_registry.get()  # Murah; mengikuti hot-swap
+                meta, res = handle.predictor.inference(frame)
+                detections = self.detection_filter(res[0], handle.class_names)
 
-                    cv2.imwrite(str(result_filename), result_img)
-                    with open(self.ws_result_save_dir / "ws_gps_log.txt", "a") as f:
-                        f.write(
-                            f"{result_filename.name}, lat={location['lat']}, lon={location['lon']}\n"
-                        )
+                result_img = frame
+                if should_render(self.render_policy, len(detections)):
+                    result_img, _ = handle.predictor.visualize(
+                        detections, meta, handle.class_names, 0.0
+                    )
 
-                    try:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        loop.run_until_complete(
-                            save_report_from_detection(
-                                lat=location.get("lat"),
-                                lng=location.get("lon"),
-                                detected_damage_type=class_text,
-                                image_relative_url="/uploads/" + result_filename.name,
-                            )
-                        )
-                    except Exception as e:
-                        print(f"❌ Gagal simpan laporan: {e}")
-                    finally:
-                        loop.close()
+                if len(detections):
+                    class_text = detections.best_class_name(handle.class_names)
+                    # Posisi GPS pada saat frame ditangkap (interpolasi buffer fix di memori)
+                    fix = location_service.location_at(capture_ts)
+                    lat, lon = (fix.lat, fix.lon) if fix else (None, None)
+                    # Frame di-encode hanya jika menjadi frame terbaik klasternya;
+                    # file dan laporan ditulis saat klaster ditutup
+                    self.detection_suppressor.submit(
+                        class_text,
+                        lat,
+                        lon,
+                        float(detections.best()[SCORE]),
+                        lambda: encode_jpeg(result_img),
+                        source="Deteksi otomatis lokal",
+                    )
 
-                    print(f"📍 Lokasi: {get_last_location()}")
+                    print(f"📍 Lokasi: {lat}, {lon}")
                     print(f"🧠 Deteksi: {class_text}")
 
-                cv2.waitKey(1)
-
         except Exception as e:
             print("🔥 Error:", e)
         finally:
             cap.release()
-            print("✅ Kamera dilepas.")
+            print(
+                f"✅ Kamera dilepas. Frame diinferensi: {self.frame_gate.inferred}, dilewati: {self.frame_gate.skipped}"
+            )
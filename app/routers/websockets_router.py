@@ -3,151 +3,343 @@
 import base64
 import json
 import time
-from pathlib import Path
 from typing import Optional
 
-import cv2
-import numpy as np
 from fastapi import (
     APIRouter,
-    Depends,
     HTTPException,
+    Request,
     WebSocket,
     WebSocketDisconnect,
     status,
 )
 
 from ..core.config import DETECTOR_SETTINGS, UPLOAD_FILES_DIRECTORY
-from ..core.database import SessionLocal  # Untuk membuat sesi DB baru
-
-# --- Modifikasi Impor dan Inisialisasi Model NanoDet ---
-# Asumsikan struktur dan cara kerja modul eksternal Anda
-# try:
-# Impor kelas Predictor dan fungsi/variabel konfigurasi yang relevan
-from ..external.inference.predictor import Predictor  # Ini harusnya kelas
-from ..external.nanodet.nanodet.util import (  # Sesuaikan path jika perlu
-    Logger,
-    cfg,
-    load_config,
+from ..core.model_registry import model_registry
+from ..external.inference.batching import BatchScheduler
+from ..external.inference.detections import SCORE, create_detection_filter
+from ..external.inference.executor import (
+    InferenceQueueFull,
+    create_inference_executor,
+)
+from ..external.inference.render import RENDER_POLICIES, should_render
+from ..services.detection_suppressor import create_detection_suppressor
+from ..services.media_store import media_store
+from ..services.thumbnail_service import thumbnail_service
+from ..services.report_writer import detection_report_row, report_writer
+from ..utils.image_decode import decode_jpeg, encode_jpeg
+from ..utils.ws_protocol import (
+    BINARY_SUBPROTOCOL,
+    BinaryFrameCodec,
+    RESPONSE_MODES,
+    FrameProtocolError,
+    JsonFrameCodec,
+    parse_binary_frame,
+    send_frame_message,
 )
-from ..models.report_model import *  # Untuk tipe return dan Enum jika perlu
-from ..schemas.report_schema import ReportCreate  # Skema Pydantic untuk membuat laporan
-from ..services.report_services import ReportService
 
 detector_settings = DETECTOR_SETTINGS
-model = detector_settings.model
-config = detector_settings.config
-webcam = detector_settings.webcam
 threshold = detector_settings.threshold
-device = detector_settings.device
-logger = Logger(0, use_tensorboard=False)
-
-load_config(cfg, config)
-predictor_instance = Predictor(cfg, model, logger, device)
+detection_filter = create_detection_filter(detector_settings)
+
+
+def _infer_batch(imgs):
+    """Inferensi batch dengan model default saat ini; handle ikut dikembalikan agar
+    tahap render memakai model (dan class_names) yang sama meski terjadi hot-swap."""
+    handle = model_registry.get()
+    return [
+        (handle, meta, res) for meta, res in handle.predictor.inference_batch(imgs)
+    ]
+
+
+# Worker inferensi bersama untuk semua klien WS dan /detect-image
+inference_executor = create_inference_executor(detector_settings)
+# Scheduler micro-batching: satu forward pass untuk frame dari banyak koneksi
+batch_scheduler = BatchScheduler(
+    _infer_batch,
+    inference_executor,
+    max_batch_size=detector_settings.batch_max_size,
+    max_wait_ms=detector_settings.batch_max_wait_ms,
+    max_pending=detector_settings.batch_max_pending,
+)
+BUSY_RETRY_AFTER_MS = 200
 
 
 router = APIRouter(tags=["WebSocket Detection"])
 
 
+def _decode_target_size():
+    """Ukuran input model default; dipakai memilih skala decode JPEG tereduksi."""
+    if not detector_settings.reduced_decode:
+        return None
+    return model_registry.get().cfg.data.val.input_size
+
+
+def _decode_data_url(image_data_base64: str):
+    """Data URL base64 -> DecodedFrame (None jika gagal decode)."""
+    encoded_image_str = image_data_base64[image_data_base64.find(",") + 1 :]
+    img_bytes = base64.b64decode(encoded_image_str)
+    return decode_jpeg(img_bytes, _decode_target_size())
+
+
+def _decode_ws_frame(data: str) -> dict:
+    """Tahap 1 (worker), format lama: parsing JSON dan decode base64/JPEG."""
+    try:
+        payload = json.loads(data)
+        image_data_base64 = payload.get("image")
+        location = payload.get("location") or {"lat": None, "lon": None}
+
+        if not image_data_base64:
+            return {"error": "No image data in payload"}
+
+        frame = _decode_data_url(image_data_base64)
+        if frame is None:
+            return {"error": "Failed to decode image."}
+    except Exception as e:
+        return {"error": f"Error processing input: {str(e)}"}
+    return {"frame": frame, "location": location, "frame_id": payload.get("frame_id")}
+
+
+def _decode_binary_ws_frame(frame: dict) -> dict:
+    """Tahap 1 (worker), format biner: decode JPEG langsung dari buffer pesan WS."""
+    decoded_frame = decode_jpeg(frame["jpeg"], _decode_target_size())
+    if decoded_frame is None:
+        return {"error": "Failed to decode image."}
+    return {
+        "frame": decoded_frame,
+        "location": frame["location"],
+        "frame_id": frame["frame_id"],
+    }
+
+
+def _render_ws_result(
+    handle,
+    meta,
+    res,
+    decoded: dict,
+    render_policy: str,
+    response_mode: str,
+) -> dict:
+    """
+    Tahap 3 (worker): overlay (sesuai render_policy) dan encode JPEG. Inferensi (tahap 2)
+    dijalankan secara batch oleh BatchScheduler. Frame tanpa deteksi tidak
+    dirender/di-encode kecuali policy "always". Pada mode respons "detections" tidak ada
+    gambar yang dikirim balik; klien menggambar overlay.
+
+    Frame dengan deteksi diteruskan ke detection_suppressor: frame duplikat (kerusakan
+    yang sama di frame berikutnya) tidak disimpan; hanya frame terbaik per klaster yang
+    ditulis ke disk dan dilaporkan saat klaster ditutup.
+    """
+    location = decoded["location"]
+    frame = decoded["frame"]
+    detections = res[0]
+    if frame.is_reduced:
+        # Inferensi berjalan pada frame tereduksi; box dikembalikan ke koordinat frame
+        # asli sebelum filter (min_box_area dalam piksel gambar asli)
+        detections = detections.scale(*frame.scale)
+    # Filter vektor (threshold global/per kelas, luas, top-k); terurut skor tertinggi dulu
+    detections = detection_filter(detections, handle.class_names)
+    class_text = detections.best_class_name(handle.class_names)
+    result = {
+        "class_text": class_text,
+        "location": location,
+        "frame_id": decoded.get("frame_id"),
+    }
+    if response_mode == "detections":
+        result["detections"] = detections
+        result["class_names"] = handle.class_names
+        result["frame_size"] = frame.full_size
+
+    rendered = {}
+
+    def _frame_jpeg() -> bytes:
+        # Dibuat sekali per frame, hanya jika dikirim ke klien atau menjadi frame terbaik
+        if "jpeg" not in rendered:
+            if should_render(render_policy, len(detections)):
+                # Resolusi penuh hanya di-decode untuk frame yang memiliki deteksi
+                canvas = frame.full() if class_text is not None else frame.img
+                result_img_visualized, _ = handle.predictor.visualize(
+                    detections,
+                    {"raw_img": [canvas]},
+                    handle.class_names,
+                    0.0,  # Sudah difilter di atas
+                )
+                # Buffer renderer dipakai ulang, jadi langsung di-encode di sini;
+                # base64 (jika perlu) dibuat oleh codec format lama saja
+                rendered["jpeg"] = encode_jpeg(result_img_visualized)
+            else:
+                # Policy "never": frame disimpan tanpa overlay; byte JPEG dari klien
+                # dipakai apa adanya (tanpa decode penuh maupun encode ulang)
+                rendered["jpeg"] = frame.source.tobytes()
+        return rendered["jpeg"]
+
+    try:
+        if response_mode == "image" and should_render(render_policy, len(detections)):
+            result["jpeg"] = _frame_jpeg()
+    except Exception as e:
+        print(f"WS Error saat visualisasi: {e}")
+        return {"error": f"Error during detection/visualization: {str(e)}"}
+
+    if class_text is None:
+        return result
+
+    try:
+        detection_suppressor.submit(
+            class_text,
+            location.get("lat"),
+            location.get("lon"),
+            float(detections.best()[SCORE]),
+            _frame_jpeg,
+            source="Deteksi otomatis dari WS",
+        )
+    except Exception as e:
+        print(f"WS Error saat memproses output: {e}")
+        return {"error": f"Error processing result: {str(e)}"}
+    return result
+
+
+async def _detect_ws_frame(
+    client_key,
+    decode_fn,
+    payload,
+    render_policy: str,
+    response_mode: str = "image",
+) -> dict:
+    """
+    Pipeline satu frame WS: decode (worker) -> inferensi batch (scheduler) -> render (worker).
+    `decode_fn(payload)` adalah decoder format lama (JSON) atau biner.
+    Melempar InferenceQueueFull jika worker atau scheduler sedang penuh.
+    """
+    decoded = await inference_executor.run(decode_fn, payload)
+    if "error" in decoded:
+        return decoded
+
+    try:
+        handle, meta, res = await batch_scheduler.submit(
+            client_key, decoded["frame"].img
+        )
+    except InferenceQueueFull:
+        raise
+    except Exception as e:
+        print(f"WS Error saat inferensi: {e}")
+        return {"error": f"Error during detection/visualization: {str(e)}"}
+
+    # Frame ini sudah mendapat jatah inferensi; tahap akhir tidak ditolak lagi
+    return await inference_executor.run(
+        _render_ws_result,
+        handle,
+        meta,
+        res,
+        decoded,
+        render_policy,
+        response_mode,
+        bounded=False,
+    )
+
+
+BUSY_DETAIL = "Server sedang penuh, frame dilewati."
+
+
+async def _receive_ws_frame(websocket: WebSocket):
+    """Menerima satu pesan WS (teks untuk format lama, bytes untuk format biner)."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return message["bytes"]
+    return message.get("text")
+
+
 @router.websocket("")
 async def websocket_detection_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    print("WS Client terhubung ke /ws/detect")
+    # Klien yang menawarkan subprotocol biner mendapat protokol biner; lainnya JSON/base64
+    binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    codec = BinaryFrameCodec() if binary else JsonFrameCodec()
+    print(f"WS Client terhubung ke /ws/detect ({'biner' if binary else 'JSON'})")
+
+    # Policy overlay bisa di-override per koneksi: /ws?render=always|on_detection|never
+    render_policy = websocket.query_params.get("render", detector_settings.render_policy)
+    if render_policy not in RENDER_POLICIES:
+        await send_frame_message(
+            websocket,
+            codec,
+            codec.error(None, f"Unknown render policy. Choices: {list(RENDER_POLICIES)}"),
+        )
+        await websocket.close(code=1008)
+        return
+    # ?response=detections: hanya hasil deteksi terstruktur, tanpa gambar overlay
+    response_mode = websocket.query_params.get("response", "image")
+    if response_mode not in RESPONSE_MODES:
+        await send_frame_message(
+            websocket,
+            codec,
+            codec.error(None, f"Unknown response mode. Choices: {list(RESPONSE_MODES)}"),
+        )
+        await websocket.close(code=1008)
+        return
 
-    if not predictor_instance:  # Cek apakah predictor berhasil diinisialisasi
-        print("WS Error: Predictor tidak terinisialisasi. Menutup koneksi.")
-        await websocket.send_text(
-            json.dumps({"error": "Detection model is not available."})
+    try:
+        # Pastikan model default sudah dimuat (lazy) tanpa memblokir event loop
+        await inference_executor.run(model_registry.get, bounded=False)
+    except Exception as e:
+        print(f"WS Error: Model deteksi tidak bisa dimuat ({e}). Menutup koneksi.")
+        await send_frame_message(
+            websocket, codec, codec.error(None, "Detection model is not available.")
         )
         await websocket.close(code=1011)
         return
 
-    ws_result_save_dir = UPLOAD_FILES_DIRECTORY
-    ws_result_save_dir.mkdir(parents=True, exist_ok=True)
-
     try:
         while True:
-            data = await websocket.receive_text()
-            # ... (sisa logika parsing JSON, decode base64 seperti sebelumnya) ...
-            try:
-                # data = image_to_base64_data_url()
-                payload = json.loads(data)
-
-                image_data_base64 = payload.get("image")
-                location = payload.get("location", {"lat": None, "lon": None})
-
-                if not image_data_base64:  # dst. (seperti kode Anda)
-                    await websocket.send_text(
-                        json.dumps({"error": "No image data in payload"})
-                    )
+            data = await _receive_ws_frame(websocket)
+
+            # Header biner dibaca di sini (murah, tanpa salinan); decode JPEG di worker
+            frame_id = None
+            if isinstance(data, (bytes, bytearray)):
+                try:
+                    frame = parse_binary_frame(data)
+                except FrameProtocolError as e:
+                    await send_frame_message(websocket, codec, codec.error(None, str(e)))
                     continue
+                frame_id = frame["frame_id"]
+                decode_fn, payload = _decode_binary_ws_frame, frame
+            else:
+                decode_fn, payload = _decode_ws_frame, data
 
-                header, encoded_image_str = image_data_base64.split(",", 1)
-                img_bytes = base64.b64decode(encoded_image_str)
-                np_arr = np.frombuffer(img_bytes, np.uint8)
-                img_input_for_detection = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-                if img_input_for_detection is None:
-                    await websocket.send_text(
-                        json.dumps({"error": "Failed to decode image."})
-                    )
-                    continue
-            except Exception as e:
-                await websocket.send_text(
-                    json.dumps({"error": f"Error processing input: {str(e)}"})
+            # Event loop hanya melakukan I/O; pekerjaan per frame dikirim ke worker inferensi.
+            try:
+                result = await _detect_ws_frame(
+                    id(websocket),
+                    decode_fn,
+                    payload,
+                    render_policy,
+                    response_mode,
+                )
+            except InferenceQueueFull:
+                await send_frame_message(
+                    websocket,
+                    codec,
+                    codec.busy(frame_id, BUSY_RETRY_AFTER_MS, BUSY_DETAIL),
                 )
                 continue
 
-            # --- Jalankan Deteksi menggunakan instance predictor ---
-            try:
-                # Sekarang panggil metode pada instance predictor_instance
-                meta, res = predictor_instance.inference(img_input_for_detection)
-                result_img_visualized, class_text = predictor_instance.visualize(
-                    res[0],
-                    meta,
-                    cfg.class_names,
-                    threshold,
-                )
-            except Exception as e:
-                print(f"WS Error saat inferensi atau visualisasi: {e}")
-                await websocket.send_text(
-                    json.dumps(
-                        {"error": f"Error during detection/visualization: {str(e)}"}
-                    )
+            if "error" in result:
+                await send_frame_message(
+                    websocket, codec, codec.error(frame_id, result["error"])
                 )
                 continue
-            # --- Akhir Deteksi ---
 
-            # ... (sisa logika encode hasil, simpan file, kirim ke klien seperti sebelumnya) ...
             try:
-
-                if class_text is not None and class_text != "None":
-                    _, buffer = cv2.imencode(".jpg", result_img_visualized)
-                    encoded_result_str = base64.b64encode(buffer).decode("utf-8")
-                    timestamp = int(time.time() * 1000)
-                    result_filename = (
-                        ws_result_save_dir / f"detected_frame_{timestamp}.jpg"
-                    )
-                    cv2.imwrite(str(result_filename), result_img_visualized)
-                    with open(ws_result_save_dir / "ws_gps_log.txt", "a") as f:
-                        f.write(
-                            f"{result_filename.name}, lat={location['lat']}, lon={location['lon']}\n"
-                        )
-
-                    await save_report_from_detection(
-                        location.get("lat"),
-                        location.get("lon"),
-                        class_text,
-                        "/uploads/" + result_filename.name,
-                    )
-
-                await websocket.send_text(
-                    f"data:image/jpeg;base64,{encoded_result_str}"
-                )
+                # Laporan dibuat oleh detection_suppressor saat klaster deteksi ditutup
+                await send_frame_message(websocket, codec, codec.result(result))
 
             except Exception as e:
                 print(f"WS Error saat memproses output atau mengirim: {e}")
-                await websocket.send_text(
-                    json.dumps({"error": f"Error processing/sending result: {str(e)}"})
+                await send_frame_message(
+                    websocket,
+                    codec,
+                    codec.error(frame_id, f"Error processing/sending result: {str(e)}"),
                 )
                 continue
     except WebSocketDisconnect as e:
@@ -163,152 +355,152 @@ async def websocket_detection_endpoint(websocket: WebSocket):
         print("WS: Menutup koneksi /ws/detect (jika masih ada).")
 
 
-@router.post("/detect-image")
-async def detect_image(request):
-    payload = await request.json()
-    image_data_base64 = payload.get("image")
-    location = payload.get("location", {"lat": None, "lon": None})
-
-    if not image_data_base64:
-        raise HTTPException(status_code=400, detail="Image missing")
+HTTP_SCORE_THRESHOLD = 0.35
 
-    # Decode base64
-    header, encoded = image_data_base64.split(",", 1)
-    img_bytes = base64.b64decode(encoded)
-    np_arr = np.frombuffer(img_bytes, np.uint8)
-    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-
-    # Detection
-    meta, res = predictor_instance.inference(img)
-    result_img = predictor_instance.visualize(res[0], meta, cfg.class_names, 0.35)
-
-    # Save image
-    timestamp = int(time.time() * 1000)
-    file_path = UPLOAD_FILES_DIRECTORY / f"frame_http_{timestamp}.jpg"
-    cv2.imwrite(str(file_path), result_img)
-
-    # Save to DB (seperti biasa)
-    db = SessionLocal()
-    report_service = ReportService(db=db)
-    report_create = ReportCreate(
-        lat=location.get("lat", 0.0),
-        lng=location.get("lon", 0.0),
-        type="road",  # atau infer dari klasifikasi
-        severity=DamageSeverityEnum.medium,
-    )
-    report_service.create_report_from_camera(report_create, str(file_path))
-    db.close()
-
-    # Encode result to base64 for frontend
-    _, buffer = cv2.imencode(".jpg", result_img)
-    encoded_result = base64.b64encode(buffer).decode("utf-8")
-
-    return {"result_image": f"data:image/jpeg;base64,{encoded_result}"}
 
+def _save_http_result(handle, meta, res, response_mode: str, frame) -> tuple:
+    """
+    Menyimpan frame hasil /detect-image dan membangun body respons sesuai mode.
+    Mengembalikan (URL frame di media store, class_text, body respons).
+    """
 
-PATH_TO_YOUR_IMAGE = Path(
-    "media_uploads/ws_detections/detected_frame_1748009805500.jpg"
-)
-# Anda mungkin perlu membuat direktori app/static dan meletakkan gambar di sana.
+    detections = res[0]
+    if frame.is_reduced:
+        detections = detections.scale(*frame.scale)
+    detections = detections.filter(score_thres=HTTP_SCORE_THRESHOLD)
+    class_text = detections.best_class_name(handle.class_names)
+
+    if response_mode == "detections":
+        # Tanpa render/encode: frame asli disimpan, klien menggambar overlay sendiri
+        file_url = media_store.put_bytes(frame.source, ".jpg")
+        width, height = frame.full_size
+        return file_url, class_text, {
+            "class_text": class_text,
+            "width": width,
+            "height": height,
+            "detections": detections.to_list(handle.class_names),
+        }
+
+    result_img, _ = handle.predictor.visualize(
+        detections, {"raw_img": [frame.full()]}, handle.class_names, HTTP_SCORE_THRESHOLD
+    )
+    jpeg = encode_jpeg(result_img)
+    file_url = media_store.put_bytes(jpeg, ".jpg")
 
-# 2. Koordinat GPS Dummy
-DUMMY_LOCATION = {"lat": -6.2000, "lon": 106.8000}  # Ganti dengan koordinat dummy Anda
+    encoded_result = base64.b64encode(jpeg).decode("utf-8")
+    return file_url, class_text, {
+        "result_image": f"data:image/jpeg;base64,{encoded_result}"
+    }
 
 
-# 3. Fungsi untuk membaca gambar lokal dan mengubahnya ke base64 (seperti yang dikirim klien)
-def image_to_base64_data_url():
-    with open(PATH_TO_YOUR_IMAGE, "rb") as f:
-        img_bytes = f.read()
+@router.post("/detect-image")
+async def detect_image(request: Request):
+    payload = await request.json()
+    image_data_base64 = payload.get("image")
+    location = payload.get("location", {"lat": None, "lon": None})
+    # "detections": hanya hasil deteksi (box, kelas, skor) tanpa gambar overlay
+    response_mode = payload.get("response", "image")
 
-    base64_str = base64.b64encode(img_bytes).decode("utf-8")
-    data_url = f"data:image/jpeg;base64,{base64_str}"
+    if not image_data_base64:
+        raise HTTPException(status_code=400, detail="Image missing")
+    if response_mode not in RESPONSE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown response mode. Choices: {list(RESPONSE_MODES)}",
+        )
 
-    # Lokasi dummy (bisa kamu ubah)
-    location = {"lat": -6.200000, "lon": 106.816666}
+    # Decode dan simpan/encode di worker inferensi, deteksi lewat scheduler batch
+    try:
+        frame = await inference_executor.run(_decode_data_url, image_data_base64)
+        if frame is None:
+            raise HTTPException(status_code=400, detail="Failed to decode image.")
+        handle, meta, res = await batch_scheduler.submit("detect-image", frame.img)
+        file_url, class_text, response_body = await inference_executor.run(
+            _save_http_result,
+            handle,
+            meta,
+            res,
+            response_mode,
+            frame,
+            bounded=False,
+        )
+    except InferenceQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server sedang penuh, coba lagi.",
+            headers={"Retry-After": "1"},
+        )
 
-    payload = {"image": data_url, "location": location}
+    # Laporan hanya untuk frame dengan deteksi; ditulis write-behind oleh report writer
+    if class_text is not None:
+        save_report_from_detection(
+            location.get("lat"),
+            location.get("lon"),
+            class_text,
+            file_url,
+            description_prefix="Deteksi otomatis dari /detect-image",
+        )
 
-    return json.dumps(payload)
+    return response_body
 
 
-async def save_report_from_detection(
+def save_report_from_detection(
     lat: Optional[float],
-    lng: Optional[
-        float
-    ],  # Pastikan klien mengirim 'lng' jika ini yang dipakai, atau 'lon'
+    lng: Optional[float],  # Klien mengirim 'lon'; kolom DB bernama 'lng'
     detected_damage_type: str,
-    image_relative_url: str,  # URL relatif gambar yang sudah disimpan, misal "/uploads/ws_detections/file.jpg"
+    image_relative_url: str,  # URL relatif gambar yang sudah disimpan, misal "/uploads/file.jpg"
     description_prefix: str = "Deteksi otomatis dari WS",
-) -> Optional[Report]:
+) -> bool:
     """
-    Fungsi helper untuk membuat dan menyimpan entri laporan kerusakan ke database.
-    Fungsi ini akan membuat sesi database sendiri.
+    Mengantrekan laporan hasil deteksi ke report writer (write-behind). Tidak menunggu
+    DB: laporan ditulis per batch oleh thread writer. Aman dipanggil dari event loop
+    maupun dari thread LocalDetection. Mengembalikan False jika laporan tidak diantrekan.
     """
     if lat is None or lng is None:
         print(
             "DB Save Helper: Data latitude atau longitude tidak lengkap, laporan tidak disimpan."
         )
-        return None
+        return False
 
-    db = SessionLocal()  # Buat sesi database baru
     try:
-        print(
-            f"DB Save Helper: Mencoba menyimpan laporan: lat={lat}, lng={lng}, type={detected_damage_type}, photo_url={image_relative_url}"
-        )
-
-        # 1. Buat skema Pydantic ReportCreate
-        # Pastikan field `damage_type` di Pydantic model Anda memiliki alias `type`
-        # jika Anda ingin menggunakan `type` sebagai argumen fungsi.
-        # Atau, ganti argumen fungsi menjadi `damage_type_from_ws`.
-        report_create_schema = ReportCreate(
-            lat=lat,
-            lng=lng,
-            type=detected_damage_type,  # Ini akan dipetakan ke 'damage_type' jika alias ada di ReportCreate
-            severity=DamageSeverityEnum.medium,  # Default, atau bisa dari hasil deteksi jika ada
+        row = detection_report_row(
+            lat,
+            lng,
+            detected_damage_type,
+            str(image_relative_url),
             description=f"{description_prefix} pada {time.strftime('%Y-%m-%d %H:%M:%S')}",
         )
+    except ValueError as e:  # Error validasi Pydantic
+        print(f"DB Save Helper Error (ValueError): {e}")
+        return False
 
-        # 2. Buat instance ReportService dengan sesi DB yang baru dibuat
-        report_service = ReportService(db=db)
-
-        # 3. Panggil metode service untuk membuat laporan.
-        #    Service akan memanggil repositori. Kita perlu memastikan service/repo
-        #    bisa menangani kasus di mana foto sudah ada (URL-nya) dan tidak perlu di-upload ulang.
+    report_writer.submit(row)  # Antrean penuh -> spill file, tidak pernah memblokir
+    thumbnail_service.schedule(row["photo_url"])  # Varian foto dibuat di background
+    return True
 
-        #    Modifikasi `ReportService.create_report` dan `ReportRepository.create_report_in_db`
-        #    untuk menerima argumen opsional `existing_photo_url: Optional[str] = None`.
-        #    Jika `existing_photo_url` diberikan, maka `photo_file` akan diabaikan dan URL ini yang dipakai.
 
-        # Panggil metode service yang dimodifikasi (lihat Langkah 2 di bawah)
-        created_db_report_model = (
-            await report_service.create_report_with_existing_photo_url(
-                report_create_schema,
-                str(image_relative_url),  # Teruskan URL foto yang sudah disimpan
-            )
+def _store_suppressed_detection(cluster) -> None:
+    """
+    Dipanggil detection_suppressor saat satu klaster deteksi ditutup: hanya frame
+    terbaik klaster yang ditulis ke disk, dan satu laporan diantrekan ke report writer.
+    """
+    # Nama file = sha256 isi: frame dari WS dan LocalDetection tidak bisa bertabrakan
+    frame_url = media_store.put_bytes(cluster.jpeg, ".jpg")
+    with open(UPLOAD_FILES_DIRECTORY / "ws_gps_log.txt", "a") as f:
+        f.write(
+            f"{frame_url}, lat={cluster.best_lat}, lon={cluster.best_lon}, frames={cluster.hits}\n"
         )
+    save_report_from_detection(
+        cluster.best_lat,
+        cluster.best_lon,
+        cluster.damage_type,
+        frame_url,
+        description_prefix=f"{cluster.source} ({cluster.hits} frame)",
+    )
 
-        print(
-            f"DB Save Helper: Laporan berhasil disimpan dengan ID: {created_db_report_model.id}"
-        )
-        return created_db_report_model
-
-    except HTTPException as e:  # Jika service melempar HTTPException
-        print(f"DB Save Helper Error (HTTPException): {e.detail}")
-        # Kita tidak bisa raise HTTPException di WebSocket handler, tapi fungsi ini bisa
-        # mengembalikan None atau raise error lain yang ditangani oleh pemanggil.
-        # Untuk sekarang, kita biarkan error asli naik jika bukan dari proses ini sendiri.
-        # Jika error dari service, biarkan naik.
-        raise
-    except ValueError as e:  # Error validasi Pydantic atau lainnya
-        print(f"DB Save Helper Error (ValueError): {e}")
-        raise
-    except Exception as e:
-        print(
-            f"DB Save Helper Error (Umum): Terjadi error saat menyimpan laporan ke DB: {e}"
-        )
-        # Rollback jika ada masalah di tengah transaksi (meskipun commit ada di service/repo)
-        db.rollback()
-        raise  # Biarkan pemanggil (WebSocket handler) menangani error ini
-    finally:
-        db.close()  # Selalu tutup sesi database
-        print("DB Save Helper: Sesi database ditutup.")
+
+# Satu suppressor untuk WS dan LocalDetection; sweeper dijalankan/dihentikan oleh
+# event startup/shutdown (shutdown mem-flush klaster yang masih terbuka)
+detection_suppressor = create_detection_suppressor(
+    detector_settings, _store_suppressed_detection
+)
@@ -1,9 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, computed_field
+from typing import Dict, Optional, List
 from datetime import date  # Untuk tipe data tanggal
 
 # Impor Enum dari model database kita agar Pydantic bisa memvalidasinya
 from ..models.report_model import DamageSeverityEnum, ReportStatusEnum
+from ..services.thumbnail_service import photo_variant_urls
 
 
 # Skema dasar untuk atribut inti dari sebuah laporan
@@ -67,6 +68,13 @@ class ReportResponse(ReportBase):
     photo_url: Optional[str] = None
     date_reported: date
 
+    # URL varian foto per ukuran, mis. {"sm": ".../x.jpg.sm.webp", "md": ...}; dibuat di
+    # background setelah upload, atau saat pertama diminta untuk foto lama
+    @computed_field
+    @property
+    def photo_variants(self) -> Dict[str, str]:
+        return photo_variant_urls(self.photo_url)
+
     # Config diwarisi dari ReportBase, tapi bisa ditimpa jika perlu.
     # Pastikan from_attributes = True agar bisa dibuat dari objek ORM Report.
 
@@ -77,10 +85,37 @@ class ReportPaginatedResponse(BaseModel):
     reports: List[ReportResponse]  # Daftar dari objek ReportResponse
     current_page: int
     total_pages: int
+    # Cursor halaman berikutnya (?after_id=); None jika sudah halaman terakhir
+    next_after_id: Optional[int] = None
     # Anda bisa menambahkan field lain seperti 'limit' atau 'next_page_url' jika perlu
 
     class Config:
         from_attributes = True  # Jika 'reports' akan dibuat dari list objek ORM
 
 
+# Skema untuk respons query wilayah peta (bounding box)
+class ReportWithinResponse(BaseModel):
+    count: int  # Jumlah laporan yang dikembalikan
+    truncated: bool  # True jika ada laporan lain di bbox yang melebihi limit
+    reports: List[ReportResponse]
+
+    class Config:
+        from_attributes = True
+
+
+
+# Satu cluster marker peta (agregat laporan dalam satu sel grid)
+class ReportClusterResponse(BaseModel):
+    lat: float  # Centroid laporan di dalam sel
+    lng: float
+    count: int
+    severity_counts: Dict[str, int]  # Rincian per tingkat keparahan (low..critical)
+
+
+class ReportClusterListResponse(BaseModel):
+    zoom: int  # Level zoom agregat yang dipakai (dibatasi ke level yang dipelihara)
+    total_reports: int  # Jumlah laporan di semua cluster yang dikembalikan
+    clusters: List[ReportClusterResponse]
+
+
 print(f"OK: Skema Pydantic untuk Report didefinisikan di {__file__}")
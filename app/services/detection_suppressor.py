@@ -0,0 +1,242 @@
+# app/services/detection_suppressor.py
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from ..utils.geo_utils import GridIndex, haversine_m
+
+
+class DetectionCluster(object):
+    """Kumpulan deteksi satu kelas kerusakan yang berdekatan dalam ruang dan waktu."""
+
+    __slots__ = (
+        "id",
+        "damage_type",
+        "source",
+        "lat",
+        "lon",
+        "first_seen",
+        "last_seen",
+        "hits",
+        "best_score",
+        "best_lat",
+        "best_lon",
+        "detected_at",
+        "jpeg",
+        "cell",
+        "best_seq",
+        "pending",
+    )
+
+    @property
+    def location(self) -> dict:
+        return {"lat": self.best_lat, "lon": self.best_lon}
+
+
+class DetectionSuppressor(object):
+    """
+    Tahap antara deteksi dan penyimpanan laporan. Deteksi dengan kelas yang sama dalam
+    radius `radius_m` dari posisi awal klaster dan dalam `window_s` detik digabung
+    menjadi satu klaster; hanya frame dengan skor tertinggi yang disimpan. Posisi klaster
+    tidak bergeser, sehingga kendaraan yang melaju tidak menyeret satu klaster melewati
+    beberapa kerusakan. Klaster ditutup (dan di-`emit` sekali: satu frame di disk + satu
+    laporan) setelah `window_s` tanpa deteksi baru, atau setelah berumur `max_age_s`.
+
+    JPEG dibuat lewat `make_jpeg()` hanya jika deteksi menjadi frame terbaik klasternya,
+    sehingga frame duplikat tidak di-render/encode sama sekali. Encode berjalan di luar
+    lock; klaster yang masih menunggu encode baru di-emit setelah frame-nya terpasang.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[DetectionCluster], None],
+        radius_m: float = 25.0,
+        window_s: float = 10.0,
+        max_age_s: float = 60.0,
+        max_clusters: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.emit = emit
+        self.radius_m = radius_m
+        self.window_s = window_s
+        self.max_age_s = max_age_s
+        self.max_clusters = max(1, max_clusters)
+        self.clock = clock
+        self.enabled = radius_m > 0 and window_s > 0
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._clusters: Dict[int, DetectionCluster] = {}
+        self._indexes: Dict[str, GridIndex] = {}
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        self.received = 0
+        self.emitted = 0
+
+    def submit(
+        self,
+        damage_type: str,
+        lat: Optional[float],
+        lon: Optional[float],
+        score: float,
+        make_jpeg: Callable[[], bytes],
+        source: str = "",
+    ) -> bool:
+        """
+        Mencatat satu deteksi. True jika deteksi ini menjadi frame terbaik (baru atau
+        mengganti frame klaster sebelumnya), False jika digabung sebagai duplikat.
+        """
+        now = self.clock()
+        if not self.enabled or lat is None or lon is None:
+            with self._lock:
+                self.received += 1
+            # Tanpa lokasi tidak bisa digabung secara spasial: langsung diteruskan
+            self._emit([self._new_cluster(damage_type, lat, lon, score, make_jpeg(), source, now)])
+            return True
+
+        with self._lock:
+            self.received += 1
+            expired = self._pop_expired(now)
+            cluster = self._find(damage_type, lat, lon)
+            if cluster is None:
+                cluster = self._new_cluster(damage_type, lat, lon, score, None, source, now)
+                cluster.cell = self._index(damage_type).insert(cluster.id, lat, lon)
+                self._clusters[cluster.id] = cluster
+                if len(self._clusters) > self.max_clusters:
+                    expired.append(self._pop(min(self._clusters.values(), key=lambda c: c.last_seen)))
+                is_best = True
+            else:
+                is_best = score > cluster.best_score
+                cluster.hits += 1
+                cluster.last_seen = now
+
+            if is_best:
+                # Slot frame terbaik dipesan di dalam lock; encode dilakukan di luar lock
+                cluster.best_score = score
+                cluster.best_seq += 1
+                cluster.pending += 1
+                seq = cluster.best_seq
+            # Klaster yang masih menunggu encode di-emit oleh pemanggil yang meng-encode
+            expired = [c for c in expired if c.pending == 0]
+        self._emit(expired)
+
+        if is_best:
+            jpeg = None
+            try:
+                jpeg = make_jpeg()
+            finally:
+                with self._lock:
+                    cluster.pending -= 1
+                    if jpeg is not None and cluster.best_seq == seq:
+                        cluster.jpeg = jpeg
+                        cluster.best_lat, cluster.best_lon = lat, lon
+                        cluster.detected_at = time.time()
+                        cluster.source = source
+                    closed = cluster.pending == 0 and cluster.id not in self._clusters
+                if closed:
+                    self._emit([cluster])
+        return is_best
+
+    def flush_expired(self):
+        with self._lock:
+            expired = [c for c in self._pop_expired(self.clock()) if c.pending == 0]
+        self._emit(expired)
+
+    def flush_all(self):
+        with self._lock:
+            clusters = [self._pop(cluster) for cluster in list(self._clusters.values())]
+            clusters = [c for c in clusters if c.pending == 0]
+        self._emit(clusters)
+
+    def start(self):
+        """Thread penyapu: menutup klaster yang kedaluwarsa meski tidak ada deteksi baru."""
+        if not self.enabled or (self._sweeper and self._sweeper.is_alive()):
+            return
+        self._stop.clear()
+
+        def _run():
+            interval = min(1.0, self.window_s / 2)
+            while not self._stop.wait(interval):
+                self.flush_expired()
+
+        self._sweeper = threading.Thread(target=_run, name="detection-suppressor", daemon=True)
+        self._sweeper.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=2)
+        self.flush_all()
+        print(
+            f"Detection Suppressor: Berhenti. Deteksi masuk: {self.received}, laporan: {self.emitted}."
+        )
+
+    def _index(self, damage_type: str) -> GridIndex:
+        index = self._indexes.get(damage_type)
+        if index is None:
+            index = self._indexes[damage_type] = GridIndex(self.radius_m)
+        return index
+
+    def _new_cluster(self, damage_type, lat, lon, score, jpeg, source, now) -> DetectionCluster:
+        cluster = DetectionCluster()
+        cluster.id = next(self._ids)
+        cluster.damage_type = damage_type
+        cluster.source = source
+        cluster.lat = cluster.best_lat = lat
+        cluster.lon = cluster.best_lon = lon
+        cluster.first_seen = cluster.last_seen = now
+        cluster.hits = 1
+        cluster.best_score = score
+        cluster.detected_at = time.time()
+        cluster.jpeg = jpeg
+        cluster.cell = None
+        cluster.best_seq = 0
+        cluster.pending = 0
+        return cluster
+
+    def _find(self, damage_type: str, lat: float, lon: float) -> Optional[DetectionCluster]:
+        best, best_distance = None, self.radius_m
+        for cluster_id in self._index(damage_type).nearby(lat, lon):
+            cluster = self._clusters[cluster_id]
+            # Jarak diukur dari posisi awal klaster (jangkar), bukan deteksi terakhir
+            distance = haversine_m(lat, lon, cluster.lat, cluster.lon)
+            if distance <= best_distance:
+                best, best_distance = cluster, distance
+        return best
+
+    def _pop(self, cluster: DetectionCluster) -> DetectionCluster:
+        del self._clusters[cluster.id]
+        self._index(cluster.damage_type).remove(cluster.id, cluster.cell)
+        return cluster
+
+    def _pop_expired(self, now: float) -> List[DetectionCluster]:
+        return [
+            self._pop(cluster)
+            for cluster in list(self._clusters.values())
+            if now - cluster.last_seen >= self.window_s
+            or now - cluster.first_seen >= self.max_age_s
+        ]
+
+    def _emit(self, clusters: List[DetectionCluster]):
+        # Di luar lock: emit menulis file dan mengantrekan laporan
+        for cluster in clusters:
+            if cluster.jpeg is None:
+                # Semua encode frame klaster ini gagal: tidak ada yang bisa disimpan
+                print(f"Detection Suppressor: Klaster {cluster.damage_type} dibuang (tanpa frame).")
+                continue
+            try:
+                self.emit(cluster)
+                self.emitted += 1
+            except Exception as e:
+                print(f"Detection Suppressor Error: Gagal menyimpan klaster {cluster.damage_type}: {e}")
+
+
+def create_detection_suppressor(detector_settings, emit) -> DetectionSuppressor:
+    return DetectionSuppressor(
+        emit,
+        radius_m=detector_settings.suppress_radius_m,
+        window_s=detector_settings.suppress_window_s,
+        max_age_s=detector_settings.suppress_max_age_s,
+        max_clusters=detector_settings.suppress_max_clusters,
+    )
@@ -0,0 +1,175 @@
+# app/services/location_service.py
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from ..core.config import LOCATION_SETTINGS
+from ..core.locaton_store import get_last_location, update_location
+
+
+class LocationFix(NamedTuple):
+    timestamp: float  # Detik epoch
+    lat: float
+    lon: float
+
+
+class LocationService(object):
+    """
+    Lokasi GPS terkini di dalam proses: ring buffer fix bertimestamp dari
+    /location/update, dan posisi per frame lewat `location_at(capture_ts)`.
+
+    - Satu penulis (endpoint /location/update di event loop), banyak pembaca (thread
+      deteksi) tanpa lock: slot diisi dulu, baru `_count` dinaikkan. Pembaca tidak
+      menyentuh slot tertua yang akan ditimpa penulis berikutnya.
+    - Posisi di antara dua fix diinterpolasi linear; setelah fix terakhir diperkirakan
+      dari kecepatan dua fix terakhir, maks. `max_extrapolation_s` detik.
+    - Disk hanya ditulis oleh thread persist tiap `persist_interval_s` (dan saat
+      shutdown); snapshot terakhir dimuat lagi saat start.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 64,
+        persist_interval_s: float = 5.0,
+        max_fix_age_s: float = 30.0,
+        max_extrapolation_s: float = 1.0,
+        max_clock_skew_s: float = 10.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.buffer_size = max(2, buffer_size)
+        self.persist_interval_s = persist_interval_s
+        self.max_fix_age_s = max_fix_age_s
+        self.max_extrapolation_s = max_extrapolation_s
+        self.max_clock_skew_s = max_clock_skew_s
+        self.clock = clock
+        self._fixes: List[Optional[LocationFix]] = [None] * self.buffer_size
+        self._count = 0  # Total fix yang pernah ditulis; slot terbaru = (_count - 1) % size
+        self._persisted_count = 0
+        self._stop = threading.Event()
+        self._persister: Optional[threading.Thread] = None
+
+    def update(self, lat: float, lon: float, timestamp: Optional[float] = None) -> LocationFix:
+        """Mencatat fix baru. `timestamp` (detik epoch) dari klien dipakai jika masuk akal."""
+        now = self.clock()
+        if timestamp is None or abs(timestamp - now) > self.max_clock_skew_s:
+            timestamp = now
+        latest = self.latest()
+        if latest is not None and timestamp <= latest.timestamp:
+            # Request yang datang terlambat tidak boleh merusak urutan waktu buffer
+            return latest
+        fix = LocationFix(timestamp, lat, lon)
+        self._fixes[self._count % self.buffer_size] = fix
+        self._count += 1
+        return fix
+
+    def latest(self) -> Optional[LocationFix]:
+        count = self._count
+        return self._fixes[(count - 1) % self.buffer_size] if count else None
+
+    def _snapshot(self) -> List[LocationFix]:
+        count = self._count
+        # Slot tertua dilewati: itu yang ditimpa oleh update() berikutnya
+        start = max(0, count - self.buffer_size + 1)
+        fixes = [self._fixes[i % self.buffer_size] for i in range(start, count)]
+        # Jika penulis sempat menyusul saat membaca, urutan waktu rusak di titik itu
+        for i in range(len(fixes) - 1, 0, -1):
+            if fixes[i - 1].timestamp >= fixes[i].timestamp:
+                return fixes[i:]
+        return fixes
+
+    def location_at(self, timestamp: Optional[float] = None) -> Optional[LocationFix]:
+        """Posisi pada waktu `timestamp` (default: sekarang), atau None jika tidak ada fix yang cukup baru."""
+        if timestamp is None:
+            timestamp = self.clock()
+        fixes = self._snapshot()
+        if not fixes:
+            return None
+
+        newer = None
+        for fix in reversed(fixes):
+            if fix.timestamp <= timestamp:
+                older = fix
+                break
+            newer = fix
+        else:
+            # Frame lebih tua dari semua fix di buffer: pakai fix tertua jika cukup dekat
+            oldest = fixes[0]
+            if oldest.timestamp - timestamp > self.max_fix_age_s:
+                return None
+            return LocationFix(timestamp, oldest.lat, oldest.lon)
+
+        if newer is not None:
+            return self._interpolate(older, newer, timestamp)
+
+        # Frame setelah fix terakhir
+        if timestamp - older.timestamp > self.max_fix_age_s:
+            return None
+        if len(fixes) >= 2 and self.max_extrapolation_s > 0:
+            previous = fixes[-2]
+            if older.timestamp - previous.timestamp <= self.max_fix_age_s:
+                target = min(timestamp, older.timestamp + self.max_extrapolation_s)
+                return self._interpolate(previous, older, target)._replace(timestamp=timestamp)
+        return LocationFix(timestamp, older.lat, older.lon)
+
+    @staticmethod
+    def _interpolate(a: LocationFix, b: LocationFix, timestamp: float) -> LocationFix:
+        span = b.timestamp - a.timestamp
+        ratio = (timestamp - a.timestamp) / span if span > 0 else 0.0
+        return LocationFix(
+            timestamp, a.lat + (b.lat - a.lat) * ratio, a.lon + (b.lon - a.lon) * ratio
+        )
+
+    # --- Persistensi periodik ---
+    def load(self):
+        """Memuat snapshot terakhir dari disk (fix lama tetap dibatasi max_fix_age_s)."""
+        stored = get_last_location()
+        if stored.get("lat") is None or stored.get("lon") is None:
+            return
+        timestamp = stored.get("timestamp") or 0.0  # Format lama tanpa timestamp
+        if self._count == 0:
+            self._fixes[0] = LocationFix(float(timestamp), stored["lat"], stored["lon"])
+            self._count = self._persisted_count = 1
+
+    def persist(self):
+        count = self._count
+        if count == self._persisted_count:
+            return
+        fix = self.latest()
+        try:
+            update_location(fix.lat, fix.lon, fix.timestamp)
+            self._persisted_count = count
+        except OSError as e:
+            print(f"Location Service: Gagal menyimpan lokasi ke disk: {e}")
+
+    def start(self):
+        if self._persister and self._persister.is_alive():
+            return
+        self.load()
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(self.persist_interval_s):
+                self.persist()
+
+        self._persister = threading.Thread(target=_run, name="location-persist", daemon=True)
+        self._persister.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._persister:
+            self._persister.join(timeout=2)
+        self.persist()
+
+
+def create_location_service(location_settings) -> LocationService:
+    return LocationService(
+        buffer_size=location_settings.buffer_size,
+        persist_interval_s=location_settings.persist_interval_s,
+        max_fix_age_s=location_settings.max_fix_age_s,
+        max_extrapolation_s=location_settings.max_extrapolation_s,
+        max_clock_skew_s=location_settings.max_clock_skew_s,
+    )
+
+
+# Satu layanan lokasi untuk seluruh proses; dijalankan/dihentikan oleh event startup/shutdown
+location_service = create_location_service(LOCATION_SETTINGS)
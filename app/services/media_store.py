@@ -0,0 +1,231 @@
+# app/services/media_store.py
+import glob
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy.orm import Session
+
+from ..core.config import UPLOAD_FILES_DIRECTORY
+from ..core.database import SessionLocal
+from ..models.report_model import MediaAlias, Report
+
+MEDIA_URL_PREFIX = "/uploads/"
+# Objek disimpan di <root>/ab/cd/<sha256><ext>: 65536 direktori daun, masing-masing kecil
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+_OBJECT_NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+# File sementara selama upload/hash, di filesystem yang sama agar rename atomik
+TMP_DIR_NAME = ".tmp"
+# Objek yang baru disimpan/di-dedup tidak dihapus dulu: laporan yang memakainya
+# mungkin belum di-commit
+DELETE_GRACE_S = 60.0
+_ALIAS_CACHE_MAX = 10000
+
+
+def is_object_name(name: str) -> bool:
+    return bool(_OBJECT_NAME_RE.match(name))
+
+
+class MediaWriter(object):
+    """Menulis satu objek bertahap sambil menghitung sha256; commit() memindahkannya ke shard."""
+
+    def __init__(self, store: "MediaStore", extension: str):
+        self.store = store
+        self.extension = extension.lower()
+        self.size = 0
+        self._hash = hashlib.sha256()
+        store.tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=store.tmp_dir, suffix=self.extension)
+        self._file = os.fdopen(fd, "wb")
+        self.tmp_path = Path(tmp_path)
+
+    def write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> str:
+        """Mengembalikan URL /uploads/<sha256><ext>; konten identik disimpan sekali saja."""
+        self._file.close()
+        name = self._hash.hexdigest() + self.extension
+        path = self.store.object_path(name)
+        if path.exists():
+            self.tmp_path.unlink()
+            os.utime(path)  # Perpanjang masa tenggang hapus (lihat DELETE_GRACE_S)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.tmp_path, path)
+        return self.store.url_for(name)
+
+    def abort(self):
+        self._file.close()
+        try:
+            self.tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+
+
+class MediaStore(object):
+    """
+    Penyimpanan media (foto laporan, frame deteksi) beralamat konten: nama file adalah
+    sha256 isinya, disebar ke direktori bertingkat, dan upload identik hanya disimpan
+    sekali. URL tetap berbentuk /uploads/<nama>; nama lama dari direktori datar
+    dipetakan lewat tabel media_aliases (diisi oleh app.services.migrate_media), dan
+    file datar yang belum dimigrasi tetap dilayani apa adanya.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.tmp_dir = root / TMP_DIR_NAME
+        # Cache alias yang ditemukan (alias tidak pernah berubah setelah dibuat)
+        self._alias_cache: Dict[str, str] = {}
+
+    def _shard_dir(self, digest: str) -> Path:
+        return self.root.joinpath(
+            *(digest[i * SHARD_WIDTH : (i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS))
+        )
+
+    def object_path(self, object_name: str) -> Path:
+        return self._shard_dir(object_name) / object_name
+
+    def canonical_name(self, name: str, db: Optional[Session] = None) -> str:
+        """Nama objek untuk nama di URL (hash atau alias); nama datar lama apa adanya."""
+        if is_object_name(name):
+            return name
+        return self.lookup_alias(name, db) or name
+
+    def derived_path(self, key: str, suffix: str) -> Path:
+        """
+        Lokasi file turunan (mis. thumbnail) dari objek `key`: di samping objeknya, atau
+        di shard sha256(nama) untuk file datar lama. Ikut terhapus saat objek dihapus.
+        """
+        digest = key if is_object_name(key) else hashlib.sha256(key.encode()).hexdigest()
+        return self._shard_dir(digest) / f"{key}.{suffix}"
+
+    def _remove_derived(self, key: str):
+        directory = self.derived_path(key, "").parent
+        for path in directory.glob(f"{glob.escape(key)}.*"):
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def url_for(name: str) -> str:
+        return MEDIA_URL_PREFIX + name
+
+    @staticmethod
+    def name_from_url(url: Optional[str]) -> Optional[str]:
+        if not url or not url.startswith(MEDIA_URL_PREFIX):
+            return None
+        name = url[len(MEDIA_URL_PREFIX) :]
+        if not name or "/" in name or name in (".", ".."):
+            return None
+        return name
+
+    def open_writer(self, extension: str) -> MediaWriter:
+        return MediaWriter(self, extension)
+
+    def put_bytes(self, data: bytes, extension: str) -> str:
+        with self.open_writer(extension) as writer:
+            writer.write(data)
+            return writer.commit()
+
+    # --- Resolusi nama -> file ---
+    def lookup_alias(self, name: str, db: Optional[Session] = None) -> Optional[str]:
+        object_name = self._alias_cache.get(name)
+        if object_name is not None:
+            return object_name
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            object_name = db.query(MediaAlias.object_name).filter(MediaAlias.alias == name).scalar()
+        finally:
+            if own_session:
+                db.close()
+        if object_name is not None:
+            if len(self._alias_cache) >= _ALIAS_CACHE_MAX:
+                self._alias_cache.clear()
+            self._alias_cache[name] = object_name
+        return object_name
+
+    def candidate_paths(self, name: str) -> List[Path]:
+        """Lokasi file untuk nama di URL, urut prioritas."""
+        if is_object_name(name):
+            return [self.object_path(name)]
+        object_name = self.lookup_alias(name)
+        paths = [self.object_path(object_name)] if object_name else []
+        # Belum dimigrasi (atau migrasi terhenti setelah alias dicatat, sebelum file dipindah)
+        paths.append(self.root / name)
+        return paths
+
+    def release(self, url: Optional[str], db: Session) -> bool:
+        """
+        Menghapus file di balik `url` jika tidak ada laporan lain yang masih memakainya
+        (lewat URL kanonik maupun alias lama). Dipanggil setelah commit laporan.
+        """
+        name = self.name_from_url(url)
+        if name is None:
+            return False
+        object_name = name if is_object_name(name) else self.lookup_alias(name, db)
+        if object_name is None:
+            urls, path, key = [url], self.root / name, name
+        else:
+            aliases = db.query(MediaAlias.alias).filter(MediaAlias.object_name == object_name)
+            urls = [self.url_for(object_name)] + [self.url_for(alias) for (alias,) in aliases]
+            path, key = self.object_path(object_name), object_name
+        if db.query(Report.id).filter(Report.photo_url.in_(urls)).first() is not None:
+            return False
+        try:
+            if time.time() - path.stat().st_mtime < DELETE_GRACE_S:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        self._remove_derived(key)
+        print(f"Media Store: File dihapus dari disk: {path}")
+        return True
+
+
+class MediaStaticFiles(StaticFiles):
+    """StaticFiles untuk /uploads yang me-resolve nama lewat MediaStore (shard/alias/datar)."""
+
+    def __init__(
+        self,
+        store: MediaStore,
+        derived_resolver: Optional[Callable[[str], Optional[Path]]] = None,
+        **kwargs,
+    ):
+        super().__init__(directory=str(store.root), **kwargs)
+        self.store = store
+        # Nama yang tidak ada sebagai file dicoba sebagai file turunan (dibuat bila perlu)
+        self.derived_resolver = derived_resolver
+
+    def lookup_path(self, path: str):
+        if "/" in path or path in ("", ".", ".."):
+            # Subdirektori lama (mis. ws_detections/...) dilayani seperti biasa
+            return super().lookup_path(path)
+        for full_path in self.store.candidate_paths(path):
+            try:
+                return str(full_path), os.stat(full_path)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+        if self.derived_resolver is not None:
+            full_path = self.derived_resolver(path)
+            if full_path is not None and full_path.is_file():
+                return str(full_path), os.stat(full_path)
+        return "", None
+
+
+# Satu media store untuk seluruh proses
+media_store = MediaStore(UPLOAD_FILES_DIRECTORY)
@@ -0,0 +1,102 @@
+# app/services/migrate_media.py
+"""
+Migrasi direktori upload datar (media_uploads/<uuid>.jpg, detected_frame_*.jpg, ...)
+ke media store beralamat konten (media_uploads/ab/cd/<sha256>.jpg).
+
+Per file: hash isi -> alias (nama lama -> nama objek) di-commit ke tabel
+media_aliases -> file dipindah ke shard (atau dihapus jika konten identik sudah ada).
+Urutan ini membuat migrasi aman dihentikan dan diulang kapan saja: URL lama tetap
+ter-resolve, baik sebelum maupun sesudah file dipindah. Kolom photo_url laporan tidak
+diubah. Jalankan setelah `alembic upgrade head`.
+
+Contoh:
+    python -m app.services.migrate_media --dry-run
+    python -m app.services.migrate_media --batch-size 500
+"""
+import argparse
+import hashlib
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+from ..core.database import SessionLocal
+from ..models.report_model import MediaAlias
+from ..utils.file_utils import VALID_IMAGE_EXTENSIONS
+from .media_store import MediaStore, media_store
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _flush(store: MediaStore, db, pending: List[Tuple[Path, str]], stats: dict, dry_run: bool):
+    if not pending:
+        return
+    if not dry_run:
+        for path, object_name in pending:
+            db.merge(MediaAlias(alias=path.name, object_name=object_name))
+        db.commit()  # Alias dulu: URL lama tetap valid apa pun yang terjadi setelah ini
+    for path, object_name in pending:
+        target = store.object_path(object_name)
+        # Saat dry run file tidak dipindah, jadi duplikat dalam satu run dilacak di sini
+        if target.exists() or object_name in stats["seen"]:
+            stats["duplicates"] += 1
+            if not dry_run:
+                path.unlink()
+        else:
+            stats["moved"] += 1
+            if not dry_run:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(path, target)
+        stats["seen"].add(object_name)
+    pending.clear()
+
+
+def migrate(store: MediaStore, batch_size: int = 500, dry_run: bool = False) -> dict:
+    stats = {"moved": 0, "duplicates": 0, "skipped": 0, "seen": set()}
+    extensions = {ext.lower() for ext in VALID_IMAGE_EXTENSIONS}
+    pending: List[Tuple[Path, str]] = []
+    db = SessionLocal()
+    try:
+        # Hanya file di level teratas; direktori shard dan .tmp dilewati
+        for path in sorted(store.root.iterdir()):
+            suffix = path.suffix.lower()
+            if not path.is_file() or suffix not in extensions:
+                stats["skipped"] += 1
+                continue
+            pending.append((path, hash_file(path) + suffix))
+            if len(pending) >= batch_size:
+                _flush(store, db, pending, stats, dry_run)
+                print(f"Migrasi media: {stats['moved']} dipindah, {stats['duplicates']} duplikat...")
+        _flush(store, db, pending, stats, dry_run)
+    finally:
+        db.close()
+    stats.pop("seen")
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrasi direktori upload datar ke media store")
+    parser.add_argument("--batch-size", type=int, default=500, help="File per commit alias")
+    parser.add_argument("--dry-run", action="store_true", help="Hanya hitung, tanpa mengubah apa pun")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"Migrasi media di '{media_store.root}'{' (dry run)' if args.dry_run else ''}")
+    stats = migrate(media_store, batch_size=args.batch_size, dry_run=args.dry_run)
+    print(
+        f"Selesai: {stats['moved']} file dipindah ke shard, {stats['duplicates']} duplikat "
+        f"digabung, {stats['skipped']} entri dilewati."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# app/services/report_events.py
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+
+# Event yang tersimpan untuk resume (?since_id= / Last-Event-ID)
+REPORT_EVENT_BUFFER_SIZE = 1000
+# Maks. event menunggu per klien; klien yang tertinggal diminta resync
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class _Subscriber(object):
+    __slots__ = ("loop", "queue", "overflowed")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Tuple[int, str]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def _put(self, event: Tuple[int, str]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ReportEventBus(object):
+    """
+    Bus event laporan (created/updated/deleted) di dalam proses, untuk endpoint SSE.
+
+    - Event diserialisasi sekali saat publish, bukan per klien.
+    - `publish` aman dipanggil dari thread mana pun (endpoint, report writer).
+    - ID event naik monoton dan dimulai dari waktu start proses (mikrodetik), sehingga
+      ID dari proses sebelumnya selalu lebih kecil dari buffer saat ini: klien yang
+      resume dengan ID lama/terlalu jauh tertinggal mendapat event "resync".
+    - `version` berubah setiap ada perubahan laporan; dipakai sebagai dasar ETag.
+    """
+
+    def __init__(self, buffer_size: int = REPORT_EVENT_BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._buffer: Deque[Tuple[int, str]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[_Subscriber] = set()
+        self._last_id = time.time_ns() // 1000
+
+    @property
+    def version(self) -> int:
+        return self._last_id
+
+    def publish(self, event_type: str, payload: dict):
+        data = json.dumps({"type": event_type, **payload}, default=str)
+        with self._lock:
+            self._last_id += 1
+            event = (self._last_id, f"id: {self._last_id}\nevent: {event_type}\ndata: {data}\n\n")
+            self._buffer.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber._put, event)
+            except RuntimeError:  # Event loop klien sudah ditutup
+                self.unsubscribe(subscriber)
+
+    def subscribe(self, since_id: Optional[int]) -> Tuple[_Subscriber, Optional[List[str]]]:
+        """
+        Mendaftarkan klien. Mengembalikan (subscriber, backlog): backlog berisi event
+        setelah `since_id`, atau None jika event tersebut sudah tidak ada di buffer
+        (klien harus memuat ulang data penuh).
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if since_id is None:
+                return subscriber, []
+            oldest_id = self._buffer[0][0] if self._buffer else self._last_id + 1
+            if since_id > self._last_id or since_id < oldest_id - 1:
+                return subscriber, None
+            return subscriber, [message for event_id, message in self._buffer if event_id > since_id]
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def resync_message(last_id: int) -> str:
+    return f"id: {last_id}\nevent: resync\ndata: {json.dumps({'type': 'resync'})}\n\n"
+
+
+# Satu bus untuk seluruh proses
+report_event_bus = ReportEventBus()
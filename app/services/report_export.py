@@ -0,0 +1,150 @@
+# app/services/report_export.py
+import csv
+import io
+import json
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from ..core.database import SessionLocal
+from ..core.db_executor import db_executor
+from ..models.report_model import ReportStatusEnum
+from ..repositories.report_repository import ReportRepository
+
+# Baris per halaman keyset = baris per chunk yang dikirim ke klien
+EXPORT_BATCH_SIZE = 1000
+# Kolom ekspor (nama sama dengan respons API: 'type', bukan 'damage_type')
+EXPORT_COLUMNS = (
+    "id",
+    "lat",
+    "lng",
+    "type",
+    "severity",
+    "status",
+    "description",
+    "photo_url",
+    "date_reported",
+)
+
+
+def _row_values(row) -> tuple:
+    mapping = row._mapping
+    return tuple(
+        getattr(mapping[column], "value", mapping[column]) for column in EXPORT_COLUMNS
+    )
+
+
+def _ndjson_chunk(rows: List, first: bool) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _row_values(row))), default=str) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows: List, first: bool) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(_row_values(row) for row in rows)
+    return buffer.getvalue()
+
+
+def _csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+def _geojson_chunk(rows: List, first: bool) -> str:
+    features = []
+    for row in rows:
+        values = dict(zip(EXPORT_COLUMNS, _row_values(row)))
+        lat, lng = values.pop("lat"), values.pop("lng")
+        features.append(
+            json.dumps(
+                {
+                    "type": "Feature",
+                    "id": values["id"],
+                    "geometry": {"type": "Point", "coordinates": [lng, lat]},
+                    "properties": values,
+                },
+                default=str,
+            )
+        )
+    chunk = ",\n".join(features)
+    return chunk if first else ",\n" + chunk
+
+
+# format -> (serializer chunk, media type, pembuka, penutup)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "ndjson": (_ndjson_chunk, "application/x-ndjson", "", ""),
+    "csv": (_csv_chunk, "text/csv; charset=utf-8", _csv_header(), ""),
+    "geojson": (
+        _geojson_chunk,
+        "application/geo+json",
+        '{"type": "FeatureCollection", "features": [\n',
+        "\n]}\n",
+    ),
+}
+
+
+def validate_export_params(
+    export_format: str, date_from: Optional[date], date_to: Optional[date]
+):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Format ekspor tidak dikenal. Pilihan: {list(EXPORT_FORMATS)}",
+        )
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="date_from harus <= date_to.",
+        )
+
+
+async def stream_report_export(
+    export_format: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    report_status: Optional[ReportStatusEnum] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """
+    Menghasilkan ekspor laporan per chunk untuk StreamingResponse. Setiap chunk adalah
+    satu halaman keyset (`id > id terakhir`, `batch_size` baris) yang diambil dan
+    diserialisasi di db_executor dengan Session pendek: koneksi baca dikembalikan ke pool
+    sebelum chunk dikirim, sehingga unduhan lambat tidak menghabiskan pool reader dan
+    tidak menahan checkpoint WAL. Hanya satu halaman baris yang ada di memori.
+
+    Karena tiap halaman transaksi terpisah, laporan yang dibuat/diubah selama ekspor
+    berjalan bisa ikut atau tidak ikut terekspor (urutan ID tetap tanpa duplikat).
+    """
+    serialize, _, opening, closing = EXPORT_FORMATS[export_format]
+
+    def next_page(after_id: Optional[int], first: bool) -> Tuple[Optional[int], str]:
+        db = SessionLocal()
+        try:
+            rows = ReportRepository(db).get_reports_for_export_page(
+                after_id=after_id,
+                limit=batch_size,
+                date_from=date_from,
+                date_to=date_to,
+                report_status=report_status,
+            )
+        finally:
+            db.close()
+        if not rows:
+            return after_id, ""
+        return rows[-1].id, serialize(rows, first)
+
+    if opening:
+        yield opening
+    after_id, first = None, True
+    while True:
+        after_id, chunk = await db_executor.run(next_page, after_id, first)
+        if not chunk:
+            break
+        first = False
+        yield chunk
+    if closing:
+        yield closing
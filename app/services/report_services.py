@@ -5,9 +5,28 @@ from typing import Optional, List
 
 # Impor repositori, skema Pydantic, dan model SQLAlchemy
 from ..repositories.report_repository import ReportRepository
+from ..repositories.report_cluster_aggregates import cluster_zoom
 from ..schemas.report_schema import *  # Ini akan menyediakan schemas.ReportCreate, schemas.ReportResponse, dll.
 from ..models.report_model import *  # Ini akan menyediakan models_db.Report untuk tipe return
 from ..core.database import get_db_session  # Dependency untuk mendapatkan sesi DB
+from ..core.db_executor import db_executor
+from ..utils.file_utils import UploadTooLarge
+from .report_events import report_event_bus
+
+
+def _publish_report_event(event_type: str, payload: dict):
+    """Event created/updated/deleted untuk klien SSE; kegagalan tidak membatalkan operasi."""
+    try:
+        report_event_bus.publish(event_type, payload)
+    except Exception as e:
+        print(f"Service Error saat mengirim event laporan '{event_type}': {e}")
+
+
+def _report_payload(report) -> dict:
+    # Bentuk JSON sama dengan respons API (alias 'type')
+    return {
+        "report": ReportResponse.model_validate(report).model_dump(mode="json", by_alias=True)
+    }
 
 
 class ReportService:
@@ -42,7 +61,12 @@ class ReportService:
             # --- Contoh Logika Bisnis Setelah Pembuatan (Opsional) ---
             # Misalnya, mengirim notifikasi
             # send_notification(f"Laporan baru dibuat: ID {created_db_report.id}")
+            _publish_report_event("created", _report_payload(created_db_report))
             return created_db_report
+        except UploadTooLarge as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+            )
         except (
             Exception
         ) as e:  # Menangkap error umum dari repositori atau proses penyimpanan file
@@ -73,25 +97,38 @@ class ReportService:
         return db_report
 
     def get_all_reports_paginated(
-        self, page: int = 1, limit: int = 10
+        self, page: int = 1, limit: int = 10, after_id: Optional[int] = None
     ) -> ReportPaginatedResponse:
         """
         Mengambil semua laporan dengan paginasi.
         Mengembalikan objek skema Pydantic ReportPaginatedResponse.
+
+        Jika `after_id` diberikan, dipakai paginasi keyset (cursor) lewat index primary
+        key; `page` hanya diteruskan sebagai informasi. Tanpa `after_id`, paginasi
+        OFFSET lama tetap dipakai (kompatibilitas).
         """
         # Validasi parameter paginasi dasar
         current_page = max(1, page)
         items_per_page = max(1, min(100, limit))  # Batasi limit untuk keamanan/performa
 
-        offset = (current_page - 1) * items_per_page
-
         print(
-            f"Service: Mengambil semua laporan, page={current_page}, limit={items_per_page}"
+            f"Service: Mengambil semua laporan, page={current_page}, limit={items_per_page}, after_id={after_id}"
         )
 
-        db_report_list: List[Report] = self.report_repo.get_all_reports_from_db(
-            skip=offset, limit=items_per_page
-        )
+        # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+        if after_id is not None:
+            db_report_list: List[Report] = self.report_repo.get_reports_after_id_from_db(
+                after_id=after_id, limit=items_per_page + 1
+            )
+        else:
+            offset = (current_page - 1) * items_per_page
+            db_report_list = self.report_repo.get_all_reports_from_db(
+                skip=offset, limit=items_per_page + 1
+            )
+        has_next = len(db_report_list) > items_per_page
+        db_report_list = db_report_list[:items_per_page]
+
+        # Total dari cache (tidak ada COUNT(*) per request)
         total_item_count: int = self.report_repo.count_total_reports_in_db()
 
         total_page_count: int = (
@@ -111,6 +148,85 @@ class ReportService:
             reports=reports_for_api_response,
             current_page=current_page,
             total_pages=total_page_count,
+            next_after_id=db_report_list[-1].id if has_next else None,
+        )
+
+    def get_reports_within_bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        limit: int = 1000,
+    ) -> ReportWithinResponse:
+        """
+        Mengambil laporan di dalam viewport peta (bounding box), maksimal `limit`.
+        Melempar HTTPException 422 jika bbox tidak valid.
+        """
+        if min_lat > max_lat or min_lng > max_lng:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Bounding box tidak valid: min_lat/min_lng harus <= max_lat/max_lng.",
+            )
+
+        # Ambil satu baris ekstra untuk mengetahui apakah hasil terpotong
+        db_report_list: List[Report] = self.report_repo.get_reports_within_bbox_from_db(
+            min_lat, min_lng, max_lat, max_lng, limit=limit + 1
+        )
+        truncated = len(db_report_list) > limit
+        reports_for_api_response = [
+            ReportResponse.model_validate(db_report) for db_report in db_report_list[:limit]
+        ]
+        return ReportWithinResponse(
+            count=len(reports_for_api_response),
+            truncated=truncated,
+            reports=reports_for_api_response,
+        )
+
+    def get_report_clusters(
+        self, zoom: int, bbox: str
+    ) -> ReportClusterListResponse:
+        """
+        Cluster marker peta untuk viewport `bbox` ("min_lng,min_lat,max_lng,max_lat")
+        pada level zoom tertentu, dari agregat yang sudah dihitung sebelumnya.
+        """
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(","))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="bbox harus berformat 'min_lng,min_lat,max_lng,max_lat'.",
+            )
+        if not (
+            -90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Bounding box tidak valid: min harus <= max dan dalam rentang koordinat.",
+            )
+
+        effective_zoom = cluster_zoom(zoom)
+        db_clusters = self.report_repo.get_report_clusters_from_db(
+            effective_zoom, min_lat, min_lng, max_lat, max_lng
+        )
+        clusters = [
+            ReportClusterResponse(
+                lat=cluster.sum_lat / cluster.report_count,
+                lng=cluster.sum_lng / cluster.report_count,
+                count=cluster.report_count,
+                severity_counts={
+                    "low": cluster.count_low,
+                    "medium": cluster.count_medium,
+                    "high": cluster.count_high,
+                    "critical": cluster.count_critical,
+                },
+            )
+            for cluster in db_clusters
+        ]
+        return ReportClusterListResponse(
+            zoom=effective_zoom,
+            total_reports=sum(cluster.count for cluster in clusters),
+            clusters=clusters,
         )
 
     async def update_report(
@@ -125,9 +241,9 @@ class ReportService:
         """
         print(f"Service: Memproses update untuk laporan ID {report_id}")
         # Pertama, pastikan laporan yang akan diupdate ada (akan melempar 404 jika tidak)
-        existing_report = self.get_report_by_id(
-            report_id
-        )  # Menggunakan metode get_report_by_id dari service ini
+        existing_report = await db_executor.run(
+            self.get_report_by_id, report_id
+        )  # Menggunakan metode get_report_by_id dari service ini (di thread DB)
 
         # --- Contoh Logika Bisnis Sebelum Update (Opsional) ---
         # Misalnya, cek apakah status laporan memungkinkan untuk diupdate
@@ -157,7 +273,12 @@ class ReportService:
             # Misalnya, kirim notifikasi jika status berubah
             # if report_update_data.status and report_update_data.status != existing_report.status:
             #     send_status_change_notification(updated_db_report.id, updated_db_report.status.value)
+            _publish_report_event("updated", _report_payload(updated_db_report))
             return updated_db_report
+        except UploadTooLarge as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+            )
         except Exception as e:
             print(f"Service Error saat mengupdate laporan ID {report_id}: {e}")
             raise HTTPException(
@@ -193,6 +314,7 @@ class ReportService:
             # --- Contoh Logika Bisnis Setelah Penghapusan (Opsional) ---
             # Misalnya, log penghapusan
             # log_deletion_event(f"Laporan ID {report_id} telah dihapus.")
+            _publish_report_event("deleted", {"report_id": report_id})
             print(
                 f"Service: Laporan ID {report_id} berhasil diproses untuk penghapusan."
             )
@@ -206,10 +328,25 @@ class ReportService:
     async def create_report_with_existing_photo_url(
         self, report_data: ReportCreate, photo_url: str  # Menerima string URL
     ) -> Report:
-        return await self.report_repo.create_report_with_given_photo_url(
+        created_db_report = await self.report_repo.create_report_with_given_photo_url(
             report_create_data=report_data,
             existing_photo_url=photo_url,  # Meneruskan string URL
         )
+        _publish_report_event("created", _report_payload(created_db_report))
+        return created_db_report
+
+    def create_reports_in_batch(self, report_rows: List[dict]) -> List[int]:
+        """Dipakai report writer: banyak laporan deteksi dalam satu transaksi."""
+        report_ids = self.report_repo.bulk_create_reports_in_db(report_rows)
+        # Event dibangun dari baris yang ditulis (status default), tanpa query ulang
+        for report_id, row in zip(report_ids, report_rows):
+            _publish_report_event(
+                "created",
+                _report_payload(
+                    dict(row, id=report_id, status=ReportStatusEnum.pending.value)
+                ),
+            )
+        return report_ids
 
 
 print(f"OK: Kelas ReportService didefinisikan di {__file__}")
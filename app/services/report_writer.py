@@ -0,0 +1,218 @@
+# app/services/report_writer.py
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import List, Optional
+
+from ..core.config import PROJECT_ROOT, REPORT_WRITER_SETTINGS
+from ..core.database import SessionLocal
+from ..models.report_model import DamageSeverityEnum
+from ..schemas.report_schema import ReportCreate
+from .report_services import ReportService
+
+
+def detection_report_row(
+    lat: float,
+    lng: float,
+    damage_type: str,
+    photo_url: Optional[str],
+    description: Optional[str] = None,
+    severity: DamageSeverityEnum = DamageSeverityEnum.medium,
+) -> dict:
+    """
+    Baris laporan (JSON-safe, bisa ditulis ke spill file) untuk report writer.
+    Divalidasi dengan ReportCreate saat dibuat agar error muncul di pemanggil,
+    bukan saat batch ditulis. Tanggal laporan = tanggal deteksi, bukan tanggal flush.
+    """
+    report = ReportCreate(
+        lat=lat, lng=lng, type=damage_type, severity=severity, description=description
+    )
+    row = report.model_dump(mode="json")
+    row["photo_url"] = photo_url
+    row["date_reported"] = date.today().isoformat()
+    return row
+
+
+def _row_to_model_kwargs(row: dict) -> dict:
+    kwargs = dict(row)
+    kwargs["severity"] = DamageSeverityEnum(kwargs["severity"])
+    kwargs["date_reported"] = date.fromisoformat(kwargs["date_reported"])
+    return kwargs
+
+
+class ReportWriter(object):
+    """
+    Penulis laporan write-behind: pemanggil (WS, LocalDetection, /detect-image) hanya
+    memasukkan baris ke antrean terbatas (tidak pernah menunggu DB). Satu thread
+    background mengumpulkan baris menjadi batch (maks. `batch_size` atau
+    `flush_interval_s`) lalu menulisnya dalam satu transaksi.
+
+    Baris yang tidak bisa ditulis (antrean penuh, DB error, sisa saat shutdown)
+    ditambahkan ke spill file JSONL (fsync) dan diputar ulang saat writer start.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval_s: float = 2.0,
+        spill_path: Optional[Path] = None,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = max(0.0, flush_interval_s)
+        self.spill_path = Path(spill_path) if spill_path else None
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max(1, queue_size))
+        self._stopping = threading.Event()
+        self._spill_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.spilled = 0
+        self.batches = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="report-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, row: dict) -> bool:
+        """Non-blocking. False jika baris dialihkan ke spill file (antrean penuh/berhenti)."""
+        if not self._stopping.is_set():
+            try:
+                self._queue.put_nowait(row)
+                return True
+            except queue.Full:
+                print("Report Writer: Antrean penuh, laporan dialihkan ke spill file.")
+        self._spill([row])
+        return False
+
+    def shutdown(self, timeout: float = 10.0):
+        """Flush semua baris yang tersisa; yang tidak sempat ditulis masuk spill file."""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        leftover = self._drain()
+        if leftover:
+            self._spill(leftover)
+        print(
+            f"Report Writer: Berhenti. Ditulis: {self.written} ({self.batches} batch), spill: {self.spilled}."
+        )
+
+    def _drain(self) -> List[dict]:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _next_batch(self) -> List[dict]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if self._stopping.is_set() or timeout <= 0:
+                    batch.append(self._queue.get_nowait())  # Saat shutdown: jangan menunggu
+                else:
+                    batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        self._replay_spill()
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[dict]) -> bool:
+        db = SessionLocal()
+        try:
+            ReportService(db=db).create_reports_in_batch(
+                [_row_to_model_kwargs(row) for row in batch]
+            )
+            self.written += len(batch)
+            self.batches += 1
+            return True
+        except Exception as e:
+            print(
+                f"Report Writer Error: Gagal menulis {len(batch)} laporan ({e}); dialihkan ke spill file."
+            )
+            self._spill(batch)
+            return False
+        finally:
+            db.close()
+
+    def _spill(self, rows: List[dict]):
+        if not rows:
+            return
+        if self.spill_path is None:
+            print(f"Report Writer Error: Spill file tidak dikonfigurasi, {len(rows)} laporan hilang.")
+            return
+        with self._spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.spilled += len(rows)
+
+    def _replay_spill(self):
+        """Menulis ulang laporan dari spill file (mis. sisa run sebelumnya)."""
+        if self.spill_path is None:
+            return
+        replay_path = self.spill_path.with_name(self.spill_path.name + ".replay")
+        with self._spill_lock:
+            # .replay yang tersisa berarti replay sebelumnya terhenti; proses lebih dulu
+            if not replay_path.exists():
+                if not self.spill_path.exists():
+                    return
+                os.replace(self.spill_path, replay_path)
+
+        rows = []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    print(f"Report Writer: Baris spill {line_no} rusak, dilewati.")
+
+        print(f"Report Writer: Memutar ulang {len(rows)} laporan dari spill file.")
+        for i in range(0, len(rows), self.batch_size):
+            self._write(rows[i : i + self.batch_size])  # Gagal -> kembali ke spill file
+        replay_path.unlink()
+
+
+def create_report_writer(writer_settings, project_root: Path) -> ReportWriter:
+    spill_path = Path(writer_settings.spill_file)
+    if not spill_path.is_absolute():
+        spill_path = project_root / spill_path
+    return ReportWriter(
+        queue_size=writer_settings.queue_size,
+        batch_size=writer_settings.batch_size,
+        flush_interval_s=writer_settings.flush_interval_s,
+        spill_path=spill_path,
+    )
+
+
+# Satu writer untuk seluruh proses; dijalankan/dihentikan oleh event startup/shutdown
+report_writer = create_report_writer(REPORT_WRITER_SETTINGS, PROJECT_ROOT)
@@ -0,0 +1,161 @@
+# app/services/thumbnail_service.py
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+import cv2
+import numpy as np
+
+from ..core.config import UPLOAD_SETTINGS
+from ..utils.image_decode import jpeg_dimensions, reduced_decode_factor
+from .media_store import MediaStore, media_store
+
+# URL varian: /uploads/<nama sumber>.<varian>.<format>, mis. <sha256>.jpg.sm.webp
+_VARIANT_NAME_RE = re.compile(r"^(?P<source>.+\.[A-Za-z0-9]+)\.(?P<variant>[a-z0-9]+)\.(?P<fmt>webp|jpg)$")
+_ENCODE_PARAMS = {
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+}
+
+
+class ThumbnailService(object):
+    """
+    Varian foto laporan (thumbnail kecil/sedang) untuk daftar laporan dan peta.
+
+    - `schedule(photo_url)` dipanggil setelah foto/frame disimpan: semua varian dibuat
+      di pool thread terpisah (cv2 melepas GIL), pemanggil tidak pernah menunggu.
+    - Varian yang belum ada (foto lama, atau job belum selesai) dibuat saat pertama
+      kali diminta lewat /uploads, lalu disimpan di samping objeknya di media store.
+    - URL varian bisa dihitung dari photo_url saja (`variant_urls`), tanpa kolom DB.
+    """
+
+    def __init__(
+        self,
+        store: MediaStore,
+        sizes: Dict[str, int],
+        fmt: str = "webp",
+        quality: int = 80,
+        workers: int = 2,
+    ):
+        self.store = store
+        self.sizes = dict(sizes)
+        self.fmt = fmt
+        self.quality = quality
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="thumbnail"
+        )
+        self._lock = threading.Lock()
+        self._pending: Set[str] = set()
+
+    def variant_urls(self, photo_url: Optional[str]) -> Dict[str, str]:
+        name = self.store.name_from_url(photo_url)
+        if name is None:
+            return {}
+        return {
+            variant: self.store.url_for(f"{name}.{variant}.{self.fmt}") for variant in self.sizes
+        }
+
+    def schedule(self, photo_url: Optional[str]):
+        name = self.store.name_from_url(photo_url)
+        if name is None:
+            return
+        with self._lock:
+            if name in self._pending:
+                return
+            self._pending.add(name)
+        try:
+            self._executor.submit(self._build_all, name)
+        except RuntimeError:  # Executor sudah dihentikan (shutdown)
+            with self._lock:
+                self._pending.discard(name)
+
+    def _build_all(self, name: str):
+        try:
+            for variant in self.sizes:
+                self.build(name, variant)
+        except Exception as e:
+            print(f"Thumbnail: Gagal membuat varian untuk '{name}': {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(name)
+
+    def resolve(self, variant_name: str) -> Optional[Path]:
+        """Dipakai MediaStaticFiles: nama varian di URL -> file (dibuat jika belum ada)."""
+        match = _VARIANT_NAME_RE.match(variant_name)
+        if not match or match["fmt"] != self.fmt or match["variant"] not in self.sizes:
+            return None
+        return self.build(match["source"], match["variant"])
+
+    def build(self, source_name: str, variant: str) -> Optional[Path]:
+        key = self.store.canonical_name(source_name)
+        target = self.store.derived_path(key, f"{variant}.{self.fmt}")
+        if target.is_file():
+            return target
+        source = next((p for p in self.store.candidate_paths(source_name) if p.is_file()), None)
+        if source is None:
+            return None
+
+        img = self._decode(source.read_bytes(), self.sizes[variant])
+        if img is None:
+            print(f"Thumbnail: Foto '{source}' tidak bisa di-decode.")
+            return None
+        ok, buffer = cv2.imencode(
+            f".{self.fmt}", img, [_ENCODE_PARAMS[self.fmt], int(self.quality)]
+        )
+        if not ok:
+            print(f"Thumbnail: Gagal encode {self.fmt} untuk '{source}'.")
+            return None
+
+        # Tulis lewat file sementara + rename: permintaan paralel tidak melihat file parsial
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, target)
+        return target
+
+    @staticmethod
+    def _decode(data: bytes, max_side: int) -> Optional[np.ndarray]:
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        flag = cv2.IMREAD_COLOR
+        size = jpeg_dimensions(buffer)
+        if size is not None:
+            # JPEG: libjpeg langsung men-decode di 1/2, 1/4, 1/8 selama hasilnya >= target
+            scale = max_side / max(size)
+            if scale < 1:
+                _, flag = reduced_decode_factor(
+                    size, (int(size[0] * scale), int(size[1] * scale))
+                )
+        img = cv2.imdecode(buffer, flag)
+        if img is None:
+            return None
+        height, width = img.shape[:2]
+        scale = max_side / max(height, width)
+        if scale >= 1:
+            return img  # Tidak pernah di-upscale
+        return cv2.resize(
+            img,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def photo_variant_urls(photo_url: Optional[str]) -> Dict[str, str]:
+    return thumbnail_service.variant_urls(photo_url)
+
+
+# Satu pool thumbnail untuk seluruh proses; dihentikan oleh event shutdown
+thumbnail_service = ThumbnailService(
+    media_store,
+    UPLOAD_SETTINGS.thumbnail_sizes,
+    fmt=UPLOAD_SETTINGS.thumbnail_format,
+    quality=UPLOAD_SETTINGS.thumbnail_quality,
+    workers=UPLOAD_SETTINGS.thumbnail_workers,
+)
@@ -1,13 +1,13 @@
 # app/utils/file_utils.py
 import os
-from uuid import uuid4  # Untuk menghasilkan nama file unik
-from pathlib import Path  # Untuk manipulasi path yang lebih baik
 from fastapi import UploadFile  # Tipe data untuk file yang diunggah
-import shutil  # Untuk operasi file level tinggi seperti copy
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import TYPE_CHECKING, Optional, Sequence
 
-# Impor direktori upload dari konfigurasi
-from ..core.config import UPLOAD_FILES_DIRECTORY
+from ..core.config import UPLOAD_SETTINGS
+
+if TYPE_CHECKING:
+    from ..services.media_store import MediaStore
 
 # Ekstensi file gambar yang diizinkan (bisa juga ditaruh di config.yaml jika sering berubah)
 VALID_IMAGE_EXTENSIONS = [
@@ -18,68 +18,77 @@ VALID_IMAGE_EXTENSIONS = [
 ]  # Tambahkan .gif sebagai contoh
 
 
+class UploadTooLarge(Exception):
+    """Upload melewati uploads.max_upload_bytes (dipetakan ke HTTP 413 oleh service)."""
+
+
 async def save_upload_file_to_disk(
     upload_file: UploadFile,
-    destination_dir: Path = UPLOAD_FILES_DIRECTORY,  # Menggunakan path dari config
+    store: Optional["MediaStore"] = None,  # Default: media store dari config
+    valid_extensions: Sequence[str] = VALID_IMAGE_EXTENSIONS,
+    max_bytes: Optional[int] = None,  # Default: uploads.max_upload_bytes
 ) -> Optional[str]:
     """
-    Menyimpan file yang diunggah ke direktori tujuan.
+    Menyimpan file yang diunggah ke media store (nama = sha256 isi, direktori shard).
+
+    File di-stream per chunk (uploads.upload_chunk_bytes) ke file sementara: sha256
+    dihitung sambil menulis, tulis/rename dijalankan di threadpool (event loop tidak
+    pernah menunggu disk), dan memori per upload dibatasi satu chunk. Melempar
+    UploadTooLarge begitu ukuran melewati batas (file sementara dihapus).
+    Catatan: saat fungsi ini berjalan, Starlette sudah menerima seluruh body multipart
+    (SpooledTemporaryFile); body besar ditolak lebih awal oleh RequestBodyLimitMiddleware.
     Mengembalikan path URL relatif jika berhasil, None jika gagal atau tipe file tidak valid.
     """
+    from ..services.media_store import media_store  # Hindari impor melingkar
+
+    store = store or media_store
+    max_bytes = UPLOAD_SETTINGS.max_upload_bytes if max_bytes is None else max_bytes
     if not upload_file or not upload_file.filename:
         return None  # Tidak ada file atau tidak ada nama file
 
     original_filename, file_extension = os.path.splitext(upload_file.filename)
     file_extension = file_extension.lower()  # Normalisasi ke huruf kecil
 
-    if file_extension not in VALID_IMAGE_EXTENSIONS:
+    if file_extension not in valid_extensions:
         print(
             f"Peringatan: Ekstensi file tidak valid '{file_extension}' untuk file '{original_filename}'. File tidak disimpan."
         )
         return None  # Atau bisa raise HTTPException(400, "Invalid file type")
 
-    # Buat nama file yang unik untuk menghindari konflik
-    unique_filename_stem = str(uuid4())  # Bagian nama file tanpa ekstensi
-    unique_filename_with_ext = f"{unique_filename_stem}{file_extension}"
-
-    file_save_path: Path = destination_dir / unique_filename_with_ext
-
+    writer = None
     try:
-        # Cara modern dan direkomendasikan untuk menyimpan UploadFile di FastAPI (async)
-        # FastAPI akan menangani pembacaan stream secara efisien.
-        with open(file_save_path, "wb") as buffer:
-            # shutil.copyfileobj(upload_file.file, buffer) # Ini untuk file-like object sinkron
-            # Untuk UploadFile async, kita baca per chunk
-            async for chunk in upload_file.chunks():  # Default chunk size 64KB
-                buffer.write(chunk)
-
-        # Penting: Tutup stream file setelah selesai, terutama jika Anda membuka secara manual.
-        # Namun, jika Anda hanya mengiterasi upload_file.chunks() dan FastAPI menangani
-        # pembukaan stream awal, FastAPI juga yang akan menutupnya.
+        writer = await run_in_threadpool(store.open_writer, file_extension)
+        while True:
+            chunk = await upload_file.read(UPLOAD_SETTINGS.upload_chunk_bytes)
+            if not chunk:
+                break
+            if writer.size + len(chunk) > max_bytes:
+                raise UploadTooLarge(
+                    f"File '{upload_file.filename}' melebihi batas {max_bytes} byte."
+                )
+            await run_in_threadpool(writer.write, chunk)
+        # Rename atomik ke shard (atau buang jika konten identik sudah ada)
+        file_url = await run_in_threadpool(writer.commit)
+
         # Untuk UploadFile, .close() disarankan setelah selesai berinteraksi dengannya.
         await upload_file.close()
 
-        print(
-            f"File '{unique_filename_with_ext}' berhasil disimpan ke '{file_save_path}'"
-        )
-        # Kembalikan path URL relatif yang akan digunakan untuk mengakses file via StaticFiles
-        # Jika StaticFiles di-mount pada "/uploads", maka URL akan menjadi "/uploads/namafile.jpg"
-        return f"/uploads/{unique_filename_with_ext}"
-    except IOError as e:
-        print(f"IOError saat menyimpan file '{unique_filename_with_ext}': {e}")
+        print(f"File '{original_filename}{file_extension}' berhasil disimpan sebagai '{file_url}'")
+        # URL dilayani oleh MediaStaticFiles yang di-mount pada "/uploads"
+        return file_url
+    except UploadTooLarge:
+        writer.abort()
+        raise
     except Exception as e:
         print(
-            f"Error tidak terduga saat menyimpan file '{unique_filename_with_ext}': {e}"
+            f"Error saat menyimpan file '{original_filename}{file_extension}': {e}"
         )
-        # Jika penyimpanan gagal, coba hapus file yang mungkin sudah terbuat sebagian
-        if file_save_path.exists():
-            try:
-                os.remove(file_save_path)
-                print(f"File parsial '{file_save_path}' dihapus setelah error.")
-            except Exception as remove_e:
-                print(
-                    f"Gagal menghapus file parsial '{file_save_path}' setelah error: {remove_e}"
-                )
+    except BaseException:  # Mis. request dibatalkan: jangan tinggalkan file sementara
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.abort()
     return None  # Gagal menyimpan file
 
 
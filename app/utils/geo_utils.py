@@ -0,0 +1,87 @@
+# app/utils/geo_utils.py
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterator, Set, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Jarak lingkaran besar (meter) antara dua titik lat/lon."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex(object):
+    """
+    Index spasial grid lat/lon sederhana di memori. Setiap sel berukuran minimal
+    `cell_size_m` (lebar sel bujur disesuaikan per baris lintang), sehingga semua
+    item dalam radius <= cell_size_m dari suatu titik ada di 3x3 sel sekitarnya.
+    """
+
+    def __init__(self, cell_size_m: float):
+        self.dlat = cell_size_m / METERS_PER_DEG_LAT
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = defaultdict(set)
+
+    def _dlon(self, row: int) -> float:
+        # Pakai tepi baris yang paling dekat kutub agar sel tidak pernah lebih sempit dari radius
+        lat_edge = min(89.9, max(abs(row * self.dlat), abs((row + 1) * self.dlat)))
+        return self.dlat / math.cos(math.radians(lat_edge))
+
+    def cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = math.floor(lat / self.dlat)
+        return row, math.floor(lon / self._dlon(row))
+
+    def insert(self, item: Hashable, lat: float, lon: float) -> Tuple[int, int]:
+        key = self.cell(lat, lon)
+        self._cells[key].add(item)
+        return key
+
+    def remove(self, item: Hashable, key: Tuple[int, int]):
+        items = self._cells.get(key)
+        if items is not None:
+            items.discard(item)
+            if not items:
+                del self._cells[key]
+
+    def nearby(self, lat: float, lon: float) -> Iterator[Hashable]:
+        """Kandidat item di 3x3 sel sekitar titik (cek jarak tetap di pemanggil)."""
+        row = math.floor(lat / self.dlat)
+        for r in (row - 1, row, row + 1):
+            col = math.floor(lon / self._dlon(r))
+            for c in (col - 1, col, col + 1):
+                items = self._cells.get((r, c))
+                if items:
+                    yield from tuple(items)
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._cells.values())
+
+
+# Batas lintang proyeksi Web Mercator (tile peta Leaflet/OSM)
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator_cell(lat: float, lon: float, level: int) -> Tuple[int, int]:
+    """Koordinat tile Web Mercator (x, y) pada level tertentu (2^level tile per sisi)."""
+    n = 1 << level
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def mercator_cell_range(
+    min_lat: float, min_lon: float, max_lat: float, max_lon: float, level: int
+) -> Tuple[int, int, int, int]:
+    """Rentang sel (x0, y0, x1, y1) inklusif yang menutupi bbox; y tumbuh ke selatan."""
+    x0, y0 = mercator_cell(max_lat, min_lon, level)
+    x1, y1 = mercator_cell(min_lat, max_lon, level)
+    return x0, y0, x1, y1
@@ -0,0 +1,125 @@
+# app/utils/image_decode.py
+from typing import Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Marker Start-Of-Frame JPEG (baseline, progressive, dst.); C4/C8/CC bukan SOF
+_SOF_MARKERS = frozenset(
+    (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+)
+# Faktor reduksi yang didukung libjpeg lewat cv2.imdecode (terbesar dulu)
+_REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+def jpeg_dimensions(data) -> Optional[Tuple[int, int]]:
+    """
+    Membaca (lebar, tinggi) dari header SOF JPEG tanpa decode.
+    `data` boleh bytes, bytearray, memoryview atau array uint8 (tidak disalin).
+    Mengembalikan None jika bukan JPEG atau header tidak bisa dibaca.
+    """
+    view = memoryview(data)
+    n = len(view)
+    if n < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 < n:
+        if view[i] != 0xFF:
+            return None
+        marker = view[i + 1]
+        if marker == 0xFF:  # Byte pengisi
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # Marker tanpa panjang
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):  # EOI/SOS sebelum SOF
+            return None
+        if marker in _SOF_MARKERS:
+            height = (view[i + 5] << 8) | view[i + 6]
+            width = (view[i + 7] << 8) | view[i + 8]
+            return (width, height) if width and height else None
+        i += 2 + ((view[i + 2] << 8) | view[i + 3])
+    return None
+
+
+def reduced_decode_factor(
+    size: Tuple[int, int], target_size: Sequence[int]
+) -> Tuple[int, int]:
+    """Faktor reduksi terbesar yang hasilnya tetap >= ukuran input model (tanpa upscale)."""
+    width, height = size
+    target_w, target_h = target_size
+    for factor, flag in _REDUCED_FLAGS:
+        if width // factor >= target_w and height // factor >= target_h:
+            return factor, flag
+    return 1, cv2.IMREAD_COLOR
+
+
+class DecodedFrame(object):
+    """
+    Frame yang di-decode pada resolusi tereduksi (cukup untuk input model) beserta
+    byte JPEG sumbernya. Frame resolusi penuh hanya di-decode saat benar-benar
+    dibutuhkan (mis. menyimpan frame deteksi), lalu di-cache.
+    """
+
+    __slots__ = ("img", "source", "full_size", "_full")
+
+    def __init__(self, img: np.ndarray, source: np.ndarray, full_size: Tuple[int, int]):
+        self.img = img
+        self.source = source
+        self.full_size = full_size
+        self._full = img if (img.shape[1], img.shape[0]) == full_size else None
+
+    @property
+    def scale(self) -> Tuple[float, float]:
+        """Faktor (sx, sy) dari koordinat frame tereduksi ke resolusi penuh."""
+        return (
+            self.full_size[0] / self.img.shape[1],
+            self.full_size[1] / self.img.shape[0],
+        )
+
+    @property
+    def is_reduced(self) -> bool:
+        return self._full is None
+
+    def full(self) -> np.ndarray:
+        if self._full is None:
+            full = cv2.imdecode(self.source, cv2.IMREAD_COLOR)
+            if full is None:
+                raise ValueError("Failed to decode full-resolution image.")
+            self._full = full
+        return self._full
+
+
+def decode_jpeg(data, target_size: Optional[Sequence[int]] = None) -> Optional[DecodedFrame]:
+    """
+    Decode JPEG langsung dari buffer (tanpa salinan bytes perantara). Jika `target_size`
+    diberikan, skala IMREAD_REDUCED_* dipilih dari header SOF sehingga libjpeg hanya
+    men-decode resolusi yang cukup untuk input model. Mengembalikan None jika gagal.
+    """
+    source = data if isinstance(data, np.ndarray) else np.frombuffer(data, np.uint8)
+    size = jpeg_dimensions(source)
+    flag = cv2.IMREAD_COLOR
+    if target_size is not None and size is not None:
+        _, flag = reduced_decode_factor(size, target_size)
+
+    img = cv2.imdecode(source, flag)
+    if img is None:
+        return None
+    if size is None:
+        size = (img.shape[1], img.shape[0])
+    elif (img.shape[1] > img.shape[0]) != (size[0] > size[1]) and size[0] != size[1]:
+        # Orientasi EXIF diterapkan oleh imdecode: lebar/tinggi tertukar
+        size = (size[1], size[0])
+    return DecodedFrame(img, source, size)
+
+
+def encode_jpeg(img: np.ndarray) -> bytes:
+    ok, buffer = cv2.imencode(".jpg", img)
+    if not ok:
+        raise ValueError("Gagal encode JPEG.")
+    return buffer.tobytes()
@@ -0,0 +1,111 @@
+# app/utils/upload_limit.py
+import json
+import re
+from typing import Iterable, Tuple
+
+from ..core.config import UPLOAD_SETTINGS
+
+
+class RequestBodyLimitMiddleware(object):
+    """
+    Middleware ASGI yang membatasi ukuran body request upload SEBELUM form multipart
+    di-parse. Starlette menulis seluruh body multipart ke file sementara sebelum handler
+    berjalan, jadi batas di save_upload_file_to_disk saja tidak mencegah upload besar
+    memakai bandwidth/disk penuh.
+
+    - Content-Length di atas batas: ditolak 413 tanpa membaca body sama sekali.
+    - Tanpa Content-Length (chunked): byte dihitung saat body diterima; begitu lewat
+      batas, body dianggap terputus dan respons aplikasi diganti 413.
+    """
+
+    def __init__(self, app, routes: Iterable[Tuple[str, str]], max_body_bytes: int):
+        self.app = app
+        self.routes = [
+            (method.upper(), re.compile(pattern)) for method, pattern in routes
+        ]
+        self.max_body_bytes = max_body_bytes
+
+    def _limited(self, scope) -> bool:
+        if scope["type"] != "http":
+            return False
+        return any(
+            scope["method"] == method and pattern.match(scope["path"])
+            for method, pattern in self.routes
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not self._limited(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > self.max_body_bytes
+            except ValueError:
+                too_large = False
+            if too_large:
+                await self._send_413(send)
+                return
+
+        state = {"received": 0, "exceeded": False, "response_started": False}
+
+        async def limited_receive():
+            if state["exceeded"]:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > self.max_body_bytes:
+                    # Body berhenti dibaca: parser form melihat klien terputus
+                    state["exceeded"] = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if state["exceeded"]:
+                return  # Respons aplikasi (error parse body) diganti 413 di bawah
+            if message["type"] == "http.response.start":
+                state["response_started"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not state["exceeded"]:
+                raise
+        if state["exceeded"] and not state["response_started"]:
+            await self._send_413(send)
+
+    async def _send_413(self, send):
+        body = json.dumps(
+            {"detail": f"Request melebihi batas {self.max_body_bytes} byte."}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+# Endpoint laporan yang menerima foto (multipart): create dan update
+REPORT_UPLOAD_ROUTES = [
+    ("POST", r"^/api/reports/?$"),
+    ("PUT", r"^/api/reports/\d+/?$"),
+]
+
+
+def report_upload_body_limit() -> int:
+    # Foto + field form lain + boundary multipart
+    return UPLOAD_SETTINGS.max_upload_bytes + UPLOAD_SETTINGS.max_form_overhead_bytes
+
+
+print(f"OK: Middleware batas ukuran upload didefinisikan di {__file__}")
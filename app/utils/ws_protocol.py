@@ -0,0 +1,172 @@
+# app/utils/ws_protocol.py
+"""
+Protokol frame WebSocket /ws.
+
+Klien baru menegosiasikan subprotocol BINARY_SUBPROTOCOL lalu mengirim frame biner
+(header ringkas + byte JPEG mentah) dan menerima respons biner. Klien lama (tanpa
+subprotocol) tetap memakai JSON berisi data URL base64.
+
+Frame klien -> server (little-endian, 32 byte header lalu byte JPEG):
+    version u8 | flags u8 | reserved u16 | frame_id u32 | timestamp_ms f64 | lat f64 | lon f64
+
+Respons server -> klien (little-endian, 10 byte header lalu teks UTF-8 lalu payload):
+    version u8 | type u8 | aux u16 | frame_id u32 | text_len u16
+    - MSG_NO_DETECTION: payload JPEG jika frame dirender (policy "always")
+    - MSG_DETECTION   : teks = kelas terdeteksi, payload JPEG overlay (kosong jika policy "never")
+    - MSG_BUSY        : aux = retry_after_ms
+    - MSG_ERROR       : teks = pesan error
+    - MSG_DETECTIONS  : mode respons "detections"; aux = jumlah box, teks = nama kelas per
+                        box dipisah "\\n", payload = lebar u16 | tinggi u16 | N x 6 float32
+                        (class, x0, y0, x1, y1, score) dalam koordinat frame yang dikirim
+
+Mode respons (query ?response=): "image" (bawaan, frame overlay dari server) atau
+"detections" (hanya hasil deteksi; klien menggambar overlay sendiri).
+"""
+import base64
+import json
+import struct
+from typing import Optional
+
+import numpy as np
+
+BINARY_SUBPROTOCOL = "damage-detect.bin.v1"
+PROTOCOL_VERSION = 1
+
+FRAME_HEADER = struct.Struct("<BBHIddd")
+FLAG_HAS_LOCATION = 0x01
+
+RESPONSE_HEADER = struct.Struct("<BBHIH")
+MSG_NO_DETECTION = 0
+MSG_DETECTION = 1
+MSG_BUSY = 2
+MSG_ERROR = 3
+MSG_DETECTIONS = 4
+
+RESPONSE_MODES = ("image", "detections")
+DETECTIONS_SIZE = struct.Struct("<HH")
+
+
+class FrameProtocolError(ValueError):
+    pass
+
+
+def parse_binary_frame(data: bytes) -> dict:
+    """Membaca header frame biner; byte JPEG dikembalikan sebagai view (tanpa salinan)."""
+    if len(data) <= FRAME_HEADER.size:
+        raise FrameProtocolError("Frame too short.")
+    version, flags, _, frame_id, timestamp_ms, lat, lon = FRAME_HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise FrameProtocolError(f"Unsupported frame version {version}.")
+
+    if flags & FLAG_HAS_LOCATION:
+        location = {"lat": lat, "lon": lon}
+    else:
+        location = {"lat": None, "lon": None}
+    return {
+        "frame_id": frame_id,
+        "timestamp_ms": timestamp_ms,
+        "location": location,
+        "jpeg": np.frombuffer(data, np.uint8, offset=FRAME_HEADER.size),
+    }
+
+
+def detections_message(result: dict) -> dict:
+    """Hasil deteksi terstruktur (mode "detections") untuk respons JSON."""
+    width, height = result["frame_size"]
+    return {
+        "status": "detected" if result["class_text"] is not None else "no_detection",
+        "frame_id": result.get("frame_id"),
+        "class_text": result["class_text"],
+        "width": width,
+        "height": height,
+        "detections": result["detections"].to_list(result["class_names"]),
+        "photo_url": result.get("photo_url"),
+    }
+
+
+def pack_response(
+    msg_type: int, frame_id: Optional[int], text: str = "", payload: bytes = b"", aux: int = 0
+) -> bytes:
+    text_bytes = text.encode("utf-8")
+    header = RESPONSE_HEADER.pack(
+        PROTOCOL_VERSION, msg_type, aux, (frame_id or 0) & 0xFFFFFFFF, len(text_bytes)
+    )
+    return b"".join((header, text_bytes, payload))
+
+
+class JsonFrameCodec(object):
+    """Format lama: JSON / data URL base64 sebagai pesan teks."""
+
+    binary = False
+
+    def busy(self, frame_id, retry_after_ms: int, detail: str) -> str:
+        return json.dumps(
+            {"error": "busy", "detail": detail, "retry_after_ms": retry_after_ms}
+        )
+
+    def error(self, frame_id, message: str) -> str:
+        return json.dumps({"error": message})
+
+    def result(self, result: dict) -> str:
+        if "detections" in result:
+            return json.dumps(detections_message(result))
+        jpeg = result.get("jpeg")
+        image = (
+            "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("utf-8")
+            if jpeg is not None
+            else None
+        )
+        if result["class_text"] is None:
+            message = {"status": "no_detection"}
+            if image is not None:  # Policy "always"
+                message["image"] = image
+            return json.dumps(message)
+        if image is not None:
+            return image  # Klien lama menerima data URL mentah
+        # Policy "never": hanya hasil deteksi, tanpa gambar
+        return json.dumps(
+            {
+                "status": "detected",
+                "class_text": result["class_text"],
+                "photo_url": result.get("photo_url"),
+            }
+        )
+
+
+class BinaryFrameCodec(object):
+    """Format biner (BINARY_SUBPROTOCOL): header + byte JPEG mentah, tanpa base64."""
+
+    binary = True
+
+    def busy(self, frame_id, retry_after_ms: int, detail: str) -> bytes:
+        return pack_response(MSG_BUSY, frame_id, aux=retry_after_ms)
+
+    def error(self, frame_id, message: str) -> bytes:
+        return pack_response(MSG_ERROR, frame_id, text=message)
+
+    def result(self, result: dict) -> bytes:
+        if "detections" in result:
+            detections = result["detections"]
+            class_names = result["class_names"]
+            names = "\n".join(class_names[label] for label in detections.labels)
+            payload = DETECTIONS_SIZE.pack(*result["frame_size"]) + detections.data.tobytes()
+            return pack_response(
+                MSG_DETECTIONS,
+                result.get("frame_id"),
+                text=names,
+                payload=payload,
+                aux=len(detections),
+            )
+        jpeg = result.get("jpeg") or b""
+        if result["class_text"] is None:
+            return pack_response(MSG_NO_DETECTION, result.get("frame_id"), payload=jpeg)
+        return pack_response(
+            MSG_DETECTION, result.get("frame_id"), text=result["class_text"], payload=jpeg
+        )
+
+
+async def send_frame_message(websocket, codec, message):
+    if codec.binary:
+        await websocket.send_bytes(message)
+    else:
+        await websocket.send_text(message)
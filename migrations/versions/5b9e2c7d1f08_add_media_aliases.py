@@ -0,0 +1,39 @@
+"""add media aliases and photo_url index
+
+Revision ID: 5b9e2c7d1f08
+Revises: a3e8d51f6c27
+Create Date: 2026-10-17 13:22:41.306118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b9e2c7d1f08'
+down_revision: Union[str, None] = 'a3e8d51f6c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nama file lama (direktori upload datar) -> objek media beralamat konten;
+    # diisi oleh `python -m app.services.migrate_media`
+    op.create_table('media_aliases',
+    sa.Column('alias', sa.String(length=255), nullable=False),
+    sa.Column('object_name', sa.String(length=80), nullable=False),
+    sa.PrimaryKeyConstraint('alias')
+    )
+    op.create_index(op.f('ix_media_aliases_object_name'), 'media_aliases', ['object_name'], unique=False)
+    # Cek "masih dipakai laporan lain?" sebelum file media dihapus
+    op.create_index(op.f('ix_damage_reports_photo_url'), 'damage_reports', ['photo_url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_damage_reports_photo_url'), table_name='damage_reports')
+    op.drop_index(op.f('ix_media_aliases_object_name'), table_name='media_aliases')
+    op.drop_table('media_aliases')
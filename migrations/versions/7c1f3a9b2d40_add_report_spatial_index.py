@@ -0,0 +1,43 @@
+"""add report spatial index
+
+Revision ID: 7c1f3a9b2d40
+Revises: e4d57ad74fd2
+Create Date: 2026-10-17 09:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1f3a9b2d40'
+down_revision: Union[str, None] = 'e4d57ad74fd2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        # R*Tree pendamping damage_reports; disinkronkan oleh ReportRepository
+        op.execute(
+            'CREATE VIRTUAL TABLE damage_reports_rtree '
+            'USING rtree(id, min_lat, max_lat, min_lng, max_lng)'
+        )
+        op.execute(
+            'INSERT INTO damage_reports_rtree (id, min_lat, max_lat, min_lng, max_lng) '
+            'SELECT id, lat, lat, lng, lng FROM damage_reports'
+        )
+    else:
+        # DB lain tanpa R*Tree: index B-tree gabungan untuk query bbox
+        op.create_index('ix_damage_reports_lat_lng', 'damage_reports', ['lat', 'lng'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS damage_reports_rtree')
+    else:
+        op.drop_index('ix_damage_reports_lat_lng', table_name='damage_reports')
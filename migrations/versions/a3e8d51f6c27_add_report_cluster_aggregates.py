@@ -0,0 +1,87 @@
+"""add report cluster aggregates
+
+Revision ID: a3e8d51f6c27
+Revises: 7c1f3a9b2d40
+Create Date: 2026-10-17 10:04:27.551930
+
+"""
+import math
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e8d51f6c27'
+down_revision: Union[str, None] = '7c1f3a9b2d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Salinan beku parameter agregat saat revisi ini dibuat (bukan impor dari app/), agar
+# backfill revisi ini tidak berubah jika konstanta/kolom di kode aplikasi diubah nanti.
+CLUSTER_MIN_ZOOM = 0
+CLUSTER_MAX_ZOOM = 16
+CLUSTER_CELL_BITS = 2
+MAX_MERCATOR_LAT = 85.05112878
+SEVERITY_COLUMNS = {
+    'low': 'count_low',
+    'medium': 'count_medium',
+    'high': 'count_high',
+    'critical': 'count_critical',
+}
+SUM_COLUMNS = ('report_count', 'sum_lat', 'sum_lng') + tuple(SEVERITY_COLUMNS.values())
+
+
+def _mercator_cell(lat, lng, level):
+    n = 1 << level
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _cluster_deltas(points):
+    deltas = defaultdict(lambda: dict.fromkeys(SUM_COLUMNS, 0))
+    for lat, lng, severity in points:
+        severity_column = SEVERITY_COLUMNS[severity]
+        for zoom in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+            delta = deltas[(zoom,) + _mercator_cell(lat, lng, zoom + CLUSTER_CELL_BITS)]
+            delta['report_count'] += 1
+            delta['sum_lat'] += lat
+            delta['sum_lng'] += lng
+            delta[severity_column] += 1
+    return deltas
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    clusters = op.create_table('damage_report_clusters',
+    sa.Column('zoom', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('cell_x', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('cell_y', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('report_count', sa.Integer(), nullable=False),
+    sa.Column('sum_lat', sa.Float(), nullable=False),
+    sa.Column('sum_lng', sa.Float(), nullable=False),
+    sa.Column('count_low', sa.Integer(), nullable=False),
+    sa.Column('count_medium', sa.Integer(), nullable=False),
+    sa.Column('count_high', sa.Integer(), nullable=False),
+    sa.Column('count_critical', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('zoom', 'cell_x', 'cell_y')
+    )
+
+    # Backfill agregat dari laporan yang sudah ada (sekali jalan, di memori)
+    reports = op.get_bind().execute(sa.text('SELECT lat, lng, severity FROM damage_reports'))
+    deltas = _cluster_deltas((lat, lng, severity) for lat, lng, severity in reports)
+    rows = [
+        dict(delta, zoom=zoom, cell_x=cell_x, cell_y=cell_y)
+        for (zoom, cell_x, cell_y), delta in deltas.items()
+    ]
+    for i in range(0, len(rows), 5000):
+        op.bulk_insert(clusters, rows[i : i + 5000])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('damage_report_clusters')